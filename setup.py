@@ -12,7 +12,32 @@ doc_reqs = [
     'Sphinx>=1.5.2'
 ]
 
+async_reqs = [
+    'aiohttp>=3.7'
+]
+
+numpy_reqs = [
+    'numpy>=1.16'
+]
+
+arrow_reqs = [
+    'pyarrow>=1.0'
+]
+
+pandas_reqs = [
+    'pandas>=1.0'
+]
+
+msgpack_reqs = [
+    'msgpack>=1.0'
+]
+
 extra_reqs = {
+    'async': async_reqs,
+    'numpy': numpy_reqs,
+    'arrow': arrow_reqs,
+    'pandas': pandas_reqs,
+    'msgpack': msgpack_reqs,
     'doc': doc_reqs,
     'test': test_reqs
 }
@@ -28,6 +53,7 @@ setup(
         'requests>=2.20.0',
         'six>=1.10.0',
     ],
+    python_requires='>=3.7',
     license='LICENSE.txt',
     packages=['spotiwise'],
     tests_require=test_reqs,
@@ -1,5 +1,14 @@
 __version__ = '0.10.9'
 from .client import *  # noqa
+from .async_client import *  # noqa
 from .oauth2 import *  # noqa
 from .util import *  # noqa
 from .exceptions import *  # noqa
+from .ratelimit import *  # noqa
+from .cache import *  # noqa
+from .concurrency import *  # noqa
+from .batching import *  # noqa
+from .checkpoint import *  # noqa
+from .columnar import *  # noqa
+from .export import *  # noqa
+from .diff import *  # noqa
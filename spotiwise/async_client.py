@@ -0,0 +1,708 @@
+# -*- coding: utf-8 -*-
+
+""" An asyncio flavour of the Spotiwise client """
+
+__all__ = ["AsyncSpotify"]
+
+import asyncio
+import collections
+import itertools
+import json
+import logging
+
+from .client import Spotify
+from .columnar import ColumnarPlaylist
+from .concurrency import chunk_unique, merge_chunk_results
+from .diff import sync_plan
+from .exceptions import SpotifyException
+from .export import export_writer
+from .pagination import new_plays, page_items, played_at_ms, remaining_page_urls
+from .ratelimit import default_rate_limiter
+from .search import SEARCH_PAGE_SIZE, follow_up
+from .object_classes import (
+    SpotiwiseAlbum,
+    SpotiwiseArtist,
+    SpotiwiseItem,
+    SpotiwisePlaylist,
+    SpotiwiseTrack,
+    SpotiwiseUser
+)
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp is an optional dependency
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSpotify(Spotify):
+    """
+        Asyncio client for the Spotify Web API with the same method surface
+        as :class:`Spotify`. Every API method is a coroutine.
+
+        Example usage::
+
+            import asyncio
+            import spotiwise
+
+            async def main():
+                async with spotiwise.AsyncSpotify(auth_manager=...) as sp:
+                    tracks = await asyncio.gather(
+                        *(sp.track(t) for t in track_ids))
+
+            asyncio.run(main())
+
+        URL building and ID parsing are inherited from :class:`Spotify`: the
+        raw endpoint methods return the awaitable produced by
+        ``_internal_call``, so only the methods that post-process a response
+        are overridden here. The ``iter_*`` methods return async generators::
+
+            async for item in sp.iter_playlist_items(playlist_id):
+                ...
+
+        Token retrieval goes through the (synchronous) auth manager. Tokens
+        are memoized in memory, so this only blocks the event loop while a
+        token is being refreshed.
+    """
+
+    def __init__(
+        self,
+        auth=None,
+        session=None,
+        client_credentials_manager=None,
+        oauth_manager=None,
+        auth_manager=None,
+        proxies=None,
+        requests_timeout=5,
+        status_forcelist=None,
+        retries=Spotify.max_retries,
+        status_retries=Spotify.max_retries,
+        backoff_factor=0.3,
+        language=None,
+        max_connections=100,
+        rate_limiter=default_rate_limiter,
+        response_cache=None,
+        search_cache=None,
+        lazy_objects=False,
+        intern_objects=False,
+        user_cache_size=1024,
+        user_cache_ttl=3600,
+    ):
+        """
+        Creates an asyncio Spotify API client.
+
+        :param session:
+            An aiohttp ClientSession to use. One is created on first use
+            (inside the running event loop) if not provided.
+        :param max_connections:
+            Size of the connection pool of the session created by the client
+        :param proxies:
+            Definition of proxies (optional). Only the ``https`` entry is used.
+
+        All other parameters behave as in :class:`Spotify`.
+        """
+        if aiohttp is None:
+            raise ImportError(
+                "AsyncSpotify requires aiohttp: pip install aiohttp")
+        super(AsyncSpotify, self).__init__(
+            auth=auth,
+            requests_session=False,
+            client_credentials_manager=client_credentials_manager,
+            oauth_manager=oauth_manager,
+            auth_manager=auth_manager,
+            proxies=proxies,
+            requests_timeout=requests_timeout,
+            status_forcelist=status_forcelist,
+            retries=retries,
+            status_retries=status_retries,
+            backoff_factor=backoff_factor,
+            language=language,
+            rate_limiter=rate_limiter,
+            response_cache=response_cache,
+            search_cache=search_cache,
+            lazy_objects=lazy_objects,
+            intern_objects=intern_objects,
+            user_cache_size=user_cache_size,
+            user_cache_ttl=user_cache_ttl,
+        )
+        self.max_connections = max_connections
+        self._async_session = session
+        self._owns_session = session is None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """ Closes the connection pool if it was created by the client """
+        if self._async_session is not None and self._owns_session:
+            await self._async_session.close()
+            self._async_session = None
+
+    def _get_session(self):
+        if self._async_session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_connections)
+            self._async_session = aiohttp.ClientSession(connector=connector)
+            self._owns_session = True
+        return self._async_session
+
+    @staticmethod
+    def _encode_params(params):
+        # aiohttp refuses None values which Requests silently drops
+        encoded = {}
+        for key, value in params.items():
+            if value is None:
+                continue
+            if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+                value = str(value)
+            encoded[key] = value
+        return encoded
+
+    def _retry_delay(self, attempt, headers):
+        retry_after = headers.get("Retry-After")
+        if retry_after is not None:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        if attempt == 0:
+            return 0
+        return self.backoff_factor * (2 ** (attempt - 1))
+
+    async def _internal_call(self, method, url, payload, params):
+        url, headers, args = self._prepare_request(method, url, payload, params)
+        cache_key, cached = self._cache_lookup(method, url, args, headers)
+        session = self._get_session()
+        proxy = (self.proxies or {}).get("https")
+        timeout = aiohttp.ClientTimeout(total=self.requests_timeout)
+
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                delay = self.rate_limiter.reserve()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            try:
+                async with session.request(
+                    method, url, headers=headers, proxy=proxy, timeout=timeout,
+                    params=self._encode_params(args["params"]),
+                    data=args.get("data"),
+                ) as response:
+                    status = response.status
+                    response_headers = response.headers
+                    body = await response.read()
+            except aiohttp.ClientConnectionError:
+                if attempt >= self.retries:
+                    raise
+                await asyncio.sleep(self._retry_delay(attempt, {}))
+                attempt += 1
+                continue
+
+            if status == 429 and self.rate_limiter is not None:
+                # the pause is applied by the next reservation
+                self.rate_limiter.pause(
+                    self.rate_limiter.retry_after(response_headers))
+                if status in self.status_forcelist and attempt < self.status_retries:
+                    attempt += 1
+                    continue
+            elif status in self.status_forcelist and attempt < self.status_retries:
+                await asyncio.sleep(self._retry_delay(attempt, response_headers))
+                attempt += 1
+                continue
+            break
+
+        if cached is not None and status == 304:
+            return cached[1]
+
+        try:
+            results = json.loads(body) if body else None
+        except ValueError:
+            results = None
+
+        if status >= 400:
+            if status in self.status_forcelist and self.status_retries:
+                logger.error('Max Retries reached')
+                raise SpotifyException(
+                    599,
+                    -1,
+                    "%s:\n %s" % (url, "Max Retries"),
+                    headers=response_headers,
+                )
+            raise self._http_exception(
+                method, url, status, results, response_headers)
+
+        self._cache_store(cache_key, response_headers, results, body)
+        logger.debug('RESULTS: %s', results)
+        return results
+
+    async def _run_concurrently(self, fn, iterable):
+        return list(await asyncio.gather(*(fn(arg) for arg in iterable)))
+
+    async def _map_chunks(self, ids, chunk_size, request, key=None, wrap=False):
+        chunks = chunk_unique(ids, chunk_size)
+        responses = await self._run_concurrently(request, chunks)
+        results = merge_chunk_results(ids, chunks, responses, key)
+        return {key: results} if wrap else results
+
+    async def _run_chunks(self, ids, chunk_size, request):
+        await self._run_concurrently(request, chunk_unique(ids, chunk_size))
+
+    def _wrap_playlist(self, data):
+        # the client is attached afterwards: objects built with a client
+        # may call it synchronously
+        playlist = self._wrap(SpotiwisePlaylist, data)
+        playlist.owner  # hydrate lazy playlists' owner before the client is attached
+        playlist.sp = self
+        return playlist
+
+    async def all_pages(self, result):
+        """ returns a paged result followed by all of its following pages,
+            fetched concurrently
+
+            Parameters:
+                - result - a previously returned paged result
+        """
+        return [result] + await self._run_concurrently(
+            self._get, remaining_page_urls(result))
+
+    async def all_items(self, result):
+        """ returns the items of a paged result and all of its following
+            pages, fetched concurrently
+
+            Parameters:
+                - result - a previously returned paged result
+        """
+        return page_items(await self.all_pages(result))
+
+    async def _iter_objects(self, result, wrap):
+        # `result` is the awaitable first page; iter_* methods become async
+        # generators with the next page requested while one is consumed
+        page = await result
+        while page:
+            following = None
+            if page.get("next"):
+                following = asyncio.ensure_future(self.next(page))
+            for item in page.get("items") or []:
+                if item is None:
+                    continue
+                obj = wrap(item)
+                if obj is not None:
+                    yield obj
+            page = await following if following is not None else None
+
+    async def next(self, result):
+        """ returns the next result given a paged result
+
+            Parameters:
+                - result - a previously returned paged result
+        """
+        if result["next"]:
+            return await self._get(result["next"])
+        else:
+            return None
+
+    async def previous(self, result):
+        """ returns the previous result given a paged result
+
+            Parameters:
+                - result - a previously returned paged result
+        """
+        if result["previous"]:
+            return await self._get(result["previous"])
+        else:
+            return None
+
+    async def track(self, track_id):
+        """ return a single track object given the track's ID, URI, or URL
+
+            Parameters:
+                - track_id - a spotify URI, URL or ID
+        """
+        return self._wrap(SpotiwiseTrack, await self._track(track_id))
+
+    async def tracks(self, tracks, market=None):
+        """ returns a list of tracks given a list of track IDs, URIs, or URLs
+
+            Parameters:
+                - tracks - a list of spotify URIs, URLs or IDs
+                - market - an ISO 3166-1 alpha-2 country code.
+        """
+        results = (await self._tracks(tracks, market)).get('tracks')
+        return [self._wrap(SpotiwiseTrack, track) for track in results]
+
+    async def artist(self, artist_id):
+        """ returns a single artist given the artist's ID, URI or URL
+
+            Parameters:
+                - artist_id - an artist ID, URI or URL
+        """
+        return self._wrap(SpotiwiseArtist, await self._artist(artist_id))
+
+    async def artists(self, artists):
+        """ returns a list of artists given the artist IDs, URIs, or URLs
+
+            Parameters:
+                - artists - a list of  artist IDs, URIs or URLs
+        """
+        results = (await self._artists(artists)).get('artists')
+        return [self._wrap(SpotiwiseArtist, artist) for artist in results]
+
+    async def artist_top_tracks(self, artist_id, country='US'):
+        """ Get Spotify catalog information about an artist's top 10 tracks
+            by country.
+
+            Parameters:
+                - artist_id - the artist ID, URI or URL
+                - country - limit the response to one particular country.
+        """
+        results = (await self._artist_top_tracks(artist_id, country)).get('tracks')
+        return [self._wrap(SpotiwiseTrack, track) for track in results]
+
+    async def artist_related_artists(self, artist_id):
+        """ Get Spotify catalog information about artists similar to an
+            identified artist.
+
+            Parameters:
+                - artist_id - the artist ID, URI or URL
+        """
+        results = (await self._artist_related_artists(artist_id)).get('artists')
+        return [self._wrap(SpotiwiseArtist, artist) for artist in results]
+
+    async def album(self, album_id):
+        """ returns a single album given the album's ID, URIs or URL
+
+            Parameters:
+                - album_id - the album ID, URI or URL
+        """
+        return self._wrap(SpotiwiseAlbum, await self._album(album_id))
+
+    async def albums(self, albums):
+        """ returns a list of albums given the album IDs, URIs, or URLs
+
+            Parameters:
+                - albums - a list of  album IDs, URIs or URLs
+        """
+        results = (await self._albums(albums)).get('albums')
+        return [self._wrap(SpotiwiseAlbum, album) for album in results]
+
+    async def _user_or_none(self, user):
+        try:
+            return await self._user(user)
+        except SpotifyException:
+            return None
+
+    async def resolve_users(self, users=None):
+        """ Fetches the profiles of SpotiwiseUser stubs concurrently, one
+            request per distinct unresolved user ID, and returns the users
+        """
+        if users is None:
+            users = self._cached_users()
+        pending = [user for user in users if user is not None and not user.resolved]
+        ids = list(dict.fromkeys(user.id for user in pending))
+        profiles = dict(zip(ids, await self._run_concurrently(self._user_or_none, ids)))
+        for user in pending:
+            user._apply_profile(profiles[user.id])
+        return users
+
+    async def user(self, user):
+        """ Gets basic profile information about a Spotify User
+
+            Parameters:
+                - user - the id of the usr
+        """
+        return self._wrap(SpotiwiseUser, await self._user(user))
+
+    async def current_user_playlists(self, limit=50, offset=0):
+        """ Get current user playlists without required getting his profile
+            Parameters:
+                - limit  - the number of items to return
+                - offset - the index of the first item to return
+        """
+        results = (await self._current_user_playlists(limit, offset)).get('items')
+        return [self._wrap_playlist(playlist) for playlist in results]
+
+    async def user_playlist(self, user, playlist_id=None, fields=None, precache=False):
+        """ Gets playlist of a user
+            Parameters:
+                - user - the id of the user
+                - playlist_id - the id of the playlist
+                - fields - which fields to return
+                - precache - load every page of tracks before returning
+        """
+        playlist = self._wrap_playlist(
+            await self._user_playlist(user, playlist_id, fields))
+        if precache and playlist._tracks.get('next'):
+            pages = (await self.all_pages(playlist._tracks))[1:]
+            for page in pages:
+                playlist._extend_items(page, sp=self)
+            playlist._tracks = pages[-1] if pages else playlist._tracks
+            playlist.tracks = [item.track for item in playlist.items]
+        return playlist
+
+    async def user_playlists(self, user, limit=50, offset=0):
+        """ Gets playlists of a user
+
+            Parameters:
+                - user - the id of the usr
+                - limit  - the number of items to return
+                - offset - the index of the first item to return
+        """
+        results = (await self._user_playlists(user, limit, offset)).get('items')
+        return [self._wrap_playlist(playlist) for playlist in results]
+
+    async def playlist_columns(self, playlist_id, market=None):
+        """ Returns every track of a playlist as a ColumnarPlaylist, fetching
+            the pages concurrently
+        """
+        result = await self.playlist_items(
+            playlist_id, fields=ColumnarPlaylist.fields, limit=100, market=market,
+            additional_types=("track",))
+        columns = ColumnarPlaylist()
+        for page in await self.all_pages(result):
+            columns.extend(page.get("items") or [])
+        return columns
+
+    async def sync_playlist(self, playlist_id, target_uris):
+        """ Makes a playlist contain exactly `target_uris`, in order, with
+            as few requests as possible (see `Spotify.sync_playlist`)
+        """
+        plid = self._get_id("playlist", playlist_id)
+        snapshot_id = (await self._get("playlists/%s" % plid, fields="snapshot_id"))["snapshot_id"]
+        result = await self.playlist_items(plid, fields=self._sync_fields, limit=100)
+        current = self._sync_uris(await self.all_pages(result))
+        summary = dict(snapshot_id=snapshot_id, requests=0, removed=0, moved=0, added=0)
+        for operation in sync_plan(current, [self._sync_uri(uri) for uri in target_uris]):
+            # each request needs the snapshot returned by the previous one
+            response = await self._sync_request(plid, operation, summary["snapshot_id"])
+            self._sync_count(summary, operation, response)
+        return summary
+
+    async def export_playlist(self, playlist_id, file, format="csv", columns=None, market=None):
+        """ Streams every track of a playlist to a file as CSV or NDJSON
+            (see `Spotify.export_playlist`)
+        """
+        return await self._export(
+            self.iter_playlist_items(playlist_id, market=market), file, format, columns)
+
+    async def export_saved_tracks(self, file, format="csv", columns=None, market=None):
+        """ Streams every saved track to a file as CSV or NDJSON (see
+            `Spotify.export_saved_tracks`)
+        """
+        return await self._export(
+            self.iter_saved_tracks(market=market), file, format, columns)
+
+    async def _export(self, items, file, format, columns):
+        with export_writer(file, format, columns, cls=SpotiwiseItem) as out:
+            async for item in items:
+                out.write(item)
+            return out.rows
+
+    async def saved_tracks_columns(self, market=None):
+        """ Returns every saved track as a ColumnarPlaylist, fetching the
+            pages concurrently
+        """
+        result = await self._get("me/tracks", limit=50, market=market)
+        columns = ColumnarPlaylist()
+        for page in await self.all_pages(result):
+            columns.extend(page.get("items") or [])
+        return columns
+
+    async def search_columns(self, q, market=None, concurrency=None):
+        """ Returns every track matching a search query as a
+            ColumnarPlaylist (see `Spotify.search_columns`)
+        """
+        columns = ColumnarPlaylist()
+        columns.extend_tracks([item async for item in self._crawl(
+            q, "track", market, concurrency)])
+        return columns
+
+    async def audio_features(self, tracks=[]):
+        """ Get audio features for one or multiple tracks based upon their Spotify IDs
+            Parameters:
+                - tracks - a list of track URIs, URLs or IDs
+        """
+        if isinstance(tracks, str):
+            trackid = self._get_id("track", tracks)
+            results = await self._get("audio-features/?ids=" + trackid)
+            if "audio_features" in results:
+                return results["audio_features"]
+            return results
+        return await super(AsyncSpotify, self).audio_features(tracks)
+
+    async def search(self, q, limit=10, offset=0, type="track", market=None):
+        """ searches for an item, consulting `search_cache` first
+
+            Parameters:
+                - q - the search query
+                - limit  - the number of items to return
+                - offset - the index of the first item to return
+                - type - the type of item to return
+                - market - An ISO 3166-1 alpha-2 country code or the string
+                           from_token.
+        """
+        if self.search_cache is not None:
+            cached = self.search_cache.get(q, type, market, limit, offset)
+            if cached is not None:
+                return cached
+        result = await self._get(
+            "search", q=q, limit=limit, offset=offset, type=type, market=market)
+        if self.search_cache is not None:
+            self.search_cache.put(q, type, market, limit, offset, result)
+        return result
+
+    async def search_all(self, q, type="track", market=None, concurrency=None):
+        """ Yields every item matching a search query as Spotiwise objects,
+            past the API's offset cap, with at most `concurrency` requests
+            in flight (see `Spotify.search_all`)
+        """
+        wrappers = {
+            "album": lambda item: self._wrap(SpotiwiseAlbum, item),
+            "artist": lambda item: self._wrap(SpotiwiseArtist, item),
+            "playlist": self._wrap_playlist,
+            "track": lambda item: self._wrap(SpotiwiseTrack, item),
+        }
+        wrap = wrappers.get(type, lambda item: item)
+        async for item in self._crawl(q, type, market, concurrency):
+            yield wrap(item)
+
+    async def _crawl(self, q, type, market, concurrency):
+        """ Yields the raw items matching a search query, see `search.crawl` """
+        window = max(1, concurrency or self.max_connections)
+        queue = collections.deque([(q, None, 0)])
+        in_flight = {}
+        seen = set()
+
+        def search(task):
+            return asyncio.ensure_future(self.search(
+                task[0], limit=SEARCH_PAGE_SIZE, offset=task[2], type=type,
+                market=market))
+
+        try:
+            while queue or in_flight:
+                while queue and len(in_flight) < window:
+                    task = queue.popleft()
+                    in_flight[search(task)] = task
+                done, _ = await asyncio.wait(
+                    list(in_flight), return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    task = in_flight.pop(future)
+                    page = future.result()[type + "s"]
+                    tasks = follow_up(q, type, task, page)
+                    queue.extend(tasks)
+                    if tasks and tasks[0][2] == 0:
+                        continue
+                    for item in page.get("items") or []:
+                        if item is None or item.get("id") in seen:
+                            continue
+                        seen.add(item.get("id"))
+                        yield item
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    async def search_markets(self, q, limit=10, offset=0, type="track", markets=None, total=None,
+                             concurrency=None):
+        """ searches multple markets for an item concurrently
+
+            Parameters:
+                - q - the search query
+                - limit  - the number of items to return per market
+                - offset - the index of the first item to return
+                - type - the type's of item's to return
+                - markets - A list of ISO 3166-1 alpha-2 country codes.
+                            Search all country markets by default.
+                - total - the total number of results to return
+                - concurrency - the maximum number of markets searched at
+                                once, `max_connections` by default
+        """
+        if not markets:
+            markets = self.country_codes
+        if not isinstance(markets, (list, tuple)):
+            markets = []
+        if total and limit > total:
+            limit = total
+
+        def search(country):
+            return asyncio.ensure_future(self.search(
+                q, limit=limit, offset=offset, type=type, market=country))
+
+        first_type = type.split(",")[0] + 's'
+        window = max(1, concurrency or self.max_connections)
+        countries = iter(markets)
+        pending = collections.deque(
+            (country, search(country))
+            for country in itertools.islice(countries, window))
+        results = {}
+        count = 0
+        try:
+            while pending:
+                country, task = pending.popleft()
+                result = await task
+                if total:
+                    # trim a copy, since the result may be shared with the
+                    # response cache or a coalesced request
+                    page = result[first_type]
+                    if len(page['items']) > total - count:
+                        result = dict(result)
+                        result[first_type] = dict(page, items=page['items'][:total - count])
+                results[country] = result
+                count += len(result[first_type]['items'])
+                if total and count >= total:
+                    break
+                for country in itertools.islice(countries, 1):
+                    pending.append((country, search(country)))
+        finally:
+            for _, task in pending:
+                task.cancel()
+            await asyncio.gather(*(task for _, task in pending),
+                                 return_exceptions=True)
+        return results
+
+    async def sync_recently_played(self, checkpoints, key="recently_played"):
+        """ Returns the tracks played since the last sync, oldest first, as
+            play history items and moves the checkpoint forward
+
+            Parameters:
+                - checkpoints - a CheckpointStore
+                - key - the checkpoint key, e.g. one per user
+        """
+        after = checkpoints.get(key)
+        plays = []
+        page = await self.current_user_recently_played(limit=50, after=after)
+        while page and page.get("items"):
+            fresh = new_plays(page["items"], after)
+            if not fresh:
+                break
+            plays.extend(fresh)
+            after = played_at_ms(fresh[-1])
+            if not page.get("next") or len(page["items"]) < page.get("limit", 50):
+                break
+            page = await self.current_user_recently_played(limit=50, after=after)
+        if plays:
+            checkpoints.set(key, after)
+        return new_plays(plays)
+
+    async def sync_followed_artists(self, checkpoints, key="followed_artists"):
+        """ Returns the artists followed past the checkpoint stored under
+            `key` as SpotiwiseArtist objects and moves the checkpoint forward
+
+            Parameters:
+                - checkpoints - a CheckpointStore
+                - key - the checkpoint key, e.g. one per user
+        """
+        after = checkpoints.get(key)
+        artists = []
+        result = await self.current_user_followed_artists(limit=50, after=after)
+        page = result.get("artists") if result else None
+        while page:
+            artists.extend(self._wrap(SpotiwiseArtist, artist)
+                           for artist in page.get("items") or [] if artist)
+            if not page.get("next"):
+                break
+            page = (await self._get(page["next"])).get("artists")
+        if artists:
+            checkpoints.set(key, artists[-1].id)
+        return artists
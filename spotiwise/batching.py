@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+""" Micro-batching of single-object lookups into multi-ID requests """
+
+__all__ = ["BatchLoader"]
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from .exceptions import SpotifyException
+from .object_classes import SpotiwiseAlbum, SpotiwiseArtist, SpotiwiseTrack
+
+logger = logging.getLogger(__name__)
+
+
+class _BatchFuture(Future):
+    """ A future that flushes its loader when its result is requested
+        before the batch has been sent
+    """
+
+    def __init__(self, loader=None):
+        super(_BatchFuture, self).__init__()
+        self._loader = loader
+
+    def result(self, timeout=None):
+        if self._loader is not None and not self.done():
+            self._loader.flush()
+        return super(_BatchFuture, self).result(timeout)
+
+
+class BatchLoader(object):
+    """
+        Queues single-object lookups and resolves them with multi-ID calls.
+
+        Lookups are sent when a batch reaches the API maximum, when
+        :meth:`flush` is called or, if a ``window`` is set, that many seconds
+        after the first lookup of a batch was queued.
+
+        Used by :meth:`Spotify.batching` and the ``batch_window`` option of
+        :class:`Spotify`; there is usually no need to create one directly.
+    """
+
+    # type: (raw multi-ID method, response key, object class, batch size)
+    sources = {
+        'track': ('_tracks', 'tracks', SpotiwiseTrack, 50),
+        'artist': ('_artists', 'artists', SpotiwiseArtist, 50),
+        'album': ('_albums', 'albums', SpotiwiseAlbum, 20),
+    }
+
+    def __init__(self, sp, window=None):
+        """
+            Parameters:
+                - sp - the Spotify client used to send the batches
+                - window - seconds to wait for more lookups before sending a
+                           batch. None only sends on flush or when full.
+        """
+        self.sp = sp
+        self.window = window
+        self._pending = dict((type, OrderedDict()) for type in self.sources)
+        self._lock = threading.Lock()
+        self._timer = None
+        self.batches = 0
+        self.lookups = 0
+
+    def __len__(self):
+        """ Number of distinct lookups waiting to be sent """
+        return sum(len(pending) for pending in self._pending.values())
+
+    def stats(self):
+        """ Returns the number of queued lookups and of requests sent """
+        return {"lookups": self.lookups, "batches": self.batches}
+
+    def load(self, type, id):
+        """ Queues a lookup and returns a future resolving to the object
+
+            Parameters:
+                - type - 'track', 'artist' or 'album'
+                - id - the Spotify ID of the object
+        """
+        # with a window the batch is sent by the timer, don't cut it short
+        future = _BatchFuture(self if self.window is None else None)
+        full = None
+        with self._lock:
+            self.lookups += 1
+            pending = self._pending[type]
+            pending.setdefault(id, []).append(future)
+            if len(pending) >= self.sources[type][3]:
+                full = self._take(type)
+            elif self.window is not None and self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self._send(type, full)
+        return future
+
+    def flush(self):
+        """ Sends every queued lookup """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            batches = [(type, self._take(type)) for type in self.sources]
+        for type, pending in batches:
+            if pending:
+                self._send(type, pending)
+
+    def _take(self, type):
+        pending = self._pending[type]
+        self._pending[type] = OrderedDict()
+        return pending
+
+    def _send(self, type, pending):
+        method, key, cls, _ = self.sources[type]
+        ids = list(pending)
+        self.batches += 1
+        logger.debug('Sending batch of %d %s lookups', len(ids), type)
+        try:
+            results = getattr(self.sp, method)(ids).get(key)
+        except BaseException as e:
+            for futures in pending.values():
+                for future in futures:
+                    future.set_exception(e)
+            return
+
+        for id, data in zip(ids, results):
+            futures = pending[id]
+            if data is None:
+                error = SpotifyException(
+                    404, -1, "%s %s not found" % (type, id))
+                for future in futures:
+                    future.set_exception(error)
+                continue
+            try:
+                obj = self.sp._wrap(cls, data)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future in futures:
+                future.set_result(obj)
@@ -0,0 +1,402 @@
+# -*- coding: utf-8 -*-
+
+""" Response caches used for conditional (ETag) requests and search """
+
+__all__ = [
+    "ResponseCache",
+    "MemoryResponseCache",
+    "SQLiteResponseCache",
+    "TTLCache",
+    "SearchCache"
+]
+
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from six.moves.urllib.parse import urlencode
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache(object):
+    """
+        Interface of the response caches used by :class:`Spotify`.
+
+        A cache maps a request key (URL and query parameters) to the ETag
+        and decoded body of the last response. The client sends the ETag
+        back as ``If-None-Match`` and returns the cached body on a
+        ``304 Not Modified``.
+    """
+
+    def get(self, key):
+        """ Returns an ``(etag, body)`` tuple, or None if nothing is cached
+
+            Parameters:
+                - key - the request key
+        """
+        raise NotImplementedError()
+
+    def set(self, key, etag, body, raw):
+        """ Stores a response
+
+            Parameters:
+                - key - the request key
+                - etag - the ETag header of the response
+                - body - the decoded JSON body
+                - raw - the undecoded body as bytes
+        """
+        raise NotImplementedError()
+
+    def clear(self):
+        """ Removes every cached response """
+        raise NotImplementedError()
+
+
+class MemoryResponseCache(ResponseCache):
+    """
+        An in-memory LRU cache bounded by the size of the cached bodies.
+
+        Bodies are returned as-is on a hit, without copying or parsing, so
+        they must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        """
+            Parameters:
+                - max_bytes - evict the least recently used responses once
+                              the cached bodies add up to more than this
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def set(self, key, etag, body, raw):
+        size = len(raw)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[2]
+            self._entries[key] = (etag, body, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+
+class SQLiteResponseCache(ResponseCache):
+    """
+        A response cache persisted to a SQLite file, so it survives restarts
+        and can be shared between processes. Bodies are stored as JSON text
+        and decoded again on a hit.
+    """
+
+    def __init__(self, path):
+        """
+            Parameters:
+                - path - the database file, created if it doesn't exist
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, etag TEXT, body TEXT, updated REAL)")
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return row[0], json.loads(row[1])
+        except ValueError:
+            logger.warning('Discarding corrupt cached response for %s', key)
+            return None
+
+    def set(self, key, etag, body, raw):
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8")
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, etag, raw, time.time()))
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM responses")
+
+    def close(self):
+        self._db.close()
+
+
+class TTLCache(object):
+    """
+        A thread-safe LRU mapping whose entries expire `ttl` seconds after
+        they were stored.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        """
+            Parameters:
+                - maxsize - evict the least recently used entries beyond
+                            this many
+                - ttl - the lifetime of an entry in seconds, None for no
+                        expiry
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._lookup(key) is not None
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key, default=None):
+        """ Returns the live value stored under `key`, or `default` """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        """ Stores `value` under `key`, restarting its lifetime
+
+            Parameters:
+                - key - a hashable key
+                - value - the value
+                - ttl - overrides the cache's `ttl` for this entry
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, expires)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __getitem__(self, key):
+        with self._lock:
+            entry = self._lookup(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry[0]
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def values(self):
+        """ Returns a list of the live values, least recently used first,
+            without refreshing them
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [value for value, expires in self._entries.values()
+                    if expires is None or expires > now]
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """ Returns the hit and miss counts, the hit rate and the number of
+            entries
+        """
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries)}
+
+
+class SearchCache(object):
+    """
+        Caches search results by normalized query, type and market.
+
+        Items are stored by their position in the result set rather than
+        by page, so a request is answered from the cache whenever every
+        item it covers has been fetched before, e.g. a page of 50 from five
+        cached pages of 10. With `path`, entries are also written to a
+        SQLite file and survive restarts.
+    """
+
+    search_url = "https://api.spotify.com/v1/search"
+
+    def __init__(self, maxsize=1024, ttl=3600, path=None):
+        """
+            Parameters:
+                - maxsize - the number of (query, type, market) entries
+                            kept in memory
+                - ttl - seconds before a cached result set goes stale
+                - path - a SQLite file to persist entries to, if any
+        """
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = TTLCache(maxsize, ttl)
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            with self._db:
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS search ("
+                    "key TEXT PRIMARY KEY, entry TEXT, updated REAL)")
+
+    @staticmethod
+    def normalize(q):
+        """ Returns the cache form of a query: lower case, single spaced """
+        return re.sub(r"\s+", " ", q.strip()).lower()
+
+    def _key(self, q, type, market):
+        return (self.normalize(q), type, (market or "").upper())
+
+    def _load(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT entry, updated FROM search WHERE key = ?",
+            (json.dumps(key),)).fetchone()
+        if row is None or (self.ttl is not None and row[1] + self.ttl <= time.time()):
+            return None
+        entry = json.loads(row[0])
+        entry["items"] = dict((int(i), item) for i, item in entry["items"].items())
+        remaining = None if self.ttl is None else row[1] + self.ttl - time.time()
+        self._entries.set(key, entry, remaining)
+        return entry
+
+    def _url(self, q, type, market, limit, offset):
+        params = [("query", q), ("type", type), ("offset", offset), ("limit", limit)]
+        if market:
+            params.insert(2, ("market", market))
+        return self.search_url + "?" + urlencode(params)
+
+    def get(self, q, type, market, limit, offset):
+        """ Returns a search response assembled from cached items, or None
+            if any item in the requested range is missing
+        """
+        types = type.split(",")
+        response = {}
+        with self._lock:
+            for t in types:
+                entry = self._load(self._key(q, t, market))
+                if entry is None:
+                    break
+                total = entry["total"]
+                end = min(offset + limit, total, entry.get("end", total))
+                items = entry["items"]
+                if any(i not in items for i in range(offset, end)):
+                    break
+                response[t + "s"] = {
+                    "href": self._url(q, t, market, limit, offset),
+                    "items": [items[i] for i in range(offset, end)],
+                    "limit": limit,
+                    "offset": offset,
+                    "total": total,
+                    "next": self._url(q, t, market, limit, offset + limit)
+                    if offset + limit < total else None,
+                    "previous": self._url(
+                        q, t, market, limit, max(0, offset - limit))
+                    if offset > 0 else None,
+                }
+            if len(response) < len(types):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return response
+
+    def put(self, q, type, market, limit, offset, response):
+        """ Adds the items of a search response to the cache """
+        with self._lock:
+            for plural, page in response.items():
+                if not isinstance(page, dict) or "items" not in page:
+                    continue
+                key = self._key(q, plural[:-1], market)
+                entry = self._load(key)
+                total = page.get("total") or 0
+                if entry is None or entry["total"] != total:
+                    entry = {"total": total, "items": {}}
+                start = page.get("offset", offset)
+                for i, item in enumerate(page["items"]):
+                    entry["items"][start + i] = item
+                page_end = start + len(page["items"])
+                if len(page["items"]) < page.get("limit", limit):
+                    # fewer items than asked for: the result set ends here
+                    # even if `total` claims otherwise
+                    entry["end"] = page_end
+                elif entry.get("end", page_end) < page_end:
+                    del entry["end"]
+                self._entries.set(key, entry)
+                if self._db is not None:
+                    with self._db:
+                        self._db.execute(
+                            "INSERT OR REPLACE INTO search VALUES (?, ?, ?)",
+                            (json.dumps(key), json.dumps(entry), time.time()))
+
+    def stats(self):
+        """ Returns the hit and miss counts and the number of entries """
+        return {"hits": self.hits, "misses": self.misses,
+                "entries": len(self._entries)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM search")
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+""" Checkpoint stores used for incremental, cursor-based syncs """
+
+__all__ = [
+    "CheckpointStore",
+    "MemoryCheckpointStore",
+    "FileCheckpointStore",
+    "SQLiteCheckpointStore"
+]
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointStore(object):
+    """
+        Interface of the checkpoint stores used by
+        :meth:`Spotify.sync_recently_played` and
+        :meth:`Spotify.sync_followed_artists`.
+
+        A checkpoint is the cursor up to which a feed has been consumed,
+        stored under a caller-chosen key (e.g. one per user).
+    """
+
+    def get(self, key):
+        """ Returns the checkpoint stored under ``key``, or None """
+        raise NotImplementedError()
+
+    def set(self, key, value):
+        """ Stores a checkpoint
+
+            Parameters:
+                - key - the feed key
+                - value - the cursor, a string or a number
+        """
+        raise NotImplementedError()
+
+
+class MemoryCheckpointStore(CheckpointStore):
+    """ Keeps checkpoints in memory, for the lifetime of the process """
+
+    def __init__(self):
+        self._checkpoints = {}
+
+    def get(self, key):
+        return self._checkpoints.get(key)
+
+    def set(self, key, value):
+        self._checkpoints[key] = value
+
+
+class FileCheckpointStore(CheckpointStore):
+    """ Keeps checkpoints in a JSON file, rewritten on every update """
+
+    def __init__(self, path):
+        """
+            Parameters:
+                - path - the JSON file, created if it doesn't exist
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self._checkpoints = json.load(f)
+        except IOError:
+            self._checkpoints = {}
+        except ValueError:
+            logger.warning('Ignoring corrupt checkpoint file at: %s', path)
+            self._checkpoints = {}
+
+    def get(self, key):
+        return self._checkpoints.get(key)
+
+    def set(self, key, value):
+        with self._lock:
+            self._checkpoints[key] = value
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._checkpoints, f)
+            os.replace(tmp_path, self.path)
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """ Keeps checkpoints in a SQLite file, suited to many keys """
+
+    def __init__(self, path):
+        """
+            Parameters:
+                - path - the database file, created if it doesn't exist
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                "key TEXT PRIMARY KEY, value TEXT)")
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM checkpoints WHERE key = ?", (key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?)",
+                (key, json.dumps(value)))
+
+    def close(self):
+        self._db.close()
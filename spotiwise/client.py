@@ -4,16 +4,25 @@
 
 __all__ = ["Spotify", "SpotifyException"]
 
+import collections
+import contextlib
+import itertools
 import json
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from six.moves.urllib.parse import urlencode
 from .object_classes import (
+    IdentityMap,
     SpotiwiseAlbum,
     SpotiwiseArtist,
     SpotiwiseItem,
     SpotiwisePlayback,
     SpotiwisePlaylist,
     SpotiwiseTrack,
-    SpotiwiseUser
+    SpotiwiseUser,
+    _group_users,
+    _intern
 )
 import logging
 import warnings
@@ -22,7 +31,23 @@ import requests
 import urllib3
 import six
 
+from .batching import BatchLoader
+from .cache import TTLCache
+from .columnar import ColumnarPlaylist
+from .concurrency import SingleFlight, chunk_unique, merge_chunk_results
+from .diff import sync_plan
 from .exceptions import SpotifyException
+from .export import export_objects
+from .pagination import (
+    iter_cursor_pages,
+    iter_pages,
+    new_plays,
+    page_items,
+    played_at_ms,
+    remaining_page_urls
+)
+from .ratelimit import default_rate_limiter
+from .search import crawl
 
 logger = logging.getLogger(__name__)
 
@@ -120,7 +145,17 @@ class Spotify(object):
         status_retries=max_retries,
         backoff_factor=0.3,
         language=None,
-        oauth=None
+        oauth=None,
+        rate_limiter=default_rate_limiter,
+        response_cache=None,
+        coalesce_requests=False,
+        max_workers=8,
+        batch_window=None,
+        search_cache=None,
+        lazy_objects=False,
+        intern_objects=False,
+        user_cache_size=1024,
+        user_cache_ttl=3600
     ):
         """
         Creates a Spotify API client.
@@ -156,6 +191,43 @@ class Spotify(object):
         :param language:
             The language parameter advertises what language the user prefers to see.
             See ISO-639 language code: https://www.loc.gov/standards/iso639-2/php/code_list.php
+        :param rate_limiter:
+            A RateLimiter consulted before every request. 429 responses pause
+            every client sharing it for the `Retry-After` delay. Defaults to a
+            limiter shared by the whole process; pass None to disable.
+        :param response_cache:
+            A ResponseCache (e.g. MemoryResponseCache or SQLiteResponseCache)
+            enabling conditional GET requests: the ETag of each response is
+            sent back as `If-None-Match` and a 304 returns the cached body.
+            Responses under `me/` are user-specific and never cached.
+        :param coalesce_requests:
+            When True, concurrent identical GET requests (same URL and
+            parameters) share a single HTTP request and its parsed result.
+            The counts are available from `single_flight.stats()`.
+        :param max_workers:
+            Number of threads used to send requests concurrently, e.g. the
+            chunks of multi-ID endpoints
+        :param batch_window:
+            When set, `track`, `artist` and `album` lookups from any thread
+            are held for up to this many seconds and sent together as
+            multi-ID requests. See also `batching()`.
+        :param search_cache:
+            A SearchCache consulted by `search` and `search_markets` before
+            sending a request; a page is served from it when every item it
+            covers was fetched before, possibly by narrower pages.
+        :param lazy_objects:
+            When True, Spotiwise objects returned by the client keep the raw
+            JSON and build nested objects (albums, artists, images...) on
+            first access, see `_SpotiwiseBase.lazy`.
+        :param intern_objects:
+            When True, the client keeps an `IdentityMap` so each artist,
+            album and track ID maps to one shared object, nested ones
+            included, enriched as more complete versions are fetched.
+        :param user_cache_size:
+            Number of SpotiwiseUser profiles kept in `user_cache`, an LRU
+            shared by the objects built for this client
+        :param user_cache_ttl:
+            Seconds before a cached user profile is fetched again
         """
         self.prefix = "https://api.spotify.com/v1/"
         self._auth = auth
@@ -170,6 +242,21 @@ class Spotify(object):
         self.retries = retries
         self.status_retries = status_retries
         self.language = language
+        self.rate_limiter = rate_limiter
+        self.response_cache = response_cache
+        self.search_cache = search_cache
+        self.lazy_objects = lazy_objects
+        self.identity_map = IdentityMap() if intern_objects else None
+        self.user_cache = TTLCache(maxsize=user_cache_size, ttl=user_cache_ttl)
+        self.single_flight = SingleFlight() if coalesce_requests else None
+        self.max_workers = max_workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._batch_local = threading.local()
+        self._window_loader = (
+            BatchLoader(self, window=batch_window)
+            if batch_window is not None else None
+        )
 
         if isinstance(requests_session, requests.Session):
             self._session = requests_session
@@ -199,6 +286,8 @@ class Spotify(object):
         """Make sure the connection (pool) gets closed"""
         if isinstance(self._session, requests.Session):
             self._session.close()
+        if getattr(self, "_executor", None) is not None:
+            self._executor.shutdown(wait=False)
 
     def _build_session(self):
         self._session = requests.Session()
@@ -208,12 +297,20 @@ class Spotify(object):
             read=False,
             status=self.status_retries,
             backoff_factor=self.backoff_factor,
-            status_forcelist=self.status_forcelist)
+            status_forcelist=self._session_status_forcelist())
 
-        adapter = requests.adapters.HTTPAdapter(max_retries=retry)
+        adapter = requests.adapters.HTTPAdapter(
+            max_retries=retry,
+            pool_maxsize=max(self.max_workers, requests.adapters.DEFAULT_POOLSIZE))
         self._session.mount('http://', adapter)
         self._session.mount('https://', adapter)
 
+    def _session_status_forcelist(self):
+        # 429s are retried by _internal_call through the rate limiter
+        if self.rate_limiter is None:
+            return self.status_forcelist
+        return [code for code in self.status_forcelist if code != 429]
+
     def _auth_headers(self):
         if self._auth:
             return {"Authorization": "Bearer {0}".format(self._auth)}
@@ -225,7 +322,10 @@ class Spotify(object):
             token = self.auth_manager.get_access_token()
         return {"Authorization": "Bearer {0}".format(token)}
 
-    def _internal_call(self, method, url, payload, params):
+    def _prepare_request(self, method, url, payload, params):
+        """ Builds the absolute URL, headers and Requests keyword arguments
+            for an API call. Shared by the sync and async clients.
+        """
         args = dict(params=params)
         if not url.startswith("http"):
             url = self.prefix + url
@@ -246,42 +346,87 @@ class Spotify(object):
 
         logger.debug('Sending %s to %s with Headers: %s and Body: %r ',
                      method, url, headers, args.get('data'))
+        return url, headers, args
+
+    def _http_exception(self, method, url, status_code, error, headers):
+        """ Builds a SpotifyException from an error response
 
+            Parameters:
+                - method - the HTTP method of the failed request
+                - url - the URL of the failed request
+                - status_code - the HTTP status of the response
+                - error - the decoded JSON body of the response, or None
+                - headers - the response headers
+        """
         try:
-            response = self._session.request(
-                method, url, headers=headers, proxies=self.proxies,
-                timeout=self.requests_timeout, **args
-            )
+            msg = error["error"]["message"]
+        except (TypeError, KeyError):
+            msg = "error"
+        try:
+            reason = error["error"]["reason"]
+        except (TypeError, KeyError):
+            reason = None
+
+        logger.error('HTTP Error for %s to %s returned %s due to %s',
+                     method, url, status_code, msg)
+
+        return SpotifyException(
+            status_code,
+            -1,
+            "%s:\n %s" % (url, msg),
+            reason=reason,
+            headers=headers,
+        )
+
+    def _cache_lookup(self, method, url, args, headers):
+        """ Returns the cache key and cached ``(etag, body)`` of a request,
+            adding an `If-None-Match` header when there is a cached response.
+        """
+        if (self.response_cache is None or method != "GET" or "data" in args
+                or url.startswith(self.prefix + "me/")):
+            return None, None
+        params = sorted((k, v) for k, v in args["params"].items() if v is not None)
+        key = url + "?" + urlencode(params) if params else url
+        if self.language is not None:
+            key += "#" + self.language
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            headers["If-None-Match"] = cached[0]
+        return key, cached
 
+    def _cache_store(self, key, response_headers, results, raw):
+        etag = response_headers.get("ETag")
+        if key is not None and etag:
+            self.response_cache.set(key, etag, results, raw)
+
+    def _internal_call(self, method, url, payload, params):
+        url, headers, args = self._prepare_request(method, url, payload, params)
+        cache_key, cached = self._cache_lookup(method, url, args, headers)
+
+        try:
+            response = self._send(method, url, headers, args)
+            if cached is not None and response.status_code == 304:
+                logger.debug('Not modified, using cached response for %s', url)
+                return cached[1]
             response.raise_for_status()
             results = response.json()
+            self._cache_store(cache_key, response.headers, results,
+                              response.content)
         except requests.exceptions.HTTPError:
             try:
-                msg = response.json()["error"]["message"]
-            except (ValueError, KeyError):
-                msg = "error"
-            try:
-                reason = response.json()["error"]["reason"]
-            except (ValueError, KeyError):
-                reason = None
-
-            logger.error('HTTP Error for %s to %s returned %s due to %s',
-                         method, url, response.status_code, msg)
-
-            raise SpotifyException(
-                response.status_code,
-                -1,
-                "%s:\n %s" % (response.url, msg),
-                reason=reason,
-                headers=response.headers,
+                error = response.json()
+            except ValueError:
+                error = None
+            raise self._http_exception(
+                method, response.url, response.status_code, error,
+                response.headers
             )
         except requests.exceptions.RetryError:
             logger.error('Max Retries reached')
             raise SpotifyException(
                 599,
                 -1,
-                "%s:\n %s" % (response.url, "Max Retries"),
-                headers=response.headers,
+                "%s:\n %s" % (url, "Max Retries"),
             )
         except ValueError:
             results = None
@@ -289,10 +434,43 @@ class Spotify(object):
         logger.debug('RESULTS: %s', results)
         return results
 
+    def _send(self, method, url, headers, args):
+        """ Sends a request, going through the rate limiter if there is one """
+        if self.rate_limiter is None:
+            return self._session.request(
+                method, url, headers=headers, proxies=self.proxies,
+                timeout=self.requests_timeout, **args
+            )
+
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            response = self._session.request(
+                method, url, headers=headers, proxies=self.proxies,
+                timeout=self.requests_timeout, **args
+            )
+            if response.status_code != 429 or 429 not in self.status_forcelist:
+                return response
+            self.rate_limiter.pause(self.rate_limiter.retry_after(response.headers))
+            if attempt >= self.status_retries:
+                # the same error as when urllib3 runs out of retries
+                logger.error('Max Retries reached')
+                raise SpotifyException(
+                    599,
+                    -1,
+                    "%s:\n %s" % (url, "Max Retries"),
+                    headers=response.headers,
+                )
+            attempt += 1
+
     def _get(self, url, args=None, payload=None, **kwargs):
         if args:
             kwargs.update(args)
 
+        if self.single_flight is not None and payload is None:
+            key = (url, tuple(sorted((k, repr(v)) for k, v in kwargs.items())))
+            return self.single_flight.do(
+                key, self._internal_call, "GET", url, payload, kwargs)
         return self._internal_call("GET", url, payload, kwargs)
 
     def _post(self, url, args=None, payload=None, **kwargs):
@@ -310,6 +488,98 @@ class Spotify(object):
             kwargs.update(args)
         return self._internal_call("PUT", url, payload, kwargs)
 
+    def _wrap(self, cls, data, **kwargs):
+        """ Builds a Spotiwise object from raw JSON, lazily when
+            `lazy_objects` is set and interned when `intern_objects` is
+        """
+        if self.identity_map is None:
+            if self.lazy_objects:
+                return cls.lazy(data, **kwargs)
+            return cls(**data, **kwargs)
+        with self.identity_map.active():
+            if self.lazy_objects:
+                return _intern(cls.lazy(data, **kwargs))
+            return _intern(cls(**data, **kwargs))
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="spotiwise")
+        return self._executor
+
+    def _run_concurrently(self, fn, iterable):
+        """ Calls fn for every element on the client's thread pool and
+            returns the results in order
+        """
+        args = list(iterable)
+        if len(args) <= 1:
+            return [fn(arg) for arg in args]
+        return list(self._get_executor().map(fn, args))
+
+    def _map_chunks(self, ids, chunk_size, request, key=None, wrap=False):
+        """ Requests API-sized chunks of unique IDs concurrently and returns
+            the per-ID results in the order of `ids`
+
+            Parameters:
+                - ids - a list of IDs, possibly with duplicates
+                - chunk_size - the maximum number of IDs the endpoint accepts
+                - request - called with each chunk of IDs, returns the response
+                - key - the key of the result list in each response, if any
+                - wrap - return the results as {key: results}
+        """
+        chunks = chunk_unique(ids, chunk_size)
+        responses = self._run_concurrently(request, chunks)
+        results = merge_chunk_results(ids, chunks, responses, key)
+        return {key: results} if wrap else results
+
+    def _run_chunks(self, ids, chunk_size, request):
+        """ Sends API-sized chunks of unique IDs concurrently to an endpoint
+            that doesn't return per-ID results
+
+            Parameters:
+                - ids - a list of IDs, possibly with duplicates
+                - chunk_size - the maximum number of IDs the endpoint accepts
+                - request - called with each chunk of IDs
+        """
+        self._run_concurrently(request, chunk_unique(ids, chunk_size))
+
+    @contextlib.contextmanager
+    def batching(self):
+        """ Batches the `track`, `artist` and `album` lookups made by the
+            current thread inside the block.
+
+            Inside the block these methods return futures. The lookups are
+            sent as multi-ID requests when the block exits (or when a batch
+            is full, or a result is requested early)::
+
+                with sp.batching():
+                    futures = [sp.track(t) for t in track_ids]
+                tracks = [f.result() for f in futures]
+        """
+        loader = getattr(self._batch_local, "loader", None)
+        if loader is not None:  # nested block, the outer one flushes
+            yield loader
+            return
+        loader = self._batch_local.loader = BatchLoader(self)
+        try:
+            yield loader
+        finally:
+            self._batch_local.loader = None
+            loader.flush()
+
+    def _batched_lookup(self, type, id):
+        """ Queues a lookup if batching is enabled. Returns a future inside
+            a `batching()` block, the object when `batch_window` is set and
+            None otherwise.
+        """
+        loader = getattr(self._batch_local, "loader", None)
+        if loader is not None:
+            return loader.load(type, self._get_id(type, id))
+        if self._window_loader is not None:
+            return self._window_loader.load(type, self._get_id(type, id)).result()
+        return None
+
     def next(self, result):
         """ returns the next result given a paged result
 
@@ -321,6 +591,41 @@ class Spotify(object):
         else:
             return None
 
+    def all_pages(self, result):
+        """ returns a paged result followed by all of its following pages
+
+            Once the first page reveals `total`, the offsets of the remaining
+            pages are known and they are fetched concurrently on the client's
+            thread pool (see `max_workers`), then returned in order.
+
+            Parameters:
+                - result - a previously returned paged result
+        """
+        return [result] + self._run_concurrently(
+            self._get, remaining_page_urls(result))
+
+    def all_items(self, result):
+        """ returns the items of a paged result and all of its following
+            pages, fetched concurrently
+
+            Parameters:
+                - result - a previously returned paged result
+        """
+        return page_items(self.all_pages(result))
+
+    def _iter_objects(self, result, wrap):
+        """ Yields wrap(item) for every item of a paged result and its
+            following pages, prefetching the next page in the background.
+            Items for which wrap returns None are skipped.
+        """
+        for page in iter_pages(self, result):
+            for item in page.get("items") or []:
+                if item is None:
+                    continue
+                obj = wrap(item)
+                if obj is not None:
+                    yield obj
+
     def previous(self, result):
         """ returns the previous result given a paged result
 
@@ -332,24 +637,42 @@ class Spotify(object):
         else:
             return None
                                
+    def _track(self, track_id):
+        """ returns raw JSON for a single track given the track's ID, URI or URL
+
+            Parameters:
+                - track_id - a spotify URI, URL or ID
+        """
+
+        trid = self._get_id('track', track_id)
+        return self._get('tracks/' + trid)
+
     def track(self, track_id):
         """ return a single track object given the track's ID, URI, or URL
         
             Parameters:
                 - track_id - a spotify URI, URL or ID
         """
-        return SpotiwiseTrack(**self._track(track_id))
+        batched = self._batched_lookup('track', track_id)
+        if batched is not None:
+            return batched
+        return self._wrap(SpotiwiseTrack, self._track(track_id))
 
     def _tracks(self, tracks, market=None):
         """ returns raw JSON for a list of tracks given a list of track IDs, URIs, or URLs
 
             Parameters:
-                - tracks - a list of spotify URIs, URLs or IDs. Maximum: 50 IDs.
+                - tracks - a list of spotify URIs, URLs or IDs. Lists longer
+                           than the API maximum of 50 IDs are split into
+                           concurrent requests.
                 - market - an ISO 3166-1 alpha-2 country code.
         """
 
         tlist = [self._get_id('track', t) for t in tracks]
-        return self._get('tracks/?ids=' + ','.join(tlist), market = market)
+        return self._map_chunks(
+            tlist, 50,
+            lambda chunk: self._get('tracks/?ids=' + ','.join(chunk), market=market),
+            key='tracks', wrap=True)
     
     def tracks(self, tracks, market=None):
         """ returns a list of tracks given a list of track IDs, URIs, or URLs
@@ -360,7 +683,7 @@ class Spotify(object):
         """
         
         results = self._tracks(tracks, market).get('tracks')
-        return [SpotiwiseTrack(**track) for track in results]
+        return [self._wrap(SpotiwiseTrack, track) for track in results]
 
     def _artist(self, artist_id):
         """ returns raw JSON for a single artist given the artist's ID, URI or URL
@@ -378,8 +701,10 @@ class Spotify(object):
             Parameters:
                 - artist_id - an artist ID, URI or URL
         """
-        
-        return SpotiwiseArtist(**self._artist(artist_id))
+        batched = self._batched_lookup('artist', artist_id)
+        if batched is not None:
+            return batched
+        return self._wrap(SpotiwiseArtist, self._artist(artist_id))
 
     def _artists(self, artists):
         """ returns a list of artists given the artist IDs, URIs, or URLs
@@ -389,7 +714,10 @@ class Spotify(object):
         """
 
         tlist = [self._get_id('artist', a) for a in artists]
-        return self._get('artists/?ids=' + ','.join(tlist))
+        return self._map_chunks(
+            tlist, 50,
+            lambda chunk: self._get('artists/?ids=' + ','.join(chunk)),
+            key='artists', wrap=True)
     
     def artists(self, artists):
         """ returns a list of artists given the artist IDs, URIs, or URLs
@@ -399,7 +727,7 @@ class Spotify(object):
         """
         
         results = self._artists(artists).get('artists')
-        return [SpotiwiseArtist(**artist) for artist in results]
+        return [self._wrap(SpotiwiseArtist, artist) for artist in results]
 
 
     # TODO: Migrate to Spotiwise object model
@@ -424,6 +752,19 @@ class Spotify(object):
             offset=offset,
         )
 
+    def iter_artist_albums(self, artist_id, album_type=None, country=None):
+        """ Yields every album of an artist as SpotiwiseAlbum objects, one
+            page of 50 at a time, prefetching the next page in the background
+
+            Parameters:
+                - artist_id - the artist ID, URI or URL
+                - album_type - 'album', 'single', 'appears_on', 'compilation'
+                - country - limit the response to one particular country.
+        """
+        result = self.artist_albums(
+            artist_id, album_type=album_type, country=country, limit=50)
+        return self._iter_objects(result, lambda album: self._wrap(SpotiwiseAlbum, album))
+
     def _artist_top_tracks(self, artist_id, country='US'):
         """ Get raw JSON for Spotify catalog information about an artist's top 10 tracks
             by country.
@@ -447,7 +788,7 @@ class Spotify(object):
         """
 
         results = self._artist_top_tracks(artist_id, country).get('tracks')
-        return [SpotiwiseTrack(**track) for track in results]
+        return [self._wrap(SpotiwiseTrack, track) for track in results]
 
     def _artist_related_artists(self, artist_id):
         """ Get raw JSON for Spotify catalog information about artists similar to an
@@ -470,8 +811,8 @@ class Spotify(object):
                 - artist_id - the artist ID, URI or URL
         """
 
-        results = self._artist_related_artists(artists).get('artists')
-        return [SpotiwiseArtist(**artist) for artist in results]
+        results = self._artist_related_artists(artist_id).get('artists')
+        return [self._wrap(SpotiwiseArtist, artist) for artist in results]
 
     def _album(self, album_id):
         """ returns raw JSON for a single album given the album's ID, URIs or URL
@@ -489,8 +830,10 @@ class Spotify(object):
             Parameters:
                 - album_id - the album ID, URI or URL
         """
-
-        return SpotiwiseAlbum(**self._album(album_id))
+        batched = self._batched_lookup('album', album_id)
+        if batched is not None:
+            return batched
+        return self._wrap(SpotiwiseAlbum, self._album(album_id))
 
     # TODO: Migrate to Spotiwise object model
     def album_tracks(self, album_id, limit=50, offset=0, market='US'):
@@ -509,6 +852,17 @@ class Spotify(object):
             "albums/" + trid + "/tracks/", limit=limit, offset=offset, market=market
         )
 
+    def iter_album_tracks(self, album_id, market=None):
+        """ Yields every track of an album as SpotiwiseTrack objects, one
+            page of 50 at a time, prefetching the next page in the background
+
+            Parameters:
+                - album_id - the album ID, URI or URL
+                - market - an ISO 3166-1 alpha-2 country code.
+        """
+        result = self.album_tracks(album_id, limit=50, market=market)
+        return self._iter_objects(result, lambda track: self._wrap(SpotiwiseTrack, track))
+
     def _albums(self, albums):
         """ returns raw JSON for a list of albums given the album IDs, URIs, or URLs
 
@@ -517,7 +871,10 @@ class Spotify(object):
         """
 
         tlist = [self._get_id('album', a) for a in albums]
-        return self._get('albums/?ids=' + ','.join(tlist))
+        return self._map_chunks(
+            tlist, 20,
+            lambda chunk: self._get('albums/?ids=' + ','.join(chunk)),
+            key='albums', wrap=True)
 
     def albums(self, albums):
         """ returns a list of albums given the album IDs, URIs, or URLs
@@ -527,7 +884,7 @@ class Spotify(object):
         """
 
         results = self._albums(albums).get('albums')
-        return [SpotiwiseAlbum(**album) for album in results]
+        return [self._wrap(SpotiwiseAlbum, album) for album in results]
 
     def show(self, show_id, market=None):
         """ returns a single show given the show's ID, URIs or URL
@@ -557,7 +914,10 @@ class Spotify(object):
         """
 
         tlist = [self._get_id("show", s) for s in shows]
-        return self._get("shows/?ids=" + ",".join(tlist), market=market)
+        return self._map_chunks(
+            tlist, 50,
+            lambda chunk: self._get("shows/?ids=" + ",".join(chunk), market=market),
+            key="shows", wrap=True)
 
     def show_episodes(self, show_id, limit=50, offset=0, market=None):
         """ Get Spotify catalog information about a show's episodes
@@ -606,7 +966,10 @@ class Spotify(object):
         """
 
         tlist = [self._get_id("episode", e) for e in episodes]
-        return self._get("episodes/?ids=" + ",".join(tlist), market=market)
+        return self._map_chunks(
+            tlist, 50,
+            lambda chunk: self._get("episodes/?ids=" + ",".join(chunk), market=market),
+            key="episodes", wrap=True)
 
     def search(self, q, limit=10, offset=0, type="track", market=None):
         """ searches for an item
@@ -621,13 +984,70 @@ class Spotify(object):
                 - market - An ISO 3166-1 alpha-2 country code or the string
                            from_token.
         """
-        return self._get(
+        if self.search_cache is not None:
+            cached = self.search_cache.get(q, type, market, limit, offset)
+            if cached is not None:
+                return cached
+        result = self._get(
             "search", q=q, limit=limit, offset=offset, type=type, market=market
         )
+        if self.search_cache is not None:
+            self.search_cache.put(q, type, market, limit, offset, result)
+        return result
+
+    def search_all(self, q, type="track", market=None, concurrency=None):
+        """ Yields every item matching a search query as Spotiwise objects,
+            including those past the API's 1,000 result offset cap
+
+            A query over the cap is split into `year:` ranges, bisected
+            until each fits, and the partitions are searched concurrently.
+            Items are yielded as soon as their page arrives, in no
+            particular order and without duplicates. Only album, artist and
+            track searches can be partitioned; other types stop at the cap.
+
+            Parameters:
+                - q - the search query
+                - type - the type of item to return. One of 'artist', 'album',
+                         'track', 'playlist', 'show', or 'episode'
+                - market - An ISO 3166-1 alpha-2 country code or the string
+                           from_token.
+                - concurrency - the maximum number of requests in flight,
+                                `max_workers` by default
+        """
+        wrappers = {
+            "album": lambda item: self._wrap(SpotiwiseAlbum, item),
+            "artist": lambda item: self._wrap(SpotiwiseArtist, item),
+            "playlist": lambda item: self._wrap(SpotiwisePlaylist, item, sp=self),
+            "track": lambda item: self._wrap(SpotiwiseTrack, item),
+        }
+        wrap = wrappers.get(type, lambda item: item)
+        for item in crawl(self, q, type, market, concurrency):
+            yield wrap(item)
+
+    def search_columns(self, q, market=None, concurrency=None):
+        """ Returns every track matching a search query as a
+            ColumnarPlaylist, built from the raw results of `search_all`
+
+            Parameters:
+                - q - the search query
+                - market - An ISO 3166-1 alpha-2 country code or the string
+                           from_token.
+                - concurrency - the maximum number of requests in flight,
+                                `max_workers` by default
+        """
+        columns = ColumnarPlaylist()
+        columns.extend_tracks(crawl(self, q, "track", market, concurrency))
+        return columns
 
-    def search_markets(self, q, limit=10, offset=0, type="track", markets=None, total=None):
+    def search_markets(self, q, limit=10, offset=0, type="track", markets=None, total=None,
+                       concurrency=None):
         """ searches multple markets for an item
 
+            Markets are searched concurrently, with at most `concurrency`
+            requests in flight at a time. Results are collected in market
+            order and, once `total` is reached, the markets not yet
+            requested are cancelled.
+
             Parameters:
                 - q - the search query (see how to write a query in the
                       official documentation https://developer.spotify.com/documentation/web-api/reference/search/search/)  # noqa
@@ -639,6 +1059,8 @@ class Spotify(object):
                 - markets - A list of ISO 3166-1 alpha-2 country codes. Search all country markets by default.
                 - total - the total number of results to return if multiple markets are supplied in the search.
                           If multiple types are specified, this only applies to the first type.
+                - concurrency - the maximum number of markets searched at
+                                once, `max_workers` by default
         """
         if not markets:
             markets = self.country_codes
@@ -646,11 +1068,8 @@ class Spotify(object):
         if not (isinstance(markets, list) or isinstance(markets, tuple)):
             markets = []
 
-        warnings.warn(
-            "Searching multiple markets is poorly performing.",
-            UserWarning,
-        )
-        return self._search_multiple_markets(q, limit, offset, type, markets, total)
+        return self._search_multiple_markets(
+            q, limit, offset, type, markets, total, concurrency)
 
     def _user(self, user):
         """ Gets raw JSON for basic profile information about a Spotify User
@@ -660,13 +1079,39 @@ class Spotify(object):
         """
         return self._get('users/' + user)
 
+    def _user_or_none(self, user):
+        try:
+            return self._user(user)
+        except SpotifyException:
+            return None
+
+    def resolve_users(self, users=None):
+        """ Fetches the profiles of SpotiwiseUser stubs concurrently, one
+            request per distinct unresolved user ID, and returns the users
+
+            Parameters:
+                - users - a list of SpotiwiseUser objects, every user in
+                          `user_cache` by default
+        """
+        if users is None:
+            users = self._cached_users()
+        pending = [user for user in users if user is not None and not user.resolved]
+        ids = list(dict.fromkeys(user.id for user in pending))
+        profiles = dict(zip(ids, self._run_concurrently(self._user_or_none, ids)))
+        for user in pending:
+            user._apply_profile(profiles[user.id])
+        return users
+
+    def _cached_users(self):
+        return [user for user in self.user_cache.values() if isinstance(user, SpotiwiseUser)]
+
     def user(self, user):
         """ Gets basic profile information about a Spotify User
 
             Parameters:
                 - user - the id of the usr
         """
-        return SpotiwiseUser(**self._user(user))
+        return self._wrap(SpotiwiseUser, self._user(user))
 
     def _current_user_playlists(self, limit=50, offset=0):
         """ Get raw JSON for current user playlists without required getting his profile
@@ -683,7 +1128,9 @@ class Spotify(object):
                 - offset - the index of the first item to return
         """
         results = self._current_user_playlists(limit, offset).get('items')
-        return [SpotiwisePlaylist(sp=self, **playlist) for playlist in results]
+        playlists = [self._wrap(SpotiwisePlaylist, playlist, sp=self) for playlist in results]
+        _group_users(playlist.owner for playlist in playlists)
+        return playlists
 
     def playlist_tracks(
         self,
@@ -743,6 +1190,55 @@ class Spotify(object):
             additional_types=",".join(additional_types)
         )
 
+    def iter_playlist_items(self, playlist_id, fields=None, market=None):
+        """ Yields every track of a playlist as SpotiwiseItem objects, one
+            page of 100 at a time, prefetching the next page in the
+            background. Unavailable tracks are skipped.
+
+            Parameters:
+                - playlist_id - the id of the playlist
+                - fields - which fields to return
+                - market - an ISO 3166-1 alpha-2 country code.
+        """
+        result = self.playlist_items(
+            playlist_id, fields=fields, limit=100, market=market,
+            additional_types=("track",))
+        return self._iter_objects(
+            result,
+            lambda item: self._wrap(SpotiwiseItem, item) if item.get("track") else None)
+
+    def export_playlist(self, playlist_id, file, format="csv", columns=None, market=None):
+        """ Streams every track of a playlist to a file as CSV or NDJSON,
+            writing each page while the next one is downloaded, and
+            returns the number of rows written (see `export_objects`)
+
+            Parameters:
+                - playlist_id - the id of the playlist
+                - file - a text file, or a binary one for ``ndjson.gz``
+                - format - 'csv', 'ndjson' or 'ndjson.gz'
+                - columns - ``(header, path)`` pairs, derived from
+                            `SpotiwiseItem.repr_attributes` by default
+                - market - an ISO 3166-1 alpha-2 country code.
+        """
+        return export_objects(self.iter_playlist_items(playlist_id, market=market),
+                              file, format, columns, cls=SpotiwiseItem)
+
+    def playlist_columns(self, playlist_id, market=None):
+        """ Returns every track of a playlist as a ColumnarPlaylist, loading
+            only the fields it stores and fetching the pages concurrently
+
+            Parameters:
+                - playlist_id - the id of the playlist
+                - market - an ISO 3166-1 alpha-2 country code.
+        """
+        result = self.playlist_items(
+            playlist_id, fields=ColumnarPlaylist.fields, limit=100, market=market,
+            additional_types=("track",))
+        columns = ColumnarPlaylist()
+        for page in self.all_pages(result):
+            columns.extend(page.get("items") or [])
+        return columns
+
     def playlist_cover_image(self, playlist_id):
         """ Get cover of a playlist.
 
@@ -794,7 +1290,8 @@ class Spotify(object):
                 - fields - which fields to return
         """
 
-        return SpotiwisePlaylist(**self._user_playlist(user, playlist_id, fields), sp=self, precache=precache)
+        return self._wrap(SpotiwisePlaylist, self._user_playlist(user, playlist_id, fields),
+                          sp=self, precache=precache)
 
     # TODO: Determine if candidate to migrate to Spotiwise object model or for deprecation
     def user_playlist_tracks(self, user, playlist_id=None, fields=None,
@@ -838,8 +1335,31 @@ class Spotify(object):
                 - offset - the index of the first item to return
         """
 
-        results = self._user_playlists(limit, offset).get('items')
-        return [SpotiwisePlaylist(sp=self, **playlist) for playlist in results]
+        results = self._user_playlists(user, limit, offset).get('items')
+        playlists = [self._wrap(SpotiwisePlaylist, playlist, sp=self) for playlist in results]
+        _group_users(playlist.owner for playlist in playlists)
+        return playlists
+
+    def iter_user_playlists(self, user):
+        """ Yields every playlist of a user as SpotiwisePlaylist objects,
+            one page of 50 at a time, prefetching the next page in the
+            background
+
+            Parameters:
+                - user - the id of the usr
+        """
+        result = self._user_playlists(user, limit=50)
+        return self._iter_objects(
+            result, lambda playlist: self._wrap(SpotiwisePlaylist, playlist, sp=self))
+
+    def iter_current_user_playlists(self):
+        """ Yields every playlist of the current user as SpotiwisePlaylist
+            objects, one page of 50 at a time, prefetching the next page in
+            the background
+        """
+        result = self._current_user_playlists(limit=50)
+        return self._iter_objects(
+            result, lambda playlist: self._wrap(SpotiwisePlaylist, playlist, sp=self))
 
     def user_playlist_create(self, user, name, public=True, collaborative=False, description=""):
         """ Creates a playlist for a user
@@ -1156,6 +1676,80 @@ class Spotify(object):
             "playlists/%s/tracks" % (plid), payload=payload
         )
 
+    def sync_playlist(self, playlist_id, target_uris):
+        """ Makes a playlist contain exactly `target_uris`, in order, with
+            as few requests as possible.
+
+            Unlike `playlist_replace_items`, tracks that stay keep their
+            `added_at`: surplus occurrences are removed in batches of 100,
+            tracks out of order are moved with range reorders, kept to a
+            minimum by leaving a longest common subsequence in place, and
+            new tracks are added in batches of consecutive positions. Each
+            request carries the `snapshot_id` returned by the previous one
+            (see `spotiwise.diff.sync_plan`).
+
+            Returns a dict with the final `snapshot_id`, the number of
+            `requests` sent and the numbers of tracks `removed`, `moved`
+            and `added`.
+
+            Raises ValueError, before sending any change, if the playlist
+            holds a local track or an item whose track is no longer
+            available, since neither can be removed or moved by URI.
+
+            Parameters:
+                - playlist_id - the id of the playlist
+                - target_uris - the wanted track URIs, URLs or IDs
+        """
+        plid = self._get_id("playlist", playlist_id)
+        snapshot_id = self._get("playlists/%s" % plid, fields="snapshot_id")["snapshot_id"]
+        result = self.playlist_items(plid, fields=self._sync_fields, limit=100)
+        current = self._sync_uris(self.all_pages(result))
+        summary = dict(snapshot_id=snapshot_id, requests=0, removed=0, moved=0, added=0)
+        for operation in sync_plan(current, [self._sync_uri(uri) for uri in target_uris]):
+            response = self._sync_request(plid, operation, summary["snapshot_id"])
+            self._sync_count(summary, operation, response)
+        return summary
+
+    # the playlist items fields `sync_playlist` reads
+    _sync_fields = "items(track(uri)),limit,next,offset,total"
+
+    def _sync_uri(self, uri):
+        return uri if uri.startswith("spotify:") else self._get_uri("track", uri)
+
+    @staticmethod
+    def _sync_uris(pages):
+        return [(item.get("track") or {}).get("uri")
+                for page in pages for item in page.get("items") or []]
+
+    def _sync_request(self, playlist_id, operation, snapshot_id):
+        """ Sends one operation of a sync plan """
+        if operation[0] == "remove":
+            positions = {}
+            for uri, position in operation[1]:
+                positions.setdefault(uri, []).append(position)
+            return self.playlist_remove_specific_occurrences_of_items(
+                playlist_id, [{"uri": uri, "positions": found}
+                              for uri, found in positions.items()],
+                snapshot_id=snapshot_id)
+        if operation[0] == "reorder":
+            _, start, length, insert_before = operation
+            return self.playlist_reorder_items(
+                playlist_id, start, insert_before, range_length=length,
+                snapshot_id=snapshot_id)
+        _, uris, position = operation
+        return self.playlist_add_items(playlist_id, uris, position=position)
+
+    @staticmethod
+    def _sync_count(summary, operation, response):
+        summary["requests"] += 1
+        summary["snapshot_id"] = (response or {}).get("snapshot_id", summary["snapshot_id"])
+        if operation[0] == "reorder":
+            summary["moved"] += operation[2]
+        elif operation[0] == "remove":
+            summary["removed"] += len(operation[1])
+        else:
+            summary["added"] += len(operation[1])
+
     def playlist_remove_all_occurrences_of_items(
         self, playlist_id, items, snapshot_id=None
     ):
@@ -1267,7 +1861,7 @@ class Spotify(object):
                 - offset - the index of the first album to return
 
         """
-        return self._get("me/player/currently-playing")
+        return self._get("me/albums", limit=limit, offset=offset)
 
     # TODO: Migrate to Spotiwise object model
     def current_user_saved_tracks(self, limit=20, offset=0):
@@ -1281,6 +1875,57 @@ class Spotify(object):
         """
         return self._get("me/tracks", limit=limit, offset=offset)
 
+    def iter_saved_tracks(self, market=None):
+        """ Yields every track saved in the current user's "Your Music"
+            library as SpotiwiseItem objects, one page of 50 at a time,
+            prefetching the next page in the background
+
+            Parameters:
+                - market - an ISO 3166-1 alpha-2 country code.
+        """
+        result = self._get("me/tracks", limit=50, market=market)
+        return self._iter_objects(result, lambda item: self._wrap(SpotiwiseItem, item))
+
+    def export_saved_tracks(self, file, format="csv", columns=None, market=None):
+        """ Streams every track saved in the current user's "Your Music"
+            library to a file as CSV or NDJSON, in constant memory, and
+            returns the number of rows written (see `export_objects`)
+
+            Parameters:
+                - file - a text file, or a binary one for ``ndjson.gz``
+                - format - 'csv', 'ndjson' or 'ndjson.gz'
+                - columns - ``(header, path)`` pairs, derived from
+                            `SpotiwiseItem.repr_attributes` by default
+                - market - an ISO 3166-1 alpha-2 country code.
+        """
+        return export_objects(self.iter_saved_tracks(market=market),
+                              file, format, columns, cls=SpotiwiseItem)
+
+    def saved_tracks_columns(self, market=None):
+        """ Returns every track saved in the current user's "Your Music"
+            library as a ColumnarPlaylist, fetching the pages concurrently
+
+            Parameters:
+                - market - an ISO 3166-1 alpha-2 country code.
+        """
+        result = self._get("me/tracks", limit=50, market=market)
+        columns = ColumnarPlaylist()
+        for page in self.all_pages(result):
+            columns.extend(page.get("items") or [])
+        return columns
+
+    def iter_saved_albums(self, market=None):
+        """ Yields every album saved in the current user's "Your Music"
+            library as SpotiwiseAlbum objects, one page of 50 at a time,
+            prefetching the next page in the background
+
+            Parameters:
+                - market - an ISO 3166-1 alpha-2 country code.
+        """
+        result = self._get("me/albums", limit=50, market=market)
+        return self._iter_objects(
+            result, lambda item: self._wrap(SpotiwiseAlbum, item["album"]))
+
     # TODO: Migrate to Spotiwise object model
     def current_user_followed_artists(self, limit=20, after=None):
         """ Gets a list of the artists followed by the current authorized user
@@ -1295,6 +1940,26 @@ class Spotify(object):
             "me/following", type="artist", limit=limit, after=after
         )
 
+    def sync_followed_artists(self, checkpoints, key="followed_artists"):
+        """ Returns the artists followed past the cursor stored under `key`
+            as SpotiwiseArtist objects, then moves the cursor to the last
+            artist returned. The first sync returns every followed artist.
+
+            Parameters:
+                - checkpoints - a CheckpointStore
+                - key - the checkpoint key, e.g. one per user
+        """
+        after = checkpoints.get(key)
+        artists = []
+        result = self.current_user_followed_artists(limit=50, after=after)
+        for page in iter_cursor_pages(self, result, "artists"):
+            artists.extend(
+                self._wrap(SpotiwiseArtist, artist)
+                for artist in page.get("items") or [] if artist)
+        if artists:
+            checkpoints.set(key, artists[-1].id)
+        return artists
+
     def current_user_following_artists(self, ids=None):
         """ Check if the current user is following certain artists
 
@@ -1306,9 +1971,10 @@ class Spotify(object):
         idlist = []
         if ids is not None:
             idlist = [self._get_id("artist", i) for i in ids]
-        return self._get(
-            "me/following/contains", ids=",".join(idlist), type="artist"
-        )
+        return self._map_chunks(
+            idlist, 50,
+            lambda chunk: self._get(
+                "me/following/contains", ids=",".join(chunk), type="artist"))
 
     def current_user_following_users(self, ids=None):
         """ Check if the current user is following certain artists
@@ -1321,9 +1987,10 @@ class Spotify(object):
         idlist = []
         if ids is not None:
             idlist = [self._get_id("user", i) for i in ids]
-        return self._get(
-            "me/following/contains", ids=",".join(idlist), type="user"
-        )
+        return self._map_chunks(
+            idlist, 50,
+            lambda chunk: self._get(
+                "me/following/contains", ids=",".join(chunk), type="user"))
 
     def current_user_saved_tracks_delete(self, tracks=None):
         """ Remove one or more tracks from the current user's
@@ -1335,7 +2002,9 @@ class Spotify(object):
         tlist = []
         if tracks is not None:
             tlist = [self._get_id("track", t) for t in tracks]
-        return self._delete("me/tracks/?ids=" + ",".join(tlist))
+        return self._run_chunks(
+            tlist, 50,
+            lambda chunk: self._delete("me/tracks/?ids=" + ",".join(chunk)))
 
     def current_user_saved_tracks_contains(self, tracks=None):
         """ Check if one or more tracks is already saved in
@@ -1347,7 +2016,9 @@ class Spotify(object):
         tlist = []
         if tracks is not None:
             tlist = [self._get_id("track", t) for t in tracks]
-        return self._get("me/tracks/contains?ids=" + ",".join(tlist))
+        return self._map_chunks(
+            tlist, 50,
+            lambda chunk: self._get("me/tracks/contains?ids=" + ",".join(chunk)))
 
     def current_user_saved_tracks_add(self, tracks=None):
         """ Add one or more tracks to the current user's
@@ -1359,7 +2030,9 @@ class Spotify(object):
         tlist = []
         if tracks is not None:
             tlist = [self._get_id("track", t) for t in tracks]
-        return self._put("me/tracks/?ids=" + ",".join(tlist))
+        return self._run_chunks(
+            tlist, 50,
+            lambda chunk: self._put("me/tracks/?ids=" + ",".join(chunk)))
 
     def current_user_top_artists(
         self, limit=20, offset=0, time_range="medium_term"
@@ -1392,7 +2065,7 @@ class Spotify(object):
         )
 
     # TODO: Migrate to Spotiwise object model
-    def current_user_recently_played(self, limit=50):
+    def current_user_recently_played(self, limit=50, after=None, before=None):
         """ Get the current user's recently played tracks
 
             Parameters:
@@ -1411,6 +2084,35 @@ class Spotify(object):
             before=before,
         )
 
+    def sync_recently_played(self, checkpoints, key="recently_played"):
+        """ Returns the tracks played since the last sync, oldest first, as
+            play history items (with `track`, `played_at` and `context`)
+
+            Only plays newer than the cursor stored under `key` are
+            requested, and the cursor is moved forward once they have all
+            been fetched. The first sync returns the plays the API still
+            remembers (the last 50).
+
+            Parameters:
+                - checkpoints - a CheckpointStore
+                - key - the checkpoint key, e.g. one per user
+        """
+        after = checkpoints.get(key)
+        plays = []
+        page = self.current_user_recently_played(limit=50, after=after)
+        while page and page.get("items"):
+            fresh = new_plays(page["items"], after)
+            if not fresh:
+                break
+            plays.extend(fresh)
+            after = played_at_ms(fresh[-1])
+            if not page.get("next") or len(page["items"]) < page.get("limit", 50):
+                break
+            page = self.current_user_recently_played(limit=50, after=after)
+        if plays:
+            checkpoints.set(key, after)
+        return new_plays(plays)
+
     def current_user_saved_albums_contains(self, albums=[]):
         """ Check if one or more albums is already saved in
             the current Spotify user’s “Your Music” library.
@@ -1419,7 +2121,9 @@ class Spotify(object):
                 - albums - a list of album URIs, URLs or IDs
         """
         alist = [self._get_id("album", a) for a in albums]
-        return self._get("me/albums/contains?ids=" + ",".join(alist))
+        return self._map_chunks(
+            alist, 20,
+            lambda chunk: self._get("me/albums/contains?ids=" + ",".join(chunk)))
 
     def current_user_saved_albums_add(self, albums=[]):
         """ Add one or more albums to the current user's
@@ -1428,7 +2132,9 @@ class Spotify(object):
                 - albums - a list of album URIs, URLs or IDs
         """
         alist = [self._get_id("album", a) for a in albums]
-        return self._put("me/albums?ids=" + ",".join(alist))
+        return self._run_chunks(
+            alist, 20,
+            lambda chunk: self._put("me/albums?ids=" + ",".join(chunk)))
 
     def current_user_saved_albums_delete(self, albums=[]):
         """ Remove one or more albums from the current user's
@@ -1438,7 +2144,9 @@ class Spotify(object):
                 - albums - a list of album URIs, URLs or IDs
         """
         alist = [self._get_id("album", a) for a in albums]
-        return self._delete("me/albums/?ids=" + ",".join(alist))
+        return self._run_chunks(
+            alist, 20,
+            lambda chunk: self._delete("me/albums/?ids=" + ",".join(chunk)))
 
     def current_user_saved_shows(self, limit=50, offset=0):
         """ Gets a list of the shows saved in the current authorized user's
@@ -1459,7 +2167,9 @@ class Spotify(object):
                 - shows - a list of show URIs, URLs or IDs
         """
         slist = [self._get_id("show", s) for s in shows]
-        return self._get("me/shows/contains?ids=" + ",".join(slist))
+        return self._map_chunks(
+            slist, 50,
+            lambda chunk: self._get("me/shows/contains?ids=" + ",".join(chunk)))
 
     def current_user_saved_shows_add(self, shows=[]):
         """ Add one or more albums to the current user's
@@ -1468,7 +2178,9 @@ class Spotify(object):
                 - shows - a list of show URIs, URLs or IDs
         """
         slist = [self._get_id("show", s) for s in shows]
-        return self._put("me/shows?ids=" + ",".join(slist))
+        return self._run_chunks(
+            slist, 50,
+            lambda chunk: self._put("me/shows?ids=" + ",".join(chunk)))
 
     def current_user_saved_shows_delete(self, shows=[]):
         """ Remove one or more shows from the current user's
@@ -1478,7 +2190,9 @@ class Spotify(object):
                 - shows - a list of show URIs, URLs or IDs
         """
         slist = [self._get_id("show", s) for s in shows]
-        return self._delete("me/shows/?ids=" + ",".join(slist))
+        return self._run_chunks(
+            slist, 50,
+            lambda chunk: self._delete("me/shows/?ids=" + ",".join(chunk)))
 
     def user_follow_artists(self, ids=[]):
         """ Follow one or more artists
@@ -1667,14 +2381,19 @@ class Spotify(object):
     def audio_features(self, tracks=[]):
         """ Get audio features for one or multiple tracks based upon their Spotify IDs
             Parameters:
-                - tracks - a list of track URIs, URLs or IDs, maximum: 100 ids
+                - tracks - a list of track URIs, URLs or IDs. Lists longer
+                           than the API maximum of 100 IDs are split into
+                           concurrent requests.
         """
         if isinstance(tracks, str):
             trackid = self._get_id("track", tracks)
             results = self._get("audio-features/?ids=" + trackid)
         else:
             tlist = [self._get_id("track", t) for t in tracks]
-            results = self._get("audio-features/?ids=" + ",".join(tlist))
+            return self._map_chunks(
+                tlist, 100,
+                lambda chunk: self._get("audio-features/?ids=" + ",".join(chunk)),
+                key="audio_features")
         # the response has changed, look for the new style first, and if
         # its not there, fallback on the old style
         if "audio_features" in results:
@@ -1822,7 +2541,7 @@ class Spotify(object):
         if state not in ["track", "context", "off"]:
             logger.warning("Invalid state")
             return
-        self._put(
+        return self._put(
             self._append_device_id(
                 "me/player/repeat?state=%s" % state, device_id
             )
@@ -1841,7 +2560,7 @@ class Spotify(object):
         if volume_percent < 0 or volume_percent > 100:
             logger.warning("Volume must be between 0 and 100, inclusive")
             return
-        self._put(
+        return self._put(
             self._append_device_id(
                 "me/player/volume?volume_percent=%s" % volume_percent,
                 device_id,
@@ -1859,7 +2578,7 @@ class Spotify(object):
             logger.warning("state must be a boolean")
             return
         state = str(state).lower()
-        self._put(
+        return self._put(
             self._append_device_id(
                 "me/player/shuffle?state=%s" % state, device_id
             )
@@ -1921,7 +2640,8 @@ class Spotify(object):
     def _get_uri(self, type, id):
         return "spotify:" + type + ":" + self._get_id(type, id)
 
-    def _search_multiple_markets(self, q, limit, offset, type, markets, total):
+    def _search_multiple_markets(self, q, limit, offset, type, markets, total,
+                                 concurrency=None):
         if total and limit > total:
             limit = total
             warnings.warn(
@@ -1930,22 +2650,39 @@ class Spotify(object):
                 UserWarning,
             )
 
+        def search(country):
+            return self.search(q, limit=limit, offset=offset, type=type, market=country)
+
         results = {}
         first_type = type.split(",")[0] + 's'
         count = 0
-
-        for country in markets:
-            result = self._get(
-                "search", q=q, limit=limit, offset=offset, type=type, market=country
-            )
+        executor = self._get_executor()
+        window = max(1, concurrency or self.max_workers)
+        pending = collections.deque()
+        countries = iter(markets)
+
+        for country in itertools.islice(countries, window):
+            pending.append((country, executor.submit(search, country)))
+
+        while pending:
+            country, future = pending.popleft()
+            result = future.result()
+            if total:
+                # concurrent requests all use the same `limit`, so trim the
+                # market that crosses `total`, on a copy since the result may
+                # be shared with the response cache or a coalesced request
+                page = result[first_type]
+                if len(page['items']) > total - count:
+                    result = dict(result)
+                    result[first_type] = dict(page, items=page['items'][:total - count])
             results[country] = result
 
             count += len(result[first_type]['items'])
             if total and count >= total:
+                for _, outstanding in pending:
+                    outstanding.cancel()
                 break
-            if total and limit > total - count:
-                # when approaching `total` results, adjust `limit` to not request more
-                # items than needed
-                limit = total - count
+            for country in itertools.islice(countries, 1):
+                pending.append((country, executor.submit(search, country)))
 
         return results
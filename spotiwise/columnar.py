@@ -0,0 +1,402 @@
+# -*- coding: utf-8 -*-
+
+""" A compact, column-oriented representation of playlist items """
+
+__all__ = ["ColumnarPlaylist"]
+
+import calendar
+import importlib
+import logging
+import time
+from array import array
+
+from .object_classes import SpotiwiseItem, SpotiwiseTrack, SpotiwiseUserFactory
+
+logger = logging.getLogger(__name__)
+
+NAN = float("nan")
+
+# optional dependencies, imported on first use by `_optional` so that
+# importing spotiwise never loads them
+_UNLOADED = object()
+numpy = pyarrow = pandas = _UNLOADED
+
+
+def _optional(name):
+    """ Returns the optional dependency `name` (numpy, pyarrow or pandas),
+        or None when it isn't installed, importing it once
+    """
+    module = globals()[name]
+    if module is _UNLOADED:
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            module = None
+        globals()[name] = module
+    return module
+
+
+class _StringColumn(object):
+    """ Strings stored back to back in one str, with an array of offsets """
+
+    def __init__(self):
+        self._parts = []
+        self._data = ""
+        self.offsets = array("L", [0])
+
+    def append(self, value):
+        value = value or ""
+        self._parts.append(value)
+        self.offsets.append(self.offsets[-1] + len(value))
+
+    def _compact(self):
+        if self._parts:
+            self._data += "".join(self._parts)
+            self._parts = []
+
+    def __getitem__(self, i):
+        self._compact()
+        return self._data[self.offsets[i]:self.offsets[i + 1]] or None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def tolist(self):
+        self._compact()
+        return [self._data[start:end] or None
+                for start, end in zip(self.offsets, self.offsets[1:])]
+
+    def to_arrow(self):
+        """ Returns an Arrow string array, empty strings being null. For
+            ASCII data the offsets array is shared, not copied.
+        """
+        self._compact()
+        data = self._data.encode("utf-8")
+        offsets = self.offsets
+        if len(data) != len(self._data):  # character offsets to byte offsets
+            offsets = array(offsets.typecode, [0])
+            for start, end in zip(self.offsets, self.offsets[1:]):
+                offsets.append(offsets[-1] + len(self._data[start:end].encode("utf-8")))
+        numpy, pyarrow = _optional("numpy"), _optional("pyarrow")
+        if numpy is not None:
+            valid = numpy.diff(numpy.frombuffer(self.offsets, dtype=self.offsets.typecode)) > 0
+        else:
+            valid = [end > start for start, end in zip(self.offsets, self.offsets[1:])]
+        bitmap, nulls = _bitmap(valid)
+        type_ = pyarrow.large_string() if offsets.itemsize == 8 else pyarrow.string()
+        return pyarrow.Array.from_buffers(
+            type_, len(self), [bitmap, pyarrow.py_buffer(offsets), pyarrow.py_buffer(data)],
+            null_count=nulls)
+
+
+def _timestamp(value):
+    """ Returns an ISO 8601 UTC timestamp as seconds since the epoch """
+    if not value:
+        return NAN
+    return calendar.timegm(time.strptime(value[:19], "%Y-%m-%dT%H:%M:%S"))
+
+
+def _valid(values, predicate):
+    """ Returns where `predicate` holds for an array, as a numpy array when
+        numpy is installed, otherwise as a list
+    """
+    numpy = _optional("numpy")
+    if numpy is not None:
+        return predicate(numpy.frombuffer(values, dtype=values.typecode))
+    return [bool(predicate(value)) for value in values]
+
+
+def _bitmap(valid):
+    """ Packs booleans into an Arrow validity bitmap. Returns the bitmap and
+        the null count, or ``(None, 0)`` when nothing is null.
+    """
+    numpy, pyarrow = _optional("numpy"), _optional("pyarrow")
+    if numpy is not None:
+        valid = numpy.asarray(valid, dtype=bool)
+        nulls = len(valid) - int(valid.sum())
+        if not nulls:
+            return None, 0
+        return pyarrow.py_buffer(numpy.packbits(valid, bitorder="little")), nulls
+    nulls = valid.count(False)
+    if not nulls:
+        return None, 0
+    bits = bytearray((len(valid) + 7) // 8)
+    for i, is_valid in enumerate(valid):
+        if is_valid:
+            bits[i >> 3] |= 1 << (i & 7)
+    return pyarrow.py_buffer(bits), nulls
+
+
+def _arrow_array(values, valid=None):
+    """ Returns an Arrow array sharing the memory of an array.array """
+    pyarrow = _optional("pyarrow")
+    types = {"b": pyarrow.int8(), "d": pyarrow.float64(),
+             "l": pyarrow.int64() if values.itemsize == 8 else pyarrow.int32()}
+    bitmap, nulls = _bitmap(valid) if valid is not None else (None, 0)
+    return pyarrow.Array.from_buffers(
+        types[values.typecode], len(values), [bitmap, pyarrow.py_buffer(values)],
+        null_count=nulls)
+
+
+class ColumnarPlaylist(object):
+    """
+        Playlist items stored column by column in typed arrays instead of
+        as SpotiwiseItem objects, using a small fraction of their memory.
+
+        Columns:
+            - ids, names, artists - strings, packed into one str each
+            - duration_ms - array('l'), milliseconds
+            - popularity - array('b'), -1 when unknown
+            - explicit - array('b'), 0 or 1
+            - added_at - array('d'), seconds since the epoch, NaN when unknown
+            - added_by - array('l') of indexes into `users`, -1 when unknown
+
+        Aggregates and filters run over the arrays, on numpy views of them
+        when numpy is installed. Indexing or iterating builds SpotiwiseItem
+        rows on demand, from the columns only. `to_arrow` and `to_pandas`
+        export the columns as a table without building any row.
+    """
+
+    # the exported table columns, in order
+    column_names = ("id", "name", "artist", "duration_ms", "popularity",
+                    "explicit", "added_at", "added_by")
+
+    # the `fields` filter of a playlist items request loading these columns
+    fields = ("items(added_at,added_by.id,track(id,name,type,duration_ms,"
+              "popularity,explicit,artists(name))),limit,next,offset,total")
+
+    def __init__(self):
+        self.ids = _StringColumn()
+        self.names = _StringColumn()
+        self.artists = _StringColumn()
+        self.duration_ms = array("l")
+        self.popularity = array("b")
+        self.explicit = array("b")
+        self.added_at = array("d")
+        self.added_by = array("l")
+        self.users = []
+        self._user_index = {}
+
+    @classmethod
+    def from_items(cls, items):
+        """ Builds the columns from raw playlist track objects, as found in
+            the `items` of playlist pages. Non-track items are skipped.
+
+            Parameters:
+                - items - an iterable of raw items
+        """
+        columns = cls()
+        columns.extend(items)
+        return columns
+
+    @classmethod
+    def from_playlist(cls, playlist):
+        """ Builds the columns from the items of a loaded SpotiwisePlaylist """
+        columns = cls()
+        for item in playlist.items:
+            track = item.track
+            if not isinstance(track, SpotiwiseTrack):
+                continue
+            added_by = item.added_by.id if item.added_by else None
+            columns._append(track.id, track.name, track.artist, track.duration_ms,
+                            track.popularity, track.explicit, item.added_at, added_by)
+        columns._compact()
+        return columns
+
+    def extend(self, items):
+        """ Appends raw playlist track objects """
+        for item in items:
+            track = item and item.get("track")
+            if not track or track.get("type", "track") != "track":
+                continue
+            artists = track.get("artists") or []
+            self._append(
+                track.get("id"), track.get("name"),
+                artists[0].get("name") if artists else None,
+                track.get("duration_ms"), track.get("popularity"),
+                track.get("explicit"), item.get("added_at"),
+                (item.get("added_by") or {}).get("id"))
+        self._compact()
+
+    def extend_tracks(self, tracks):
+        """ Appends raw track objects, such as search results, which have no
+            `added_at` or `added_by`
+        """
+        self.extend({"track": track} for track in tracks)
+
+    def _append(self, id, name, artist, duration_ms, popularity, explicit,
+                added_at, added_by):
+        self.ids.append(id)
+        self.names.append(name)
+        self.artists.append(artist)
+        self.duration_ms.append(duration_ms or 0)
+        self.popularity.append(-1 if popularity is None else popularity)
+        self.explicit.append(1 if explicit else 0)
+        self.added_at.append(_timestamp(added_at))
+        self._append_user(added_by)
+
+    def _append_user(self, user_id):
+        if user_id is None:
+            self.added_by.append(-1)
+            return
+        index = self._user_index.get(user_id)
+        if index is None:
+            index = self._user_index[user_id] = len(self.users)
+            self.users.append(user_id)
+        self.added_by.append(index)
+
+    def _compact(self):
+        for column in (self.ids, self.names, self.artists):
+            column._compact()
+
+    def __len__(self):
+        return len(self.duration_ms)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("playlist index out of range")
+        id = self.ids[i]
+        track = SpotiwiseTrack(
+            id=id, name=self.names[i],
+            artists=[{"id": None, "name": self.artists[i]}] if self.artists[i] else [],
+            duration_ms=self.duration_ms[i],
+            popularity=None if self.popularity[i] < 0 else self.popularity[i],
+            explicit=bool(self.explicit[i]),
+            uri="spotify:track:" + id if id else None,
+            type="track")
+        added_at = self.added_at[i]
+        user = self.added_by[i]
+        return SpotiwiseItem(
+            track=track,
+            added_at=None if added_at != added_at else
+            time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(added_at)),
+            added_by=SpotiwiseUserFactory.get_instance(id=self.users[user])
+            if user >= 0 else None)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def track_ids(self):
+        """ Returns the track IDs, in playlist order """
+        return [self.ids[i] for i in range(len(self))]
+
+    def as_numpy(self):
+        """ Returns the numeric columns as numpy arrays sharing their memory """
+        numpy = _optional("numpy")
+        if numpy is None:
+            raise ImportError("as_numpy requires numpy: pip install numpy")
+        return dict((name, numpy.frombuffer(getattr(self, name),
+                                            dtype=getattr(self, name).typecode))
+                    for name in ("duration_ms", "popularity", "explicit",
+                                 "added_at", "added_by"))
+
+    def columns(self):
+        """ Returns the columns as a dict of lists keyed by `column_names`,
+            with None for unknown values and `added_at` in seconds since
+            the epoch
+        """
+        return {
+            "id": self.ids.tolist(),
+            "name": self.names.tolist(),
+            "artist": self.artists.tolist(),
+            "duration_ms": self.duration_ms.tolist(),
+            "popularity": [None if p < 0 else p for p in self.popularity],
+            "explicit": [bool(e) for e in self.explicit],
+            "added_at": [None if t != t else t for t in self.added_at],
+            "added_by": [self.users[u] if u >= 0 else None for u in self.added_by],
+        }
+
+    def to_arrow(self):
+        """ Returns the columns as a pyarrow Table.
+
+            The numeric columns and, for ASCII text, the string offsets are
+            shared with the arrays rather than copied; unknown values are
+            null. `added_at` is a UTC timestamp and `added_by` a dictionary
+            column over the user IDs.
+        """
+        pyarrow = _optional("pyarrow")
+        if pyarrow is None:
+            raise ImportError("to_arrow requires pyarrow: pip install pyarrow")
+        self._compact()
+        added_at = _arrow_array(self.added_at, _valid(self.added_at, lambda t: t == t))
+        added_by = pyarrow.DictionaryArray.from_arrays(
+            _arrow_array(self.added_by, _valid(self.added_by, lambda u: u >= 0)),
+            pyarrow.array(self.users, pyarrow.string()))
+        return pyarrow.table({
+            "id": self.ids.to_arrow(),
+            "name": self.names.to_arrow(),
+            "artist": self.artists.to_arrow(),
+            "duration_ms": _arrow_array(self.duration_ms),
+            "popularity": _arrow_array(self.popularity,
+                                       _valid(self.popularity, lambda p: p >= 0)),
+            "explicit": _arrow_array(self.explicit).cast(pyarrow.bool_()),
+            "added_at": added_at.cast(pyarrow.int64(), safe=False).cast(
+                pyarrow.timestamp("s", tz="UTC")),
+            "added_by": added_by,
+        })
+
+    def to_pandas(self):
+        """ Returns the columns as a pandas DataFrame, converted from
+            `to_arrow` when pyarrow is installed
+        """
+        pandas = _optional("pandas")
+        if pandas is None:
+            raise ImportError("to_pandas requires pandas: pip install pandas")
+        if _optional("pyarrow") is not None:
+            return self.to_arrow().to_pandas()
+        frame = pandas.DataFrame(self.columns(), columns=list(self.column_names))
+        frame["popularity"] = frame["popularity"].astype("Int8")
+        frame["added_at"] = pandas.to_datetime(frame["added_at"], unit="s", utc=True)
+        frame["added_by"] = frame["added_by"].astype("category")
+        return frame
+
+    def total_duration_ms(self):
+        """ Returns the sum of the track durations in milliseconds """
+        numpy = _optional("numpy")
+        if numpy is not None:
+            return int(numpy.frombuffer(self.duration_ms, dtype="l").sum())
+        return sum(self.duration_ms)
+
+    def mask(self, column, predicate):
+        """ Returns the row numbers where ``predicate`` holds for `column`.
+
+            With numpy, `predicate` is applied once to the whole column as a
+            numpy array, otherwise to each value, so comparisons such as
+            ``lambda duration: duration > 600000`` work either way.
+        """
+        values = getattr(self, column)
+        numpy = _optional("numpy")
+        if numpy is not None:
+            array_ = numpy.frombuffer(values, dtype=values.typecode)
+            return numpy.flatnonzero(predicate(array_)).tolist()
+        return [i for i, value in enumerate(values) if predicate(value)]
+
+    def take(self, rows):
+        """ Returns a new ColumnarPlaylist with the given row numbers """
+        columns = ColumnarPlaylist()
+        for i in rows:
+            columns.ids.append(self.ids[i])
+            columns.names.append(self.names[i])
+            columns.artists.append(self.artists[i])
+            columns.duration_ms.append(self.duration_ms[i])
+            columns.popularity.append(self.popularity[i])
+            columns.explicit.append(self.explicit[i])
+            columns.added_at.append(self.added_at[i])
+            user = self.added_by[i]
+            columns._append_user(self.users[user] if user >= 0 else None)
+        columns._compact()
+        return columns
+
+    def explicit_only(self):
+        """ Returns the explicit tracks as a new ColumnarPlaylist """
+        return self.take(self.mask("explicit", lambda explicit: explicit == 1))
+
+    def added_by_user(self, user_id):
+        """ Returns the tracks added by `user_id` as a new ColumnarPlaylist """
+        index = self._user_index.get(user_id)
+        if index is None:
+            return ColumnarPlaylist()
+        return self.take(self.mask("added_by", lambda added_by: added_by == index))
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+""" Concurrency helpers shared by the Spotify client """
+
+__all__ = ["SingleFlight"]
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight(object):
+    """
+        Coalesces identical concurrent calls.
+
+        While a call for a given key is in flight, other callers asking for
+        the same key wait for it and share its result (or exception) instead
+        of issuing their own request.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        """ Number of calls currently in flight """
+        return len(self._calls)
+
+    def stats(self):
+        """ Returns the number of coalesced (hits) and issued (misses) calls """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def do(self, key, fn, *args, **kwargs):
+        """ Calls ``fn(*args, **kwargs)`` unless a call for ``key`` is
+            already in flight, in which case its result is returned.
+
+            Parameters:
+                - key - a hashable identifying the call
+                - fn - the function to call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = Future()
+                self.misses += 1
+                leader = True
+            else:
+                self.hits += 1
+                leader = False
+
+        if not leader:
+            logger.debug('Coalescing request for %s', key)
+            return call.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+def chunk_unique(ids, chunk_size):
+    """ Splits a list of IDs into chunks of at most ``chunk_size`` unique IDs,
+        keeping the order in which each ID first appears.
+
+        Parameters:
+            - ids - a list of IDs, possibly with duplicates
+            - chunk_size - the maximum number of IDs per chunk
+    """
+    unique = list(OrderedDict.fromkeys(ids))
+    return [unique[i:i + chunk_size] for i in range(0, len(unique), chunk_size)]
+
+
+def merge_chunk_results(ids, chunks, responses, key=None):
+    """ Maps the per-chunk results of a multi-ID endpoint back onto ``ids``
+
+        Parameters:
+            - ids - the requested IDs, possibly with duplicates
+            - chunks - the chunks built by ``chunk_unique``
+            - responses - the response to each chunk
+            - key - the key of the result list in each response, if any
+    """
+    by_id = {}
+    for chunk, response in zip(chunks, responses):
+        if key is not None and isinstance(response, dict):
+            response = response.get(key)
+        by_id.update(zip(chunk, response or []))
+    return [by_id.get(id) for id in ids]
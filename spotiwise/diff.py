@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+
+""" Differences between playlist snapshots, as adds, removes and moves """
+
+__all__ = ["PlaylistDiff", "diff_playlists", "sync_plan"]
+
+import bisect
+import collections
+import logging
+
+from .object_classes import SpotiwisePlaylist
+
+logger = logging.getLogger(__name__)
+
+# above this many pairs of equal URIs per track, on average, snapshots are
+# matched occurrence by occurrence instead of by longest common subsequence
+MAX_PAIRS_PER_TRACK = 8
+
+# the most tracks a playlist add or remove request accepts
+MAX_ITEMS_PER_REQUEST = 100
+
+
+def track_uris(tracks):
+    """ Returns the track URIs of a playlist, or of a sequence of URIs,
+        tracks or items.
+
+        Raises ValueError for an entry without a track, such as an item
+        whose track is no longer available, and for a local track: neither
+        has a URI that playlist requests accept.
+    """
+    if isinstance(tracks, SpotiwisePlaylist):
+        tracks = tracks.items or []
+    uris = []
+    for position, track in enumerate(tracks):
+        if track is not None and not isinstance(track, str):
+            if getattr(track, "is_local", False):
+                raise ValueError("Track %d is a local track, which cannot be diffed "
+                                 "or synced" % position)
+            track = getattr(track, "track", track)
+            if track is not None:
+                track = track.uri or "spotify:track:%s" % track.id
+        if track is None:
+            raise ValueError("Track %d is missing, e.g. no longer available, and "
+                             "cannot be diffed or synced" % position)
+        if track.startswith("spotify:local:"):
+            raise ValueError("Track %d is a local track, which cannot be diffed "
+                             "or synced" % position)
+        uris.append(track)
+    return uris
+
+
+def increasing_subsequence(values):
+    """ Returns the indexes of a longest strictly increasing subsequence of
+        `values`, in O(n log n)
+    """
+    # tails[k]: the smallest last value of a subsequence of length k + 1
+    tails = []
+    tail_index = []
+    previous = [-1] * len(values)
+    for i, value in enumerate(values):
+        k = bisect.bisect_left(tails, value)
+        if k == len(tails):
+            tails.append(value)
+            tail_index.append(i)
+        else:
+            tails[k] = value
+            tail_index[k] = i
+        previous[i] = tail_index[k - 1] if k else -1
+    indexes = []
+    i = tail_index[-1] if tail_index else -1
+    while i != -1:
+        indexes.append(i)
+        i = previous[i]
+    indexes.reverse()
+    return indexes
+
+
+def match_occurrences(old, new):
+    """ Pairs the k-th occurrence of each URI in `old` with its k-th
+        occurrence in `new`, both sequences of ``(position, uri)``.
+
+        Returns the ``(old_position, new_position)`` pairs in old order,
+        and the unmatched positions of `old` and of `new`.
+    """
+    new = list(new)
+    waiting = collections.defaultdict(collections.deque)
+    for position, uri in new:
+        waiting[uri].append(position)
+    pairs = []
+    unmatched_old = []
+    for position, uri in old:
+        positions = waiting.get(uri)
+        if positions:
+            pairs.append((position, positions.popleft()))
+        else:
+            unmatched_old.append(position)
+    matched_new = set(new_position for _, new_position in pairs)
+    unmatched_new = [position for position, _ in new if position not in matched_new]
+    return pairs, unmatched_old, unmatched_new
+
+
+def common_subsequence(old, new, max_pairs=None):
+    """ Returns the ``(old_position, new_position)`` pairs of a longest
+        common subsequence of two URI lists (Hunt-Szymanski).
+
+        Its cost is O(r log n) for r pairs of equal URIs, which is O(n log n)
+        unless URIs repeat many times; if r exceeds `max_pairs`, None is
+        returned instead.
+    """
+    positions = collections.defaultdict(list)
+    for position, uri in enumerate(new):
+        positions[uri].append(position)
+    if max_pairs is not None:
+        counts = collections.Counter(old)
+        if sum(counts[uri] * len(found) for uri, found in positions.items()) > max_pairs:
+            return None
+    # thresholds[k]: the smallest new position ending a common subsequence
+    # of length k + 1, and links[k]: (old_position, new_position, links[k - 1])
+    # of that subsequence
+    thresholds = []
+    links = []
+    for i, uri in enumerate(old):
+        # decreasing new positions, so that one old position is used once
+        for j in reversed(positions.get(uri, ())):
+            k = bisect.bisect_left(thresholds, j)
+            if k == len(thresholds):
+                thresholds.append(j)
+                links.append((i, j, links[k - 1] if k else None))
+            elif j < thresholds[k]:
+                thresholds[k] = j
+                links[k] = (i, j, links[k - 1] if k else None)
+    pairs = []
+    link = links[-1] if links else None
+    while link is not None:
+        pairs.append(link[:2])
+        link = link[2]
+    pairs.reverse()
+    return pairs
+
+
+class PlaylistDiff(object):
+    """
+        The changes turning one playlist snapshot into another.
+
+        Attributes:
+            - removed - ``(uri, position)`` of the occurrences only in the
+                        old snapshot, at their old positions
+            - added - ``(uri, position)`` of the occurrences only in the new
+                      snapshot, at their new positions
+            - moved - ``(uri, old_position, new_position)`` of the kept
+                      occurrences that changed order, as few as possible:
+                      the others form a longest run kept in order
+    """
+
+    def __init__(self, removed, added, moved):
+        self.removed = removed
+        self.added = added
+        self.moved = moved
+
+    def __bool__(self):
+        return bool(self.removed or self.added or self.moved)
+
+    def __repr__(self):
+        return "PlaylistDiff(removed={}, added={}, moved={})".format(
+            len(self.removed), len(self.added), len(self.moved))
+
+
+def diff_playlists(old, new):
+    """ Returns the PlaylistDiff from `old` to `new`.
+
+        Occurrences are compared by track URI, duplicates included: the
+        occurrences on a longest common subsequence of the two snapshots
+        stay in place, each remaining occurrence in both is a move and the
+        others are adds or removes. When URIs repeat so much that this would
+        cost more than O(n log n) (see `MAX_PAIRS_PER_TRACK`), the k-th
+        occurrence of a URI in `old` is matched with its k-th occurrence in
+        `new` instead, and the matches out of the longest increasing
+        subsequence of their new positions are the moves.
+
+        Parameters:
+            - old - a SpotiwisePlaylist, or a sequence of track URIs,
+                    tracks or items
+            - new - the same, e.g. the target track list
+    """
+    old, new = track_uris(old), track_uris(new)
+    kept = common_subsequence(old, new, max_pairs=MAX_PAIRS_PER_TRACK * (len(old) + len(new)))
+    if kept is not None:
+        kept_old = set(i for i, _ in kept)
+        kept_new = set(j for _, j in kept)
+        moved, unmatched_old, unmatched_new = match_occurrences(
+            [(i, uri) for i, uri in enumerate(old) if i not in kept_old],
+            [(j, uri) for j, uri in enumerate(new) if j not in kept_new])
+    else:
+        # too many repeats for an exact subsequence: match the k-th
+        # occurrences and keep the longest run of them already in order
+        pairs, unmatched_old, unmatched_new = match_occurrences(enumerate(old), enumerate(new))
+        in_order = set(increasing_subsequence([j for _, j in pairs]))
+        moved = [pair for k, pair in enumerate(pairs) if k not in in_order]
+    return PlaylistDiff(
+        removed=[(old[i], i) for i in unmatched_old],
+        added=[(new[j], j) for j in unmatched_new],
+        moved=[(old[i], i, j) for i, j in moved])
+
+
+def _runs(positions, limit):
+    """ Splits ascending positions into runs of consecutive ones, at most
+        `limit` long """
+    runs = []
+    for position in positions:
+        if runs and position == runs[-1][-1] + 1 and len(runs[-1]) < limit:
+            runs[-1].append(position)
+        else:
+            runs.append([position])
+    return runs
+
+
+def sync_plan(current, target):
+    """ Returns the requests turning the `current` playlist into `target`,
+        as a list of operations applied in order:
+
+            - ``("remove", [(uri, position), ...])`` - at most
+              ``MAX_ITEMS_PER_REQUEST`` occurrences, highest positions first
+              so that later batches are unaffected
+            - ``("reorder", range_start, range_length, insert_before)``
+            - ``("add", [uri, ...], position)`` - at most
+              ``MAX_ITEMS_PER_REQUEST`` consecutive tracks, in ascending
+              position order
+
+        Positions are those of the playlist as the previous operations left
+        it. Only the moves of `diff_playlists` are reordered, the other
+        tracks staying in place (and keeping their `added_at`), and moves
+        adjacent in both orders share a range.
+
+        Parameters:
+            - current - the playlist, or a sequence of track URIs, tracks
+                        or items
+            - target - the same, the wanted contents
+    """
+    current, target = track_uris(current), track_uris(target)
+    diff = diff_playlists(current, target)
+    operations = []
+
+    removed = sorted(diff.removed, key=lambda removal: removal[1], reverse=True)
+    for start in range(0, len(removed), MAX_ITEMS_PER_REQUEST):
+        operations.append(("remove", removed[start:start + MAX_ITEMS_PER_REQUEST]))
+
+    # the target position of each remaining occurrence, in playlist order
+    removed_positions = set(position for _, position in diff.removed)
+    added_positions = set(position for _, position in diff.added)
+    moves = dict((old_position, new_position) for _, old_position, new_position in diff.moved)
+    moving = set(moves.values())
+    kept = iter(position for position in range(len(target))
+                if position not in added_positions and position not in moving)
+    order = [moves[position] if position in moves else next(kept)
+             for position in range(len(current)) if position not in removed_positions]
+
+    # move the others around the tracks in place, in target order
+    pending = sorted(moving)
+    placed = [position for position in order if position not in moving]
+
+    k = 0
+    while k < len(pending):
+        first = pending[k]
+        start = order.index(first)
+        # the next moves go along if they follow in both orders, with no
+        # placed track between them
+        slot = bisect.bisect_left(placed, first)
+        length = 1
+        while k + length < len(pending) and start + length < len(order) \
+                and order[start + length] == pending[k + length] \
+                and bisect.bisect_left(placed, pending[k + length]) == slot:
+            length += 1
+        if slot < len(placed):
+            insert_before = order.index(placed[slot])
+        else:
+            insert_before = order.index(placed[-1]) + 1 if placed else 0
+        if insert_before not in (start, start + length):
+            block = order[start:start + length]
+            del order[start:start + length]
+            destination = insert_before - length if insert_before > start else insert_before
+            order[destination:destination] = block
+            operations.append(("reorder", start, length, insert_before))
+        for position in pending[k:k + length]:
+            bisect.insort(placed, position)
+        k += length
+
+    for run in _runs([position for _, position in diff.added], MAX_ITEMS_PER_REQUEST):
+        operations.append(("add", [target[position] for position in run], run[0]))
+    return operations
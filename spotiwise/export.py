@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+""" Streaming CSV and NDJSON export of Spotiwise objects """
+
+__all__ = ["CSVWriter", "NDJSONWriter", "export_objects", "export_writer", "EXPORT_FORMATS"]
+
+import csv
+import gzip
+import io
+import json
+import logging
+from datetime import date
+
+from .object_classes import SpotiwiseTrack
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("csv", "ndjson", "ndjson.gz")
+
+# attributes whose object is flattened into the row, as in the prototype CSV
+_EXPANDED = {"track": SpotiwiseTrack}
+
+
+def schema(cls):
+    """ Returns the export columns of a Spotiwise class as ``(header, path)``
+        pairs, derived from its `repr_attributes`.
+
+        The ID comes first, `track` is flattened into its own columns and
+        other nested objects are written as their ID, so exporting never
+        triggers the lazy resolution of a user profile.
+
+        Parameters:
+            - cls - a Spotiwise class, e.g. SpotiwiseItem
+    """
+    columns = []
+    if "id" in cls.__slots__:
+        columns.append(("id", "id"))
+    attributes = [a for a in cls.repr_attributes or [] if a != "id"]
+    attributes.sort(key=lambda a: cls.sort_keys.index(a) if a in cls.sort_keys
+                    else len(cls.sort_keys))
+    for attribute in attributes:
+        if attribute in _EXPANDED:
+            columns.extend((header, attribute + "." + path)
+                           for header, path in schema(_EXPANDED[attribute]))
+        elif attribute in ("owner", "added_by"):
+            columns.append((attribute, attribute + ".id"))
+        else:
+            columns.append((attribute, attribute))
+    return columns
+
+
+def _value(obj, path):
+    for name in path.split("."):
+        if obj is None:
+            return None
+        try:
+            obj = getattr(obj, name)
+        except AttributeError:
+            return None
+    if isinstance(obj, date):
+        return obj.isoformat()
+    return obj
+
+
+class _Writer(object):
+
+    def __init__(self, file, columns=None, cls=None):
+        self.file = file
+        self.columns = columns if columns is not None or cls is None else schema(cls)
+        self.rows = 0
+
+    def _row(self, obj):
+        if self.columns is None:
+            self.columns = schema(type(obj))
+        return [_value(obj, path) for _, path in self.columns]
+
+    def write(self, obj):
+        """ Writes one object as a row """
+        raise NotImplementedError()
+
+    def write_all(self, objects):
+        """ Writes objects as they are produced, returning the number of
+            rows written
+        """
+        for obj in objects:
+            self.write(obj)
+        return self.rows
+
+    def close(self):
+        """ Finishes the output, leaving the file itself open """
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CSVWriter(_Writer):
+    """
+        Writes objects to a text file as CSV, one row at a time, the header
+        being written with the first row.
+
+        Parameters:
+            - file - a file-like object opened in text mode, with
+                     ``newline=''``
+            - columns - ``(header, path)`` pairs, where a path is a dotted
+                        attribute path such as ``track.album.name``;
+                        derived from `cls` or from the first object by
+                        default
+            - cls - the class of the objects written
+    """
+
+    def __init__(self, file, columns=None, cls=None):
+        super(CSVWriter, self).__init__(file, columns, cls)
+        self._csv = csv.writer(file)
+
+    def write(self, obj):
+        row = self._row(obj)
+        if not self.rows:
+            self._csv.writerow([header for header, _ in self.columns])
+        self._csv.writerow(["" if value is None else value for value in row])
+        self.rows += 1
+
+    def close(self):
+        # an empty export still gets its header when the columns are known
+        if not self.rows and self.columns is not None:
+            self._csv.writerow([header for header, _ in self.columns])
+
+
+class NDJSONWriter(_Writer):
+    """
+        Writes objects as newline-delimited JSON, one object per line, to a
+        text file or, with `compress`, gzip-compressed to a binary file.
+
+        Parameters:
+            - file - a file-like object
+            - columns - ``(header, path)`` pairs (see CSVWriter)
+            - cls - the class of the objects written
+            - compress - whether to gzip the output
+    """
+
+    def __init__(self, file, columns=None, cls=None, compress=False):
+        super(NDJSONWriter, self).__init__(file, columns, cls)
+        self._gzip = None
+        if compress:
+            self._gzip = gzip.GzipFile(fileobj=file, mode="wb")
+            self.file = io.TextIOWrapper(self._gzip, encoding="utf-8", newline="\n")
+
+    def write(self, obj):
+        row = self._row(obj)
+        self.file.write(json.dumps(
+            dict(zip((header for header, _ in self.columns), row)),
+            ensure_ascii=False, separators=(",", ":"), default=str))
+        self.file.write("\n")
+        self.rows += 1
+
+    def close(self):
+        if self._gzip is not None:
+            # detach so that closing the gzip stream leaves `file` open
+            self.file.flush()
+            self.file.detach()
+            self._gzip.close()
+            self._gzip = None
+
+
+def export_writer(file, format="csv", columns=None, cls=None):
+    """ Returns the writer of an export format, one of `EXPORT_FORMATS` """
+    if format == "csv":
+        return CSVWriter(file, columns, cls)
+    if format in ("ndjson", "ndjson.gz"):
+        return NDJSONWriter(file, columns, cls, compress=format == "ndjson.gz")
+    raise ValueError("Unknown export format %r, expected one of %s"
+                     % (format, ", ".join(EXPORT_FORMATS)))
+
+
+def export_objects(objects, file, format="csv", columns=None, cls=None):
+    """ Writes Spotiwise objects to a file as they are produced and returns
+        the number of rows written.
+
+        Nothing is buffered beyond the current row, so passing one of the
+        client's ``iter_*`` generators exports a library of any size in
+        constant memory, with the next page downloaded while the current
+        one is written.
+
+        Parameters:
+            - objects - an iterable of Spotiwise objects of one class
+            - file - a text file for CSV and NDJSON, a binary one for
+                     ``ndjson.gz``
+            - format - one of `EXPORT_FORMATS`
+            - columns - ``(header, path)`` pairs, derived from the objects'
+                        `repr_attributes` by default
+            - cls - the class of the objects, to write a CSV header when
+                    there are none
+    """
+    with export_writer(file, format, columns, cls) as out:
+        return out.write_all(objects)
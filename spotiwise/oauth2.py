@@ -281,6 +281,11 @@ class SpotifyOAuth(SpotifyAuthBase):
         self.requests_timeout = requests_timeout
         self.show_dialog = show_dialog
 
+        # In-memory copy of the cached token and the mtime of the cache file
+        # it was read from, so the file is only re-read when it changes.
+        self._token_info = None
+        self._cache_mtime = None
+
     def get_cached_token(self, storage_type='file'):
         """ Gets a cached auth token"""
         if storage_type == 'file':
@@ -301,10 +306,16 @@ class SpotifyOAuth(SpotifyAuthBase):
 
         if self.cache_path:
             try:
-                f = open(self.cache_path)
-                token_info_string = f.read()
-                f.close()
-                token_info = json.loads(token_info_string)
+                mtime = self._cache_file_mtime()
+                if self._token_info is not None and mtime == self._cache_mtime:
+                    token_info = self._token_info
+                else:
+                    f = open(self.cache_path)
+                    token_info_string = f.read()
+                    f.close()
+                    token_info = json.loads(token_info_string)
+                    self._token_info = token_info
+                    self._cache_mtime = mtime
 
                 # if scopes don't match, then bail
                 if "scope" not in token_info or not self._is_scope_subset(
@@ -321,16 +332,24 @@ class SpotifyOAuth(SpotifyAuthBase):
                 pass
         return token_info
 
+    def _cache_file_mtime(self):
+        try:
+            return os.stat(self.cache_path).st_mtime_ns
+        except (OSError, TypeError):
+            return None
+
     def _get_cached_db_token(self):
         """ Gets a cached auth token from database"""
         pass
 
     def _save_token_info(self, token_info):
+        self._token_info = token_info
         if self.cache_path:
             try:
                 f = open(self.cache_path, "w")
                 f.write(json.dumps(token_info))
                 f.close()
+                self._cache_mtime = self._cache_file_mtime()
             except IOError:
                 logger.warning('Couldn\'t write token to cache at: %s',
                                self.cache_path)
@@ -1,27 +1,401 @@
+import contextlib
+import contextvars
+import inspect
+import threading
+import time
+import warnings
+import weakref
 from datetime import date
 from logging import getLogger
 
-import spotiwise
+from .cache import TTLCache
 
 logger = getLogger(__name__)
 
+# the IdentityMap objects being built are interned into, if any
+_identity_map = contextvars.ContextVar('spotiwise_identity_map', default=None)
+
+# the client objects being unpickled are attached to, if any
+_loading_client = contextvars.ContextVar('spotiwise_loading_client', default=None)
+
+# the first object pickled under each shared key by ``serialization.dumps``,
+# if it is running
+_pickled_shared = contextvars.ContextVar('spotiwise_pickled_shared', default=None)
+
+_EMPTY = (None, [], {}, ())
+
+
+class IdentityMap(object):
+    """
+    Maps each artist, album and track ID to a single live object.
+
+    A client created with ``intern_objects=True`` owns one; the objects it
+    builds, nested ones included, are looked up here, so 500 tracks from one
+    album share one SpotiwiseAlbum. Entries are weak references and vanish
+    with the last outside reference to their object.
+
+    When an ID is seen again, fields missing from the live object are filled
+    in from the new one (e.g. a simplified album gains its full details), so
+    enrichment is visible everywhere the object is referenced.
+    """
+
+    def __init__(self):
+        self._objects = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._objects)
+
+    def get(self, cls, id):
+        """Returns the live object of class ``cls`` with ``id``, or None"""
+        return self._objects.get((cls, id))
+
+    def intern(self, obj):
+        """Returns the live object with the ID of ``obj``, enriched by
+        ``obj``, or ``obj`` itself if there is none"""
+        key = (type(obj), obj.id)
+        with self._lock:
+            existing = self._objects.get(key)
+            if existing is None:
+                self._objects[key] = obj
+                return obj
+        if existing is not obj:
+            existing._enrich(obj)
+        return existing
+
+    @contextlib.contextmanager
+    def active(self):
+        """Interns the objects built in this block, nested ones included"""
+        token = _identity_map.set(self)
+        try:
+            yield self
+        finally:
+            _identity_map.reset(token)
+
+
+def _intern(obj):
+    """Returns the interned version of ``obj`` if an IdentityMap is active"""
+    identity_map = _identity_map.get()
+    if identity_map is None or not obj.interned or obj.id is None:
+        return obj
+    return identity_map.intern(obj)
+
+
+def _lazy_object(cls, data, sp=None):
+    """Wraps a nested JSON object lazily, passing objects and None through"""
+    if data is None or isinstance(data, cls):
+        return data
+    return _intern(cls.lazy(data, sp=sp))
+
+
+def _lazy_list(cls, data, sp=None):
+    return [_lazy_object(cls, item, sp) for item in data or [] if item is not None]
+
+
+@contextlib.contextmanager
+def attach(sp):
+    """Attaches ``sp`` to the objects unpickled in this block, which are
+    also interned into its identity map and user cache"""
+    token = _loading_client.set(sp)
+    try:
+        yield sp
+    finally:
+        _loading_client.reset(token)
+
+
+def _restore(cls, state):
+    """Rebuilds an object pickled by ``_SpotiwiseBase.__reduce__``"""
+    obj = cls.__new__(cls)
+    obj.__setstate__(state)
+    return obj._restored(obj.sp)
+
+
+def _same(obj):
+    return obj
+
+
+def _shared_key(obj):
+    """The key under which copies of a shared object are written once"""
+    if isinstance(obj, SpotiwiseUser) or obj.interned:
+        if obj.id is not None:
+            return type(obj).__name__, obj.id
+    return None
+
+
+def _user(sp, data):
+    if not data or isinstance(data, SpotiwiseUser):
+        return data
+    return SpotiwiseUserFactory.get_instance(sp=sp, **data)
+
+
+def _group_users(users):
+    """Records the unresolved users built for one playlist or page as
+    siblings, whose profiles are fetched together on first access"""
+    group = list(dict((id(user), user) for user in users
+                      if user is not None and not user._resolved).values())
+    for user in group:
+        user._siblings = group
+
+
 class _SpotiwiseBase(object):
+    """
+    Base of the Spotiwise object model.
+
+    Every class declares ``__slots__``, so instances carry no ``__dict__``.
+    JSON fields a class doesn't model are kept as a tuple of ``(key, value)``
+    pairs and exposed as the ``_kwargs`` dict; set ``keep_extra = False`` on
+    a class (or on ``_SpotiwiseBase`` for all of them) to drop them instead.
+
+    Objects built with :meth:`lazy` keep the raw JSON instead and build each
+    attribute on first read (``_lazy_fields`` lists the derived ones), then
+    store it in its slot, so reading ``track.id`` never parses the album.
+
+    Artists, albums and tracks are ``interned``: built while an
+    :class:`IdentityMap` is active, each ID maps to one shared object.
+
+    Objects compare and hash by a key computed once on first use: the class
+    and ID, else the URI (items: their track, ``added_at`` and ``added_by``),
+    so sets and dicts of objects cost a tuple hash per lookup.
+
+    Pickling keeps the set slots (and the raw JSON of lazy objects) but not
+    the client, nor the unmodeled fields unless ``pickle_extra`` is set.
+    Objects unpickled inside :func:`attach` get that client back; see
+    ``spotiwise.serialization`` for compact dumps and a msgpack codec.
+
+    Approximate memory per object, nested objects included, measured with
+    tracemalloc over 10,000 full API objects on CPython 3.11:
+
+    ===============  ========  =======  =====================
+    class            __dict__  slots    slots, keep_extra off
+    ===============  ========  =======  =====================
+    SpotiwiseArtist  217 B     136 B    136 B
+    SpotiwiseAlbum   839 B     792 B    560 B
+    SpotiwiseTrack   1,536 B   1,288 B  1,080 B
+    SpotiwiseItem    1,760 B   1,432 B  1,224 B
+    SpotiwiseUser    231 B     160 B    160 B
+    ===============  ========  =======  =====================
+    """
+
+    __slots__ = ('href', 'type', 'uri', 'sp', '_args', '_extra', '_raw', '_identity', '_hash_key',
+                 '__weakref__')
 
     sort_keys = ['id', 'name']
     repr_attributes = None
+    keep_extra = True
+    pickle_extra = False
+    interned = False
+    # attribute name -> function(self, raw) for attributes of lazy objects
+    # that aren't plain copies of a JSON field
+    _lazy_fields = {}
 
     def __init__(self, href=None, type=None, uri=None, sp=None, *args, **kwargs):
         self.href = href
         self.type = type
         self.uri = uri
         self.sp = sp
-        self._args = args
-        self._kwargs = kwargs
+        self._hash_key = None
+        self._set_extra(args, kwargs)
+
+    def _set_extra(self, args, kwargs):
+        if self.keep_extra:
+            self._args = args
+            self._extra = tuple(kwargs.items()) if kwargs else None
+        else:
+            self._args = ()
+            self._extra = None
+
+    @property
+    def _kwargs(self):
+        """The JSON fields this class doesn't model"""
+        return dict(self._extra) if self._extra else {}
+
+    @classmethod
+    def lazy(cls, data, sp=None, **kwargs):
+        """Returns an object wrapping ``data`` whose attributes are built from
+        it on first access. ``kwargs`` override fields of ``data``."""
+        obj = cls.__new__(cls)
+        obj._raw = dict(data, **kwargs) if kwargs else data
+        obj._identity = _identity_map.get()
+        obj._hash_key = None
+        obj.sp = sp
+        return obj
+
+    def __getattr__(self, name):
+        # only called for empty slots: hydrate them on lazy objects
+        try:
+            raw = object.__getattribute__(self, '_raw')
+        except AttributeError:
+            raise AttributeError("'{}' object has no attribute '{}'".format(
+                self.__class__.__name__, name))
+        if name not in self._slot_names():
+            raise AttributeError("'{}' object has no attribute '{}'".format(
+                self.__class__.__name__, name))
+        identity = self._identity
+        if identity is None:
+            value = self._hydrate(name, raw)
+        else:
+            with identity.active():
+                value = self._hydrate(name, raw)
+        setattr(self, name, value)
+        return value
+
+    def __getstate__(self):
+        state = {}
+        for name in self._slot_names():
+            if name == 'sp' or (name in ('_args', '_extra') and not self.pickle_extra):
+                continue
+            try:
+                state[name] = object.__getattribute__(self, name)
+            except AttributeError:
+                continue
+        try:
+            raw = object.__getattribute__(self, '_raw')
+        except AttributeError:
+            return state
+        if not self.pickle_extra:
+            params = self._init_defaults()
+            raw = dict((k, v) for k, v in raw.items() if k in params)
+        state['_raw'] = raw
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self.sp = _loading_client.get()
+        if '_raw' in state:
+            self._identity = getattr(self.sp, 'identity_map', None)
+        # codecs without tuples return lists
+        self._args = tuple(state.get('_args', ()))
+        extra = state.get('_extra')
+        if extra is not None or '_raw' not in state:
+            self._extra = tuple(tuple(pair) for pair in extra) if extra else None
+
+    def __reduce__(self):
+        shared = _pickled_shared.get()
+        key = _shared_key(self) if shared is not None else None
+        if key is not None:
+            first = shared.setdefault(key, self)
+            if first is not self:
+                # pickled as a memo reference to the first object
+                return _same, (first,)
+        return _restore, (type(self), self.__getstate__())
+
+    def _restored(self, sp):
+        """Returns the object to use for this freshly unpickled one"""
+        identity_map = getattr(sp, 'identity_map', None)
+        if identity_map is None or not self.interned or self.id is None:
+            return self
+        return identity_map.intern(self)
+
+    def _enrich(self, other):
+        """Fills the empty fields of this object from ``other``, an object
+        with the same ID"""
+        try:
+            raw = object.__getattribute__(self, '_raw')
+            other_raw = object.__getattribute__(other, '_raw')
+        except AttributeError:
+            raw = other_raw = None
+        if raw is not None and other_raw is not None:
+            # both lazy: merge the JSON and let empty fields hydrate again
+            missing = dict((k, v) for k, v in other_raw.items()
+                           if raw.get(k) in _EMPTY and v not in _EMPTY)
+            if not missing:
+                return
+            self._raw = dict(raw, **missing)
+            for name in self._slot_names():
+                try:
+                    value = object.__getattribute__(self, name)
+                except AttributeError:
+                    continue
+                if value in _EMPTY and name != 'sp':
+                    delattr(self, name)
+            return
+        for name in self._slot_names():
+            if name == 'sp':
+                continue
+            mine = getattr(self, name, None)
+            theirs = getattr(other, name, None)
+            if name == '_extra' and mine and theirs:
+                known = dict(mine)
+                theirs = mine + tuple((k, v) for k, v in theirs if k not in known)
+                if len(theirs) > len(mine):
+                    self._extra = theirs
+            elif mine in _EMPTY and theirs not in _EMPTY:
+                setattr(self, name, theirs)
+
+    def _hydrate(self, name, raw):
+        convert = self._lazy_fields.get(name)
+        if convert is not None:
+            return convert(self, raw)
+        if name == '_args':
+            return ()
+        if name == '_extra':
+            if not self.keep_extra:
+                return None
+            params = self._init_defaults()
+            return tuple((k, v) for k, v in raw.items() if k not in params) or None
+        return raw.get(name, self._init_defaults().get(name))
+
+    @classmethod
+    def _slot_names(cls):
+        try:
+            return cls.__dict__['_slot_names_cache']
+        except KeyError:
+            names = frozenset(
+                name for klass in cls.__mro__
+                for name in klass.__dict__.get('__slots__', ())
+                if name not in ('__weakref__', '_raw', '_identity', '_hash_key'))
+            cls._slot_names_cache = names
+            return names
+
+    @classmethod
+    def _init_defaults(cls):
+        """Parameters of the constructors and their defaults, for lazy objects"""
+        try:
+            return cls.__dict__['_init_defaults_cache']
+        except KeyError:
+            defaults = {'_args': (), '_extra': None}
+            for klass in reversed(cls.__mro__):
+                if '__init__' not in klass.__dict__ or klass is object:
+                    continue
+                for param in inspect.signature(klass.__init__).parameters.values():
+                    if param.kind in (param.POSITIONAL_OR_KEYWORD, param.KEYWORD_ONLY) \
+                            and param.name != 'self':
+                        default = param.default
+                        defaults[param.name] = None if default is param.empty else default
+            cls._init_defaults_cache = defaults
+            return defaults
+
+    @classmethod
+    def _attribute_names(cls):
+        """Names of the instance attributes, in declaration order"""
+        try:
+            return cls.__dict__['_attribute_names_cache']
+        except KeyError:
+            names = []
+            for klass in reversed(cls.__mro__):
+                for name in klass.__dict__.get('__slots__', ()):
+                    if name in ('__weakref__', '_raw', '_identity', '_hash_key') or name in names:
+                        continue
+                    names.append('_kwargs' if name == '_extra' else name)
+            cls._attribute_names_cache = names
+            return names
+
+    @classmethod
+    def _repr_names(cls):
+        """The attributes shown by ``__repr__``, ``sort_keys`` first"""
+        try:
+            return cls.__dict__['_repr_names_cache']
+        except KeyError:
+            ranks = cls._sort_ranks()
+            names = sorted(cls.repr_attributes or cls._attribute_names(),
+                           key=lambda name: ranks.get(name.lower(), len(ranks)))
+            cls._repr_names_cache = names
+            return names
 
     def __repr__(self):
         repr_list = []
-        repr_attributes = self.repr_attributes or self.__dict__.keys()
-        for k in repr_attributes:
+        for k in self._repr_names():
             try:
                 v = getattr(self, k)
             except AttributeError:
@@ -31,25 +405,55 @@ class _SpotiwiseBase(object):
                     v = '{:%m/%d/%Y}'.format(v)
                 k = k.replace('_', ' ')
                 repr_list.append('{}={}'.format(k, v))
-        return '{}({})'.format(self.__class__.__name__, ', '.join(sorted(repr_list, key=self._sort)))
+        return '{}({})'.format(self.__class__.__name__, ', '.join(repr_list))
+
+    @property
+    def _key(self):
+        """The hash and equality key, computed once: the class and ID, else
+        the URI, else the object's identity"""
+        try:
+            key = object.__getattribute__(self, '_hash_key')
+        except AttributeError:
+            key = None
+        if key is None:
+            key = self._hash_key = self._compute_key()
+        return key
+
+    def _compute_key(self):
+        id_ = getattr(self, 'id', None)
+        if id_ is not None:
+            return self.__class__.__name__, id_
+        if self.uri:
+            return self.uri
+        return id(self)
 
     def __eq__(self, other):
         if isinstance(other, _SpotiwiseBase):
-            return self.uri == other.uri
+            return self._key == other._key
         else:
             return False
 
+    def __hash__(self):
+        return hash(self._key)
+
     def _sort(self, key):
         '''Used to ensure certain attributes are listed first'''
-        key = key.split(':')[0].lower()
+        return self._sort_ranks().get(key.split('=')[0].lower(), float('inf'))
+
+    @classmethod
+    def _sort_ranks(cls):
         try:
-            return self.sort_keys.index(key)
-        except ValueError:
-            return float('inf')
+            return cls.__dict__['_sort_ranks_cache']
+        except KeyError:
+            ranks = dict((key, rank) for rank, key in enumerate(cls.sort_keys))
+            cls._sort_ranks_cache = ranks
+            return ranks
 
 
 class SpotiwiseArtist(_SpotiwiseBase):
 
+    interned = True
+    __slots__ = ('id', 'name', 'external_urls')
     repr_attributes = ['name']
 
     def __init__(self, id, name, external_urls=None, *args, **kwargs):
@@ -61,6 +465,17 @@ class SpotiwiseArtist(_SpotiwiseBase):
 
 class SpotiwiseAlbum(_SpotiwiseBase):
 
+    interned = True
+    __slots__ = ('id', 'name', 'external_urls', '_artists', 'artist', 'available_markets',
+                 'images')
+
+    _lazy_fields = {
+        'external_urls': lambda self, raw: raw.get('external_urls') or [],
+        '_artists': lambda self, raw: _lazy_list(SpotiwiseArtist, raw.get('artists')),
+        'artist': lambda self, raw: self._artists[0].name if self._artists else raw.get('artists'),
+        'available_markets': lambda self, raw: raw.get('available_markets') or [],
+        'images': lambda self, raw: raw.get('images') or [],
+    }
     repr_attributes = ['name', 'artist']
 
     def __init__(self, id, name, album_type=None, artists=None, available_markets=None, external_urls=None, images=None, *args, **kwargs):
@@ -68,7 +483,7 @@ class SpotiwiseAlbum(_SpotiwiseBase):
         self.id = id
         self.name = name
         self.external_urls = external_urls or []
-        self._artists = [SpotiwiseArtist(**artist) if not isinstance(artist, SpotiwiseArtist) else artist for artist in artists]
+        self._artists = [_intern(SpotiwiseArtist(**artist)) if not isinstance(artist, SpotiwiseArtist) else artist for artist in artists]
         try:
             self.artist = self._artists[0].name
         except IndexError:
@@ -80,17 +495,31 @@ class SpotiwiseAlbum(_SpotiwiseBase):
 
 class SpotiwiseTrack(_SpotiwiseBase):
 
+    interned = True
+    __slots__ = ('id', 'name', 'album', '_artists', 'artist', 'available_markets', 'disc_number',
+                 'duration_ms', 'duration', 'explicit', 'external_ids', 'external_urls',
+                 'popularity', 'preview_url', 'track_number', 'playcount')
+
+    _lazy_fields = {
+        'album': lambda self, raw: _lazy_object(SpotiwiseAlbum, raw.get('album')),
+        '_artists': lambda self, raw: _lazy_list(SpotiwiseArtist, raw.get('artists')),
+        'artist': lambda self, raw: self._artists[0].name if self._artists else None,
+        'available_markets': lambda self, raw: raw.get('available_markets') or [],
+        'duration': lambda self, raw: self.duration_ms // 1000,
+        'playcount': lambda self, raw: 0,
+    }
     repr_attributes = ['name', 'artist']
 
-    def __init__(self, id, name, album, artists, available_markets=None, disc_number=None,
+    def __init__(self, id, name, album=None, artists=None, available_markets=None, disc_number=None,
     duration_ms=0, explicit=False, external_ids=None, external_urls=None,
     popularity=None, preview_url=None, track_number=None, episode=False, is_local=False, track=True, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.id = id
         self.name = name
-        self.album = album if isinstance(album, SpotiwiseAlbum) else SpotiwiseAlbum(**album)
-        self._artists = [SpotiwiseArtist(**artist) if not isinstance(artist, SpotiwiseArtist) else artist for artist in artists]
-        self.artist = self._artists[0].name
+        # simplified track objects (e.g. album tracks) come without an album
+        self.album = album if isinstance(album, SpotiwiseAlbum) or album is None else _intern(SpotiwiseAlbum(**album))
+        self._artists = [_intern(SpotiwiseArtist(**artist)) if not isinstance(artist, SpotiwiseArtist) else artist for artist in artists or []]
+        self.artist = self._artists[0].name if self._artists else None
         self.available_markets = available_markets or []
         self.disc_number = disc_number
         self.duration_ms = duration_ms
@@ -106,17 +535,31 @@ class SpotiwiseTrack(_SpotiwiseBase):
 
 class SpotiwisePlayback(_SpotiwiseBase):
 
+    __slots__ = ('track', 'item', 'ttrack', 'timestamp', 'epoch_timestamp', 'progress_ms',
+                 'is_playing', 'context')
+
+    _lazy_fields = {
+        'item': lambda self, raw: _lazy_object(SpotiwiseTrack, raw.get('item')),
+        'track': lambda self, raw: self.item,
+        'ttrack': lambda self, raw: self.item,
+        'timestamp': lambda self, raw: raw.get('timestamp') or time.time(),
+        'epoch_timestamp': lambda self, raw: self.timestamp // 1000,
+        'progress_ms': lambda self, raw: raw.get('progress_ms') or 0,
+    }
+
     def __init__(self, item, timestamp=None, progress_ms=None, is_playing=False, context=None, *args, **kwargs):
-        self.track = item if isinstance(item, SpotiwiseTrack) else SpotiwiseTrack(**item) # will eventually point to self.item.track
-        self.item = item if isinstance(item, SpotiwiseTrack) else SpotiwiseTrack(**item)
-        self.ttrack = self.item.track # will replace track attribute eventually
+        super().__init__(*args, **kwargs)
+        self.track = item if isinstance(item, SpotiwiseTrack) else _intern(SpotiwiseTrack(**item)) # will eventually point to self.item.track
+        self.item = item if isinstance(item, SpotiwiseTrack) else _intern(SpotiwiseTrack(**item))
+        self.ttrack = self.item # will replace track attribute eventually
         self.timestamp = timestamp or time.time()
         self.epoch_timestamp = self.timestamp // 1000
         self.progress_ms = progress_ms or 0
         self.is_playing = is_playing
         self.context = context
-        self._args = args
-        self._kwargs = kwargs
+
+    def _compute_key(self):
+        return (self.item._key if self.item is not None else None, self.timestamp)
 
     @property
     def progress(self):
@@ -125,27 +568,41 @@ class SpotiwisePlayback(_SpotiwiseBase):
 
 class SpotiwiseItem(_SpotiwiseBase):
 
+    __slots__ = ('track', 'added_at', 'added_by', 'is_local')
+
+    _lazy_fields = {
+        'track': lambda self, raw: _lazy_object(SpotiwiseTrack, raw.get('track')),
+        'added_by': lambda self, raw: _user(self.sp, raw.get('added_by')),
+    }
     repr_attributes = ['track', 'added_at', 'added_by']
 
-    def __init__(self, track, added_at=None, added_by='', is_local=False, *args, **kwargs):
+    def __init__(self, track, added_at=None, added_by=None, is_local=False, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.track = track if isinstance(track, SpotiwiseTrack) else SpotiwiseTrack(**track)
+        self.track = track if isinstance(track, SpotiwiseTrack) \
+            else _intern(SpotiwiseTrack(**track))
         self.added_at = added_at
-        self.added_by = added_by if isinstance(added_by, SpotiwiseUser) \
+        # saved tracks have no added_by
+        self.added_by = added_by if isinstance(added_by, SpotiwiseUser) or not added_by \
             else SpotiwiseUserFactory.get_instance(sp=self.sp, **added_by)
         self.is_local = is_local
 
-    def __eq__(self, other):
-        if isinstance(other, SpotiwiseItem):
-            return self.track == other.track \
-                and self.added_at == other.added_at \
-                and self.added_by == other.added_by
-        else:
-            return False
+    def _compute_key(self):
+        return (self.track._key if self.track is not None else None, self.added_at,
+                self.added_by._key if self.added_by else None)
 
 
 class SpotiwisePlaylist(_SpotiwiseBase):
 
+    __slots__ = ('id', 'name', 'owner', 'collaborative', 'description', 'external_urls',
+                 'followers', 'images', 'public', 'snapshot_id', '_tracks', 'items', 'tracks')
+
+    _lazy_fields = {
+        'owner': lambda self, raw: _user(self.sp, raw.get('owner')),
+        '_tracks': lambda self, raw: raw.get('tracks'),
+        'items': lambda self, raw: self._group_users(_lazy_list(
+            SpotiwiseItem, (raw.get('tracks') or {}).get('items'), sp=self.sp)),
+        'tracks': lambda self, raw: [item.track for item in self.items],
+    }
     repr_attributes = ['name', 'owner', 'collaborative', 'description']
 
     def __init__(
@@ -178,9 +635,10 @@ class SpotiwisePlaylist(_SpotiwiseBase):
         self.snapshot_id = snapshot_id
         self._tracks = tracks
         try:
-            self.items = [SpotiwiseItem(**item) for item in self._tracks.get('items')]
+            self.items = [SpotiwiseItem(sp=self.sp, **item) for item in self._tracks.get('items')]
         except TypeError: # Uninstantiated playlist (possibly from current_user_playlists())
             self.items = []
+        self._group_users(self.items)
         if precache:
             self.load_tracks()
             #while self._tracks['next']:
@@ -191,9 +649,24 @@ class SpotiwisePlaylist(_SpotiwiseBase):
         except TypeError:
             self.tracks = self._tracks
 
+    @classmethod
+    def lazy(cls, data, sp=None, precache=False, **kwargs):
+        playlist = super().lazy(data, sp=sp, **kwargs)
+        if precache:
+            playlist.load_tracks()
+        return playlist
+
     def __len__(self):
         return self._tracks.get('total', -1)
 
+    def __getstate__(self):
+        state = super().__getstate__()
+        tracks = state.get('_tracks')
+        if 'items' in state and tracks and 'items' in tracks:
+            # the items are pickled as objects already
+            state['_tracks'] = dict((k, v) for k, v in tracks.items() if k != 'items')
+        return state
+
     def load_tracks(self, sp=None):
         sp = sp or self.sp
         if not sp:
@@ -204,61 +677,283 @@ class SpotiwisePlaylist(_SpotiwiseBase):
         if 'next' not in self._tracks:
             if 'href' in self._tracks:
                 self._tracks = sp._get(self._tracks.get('href'))
-                self.items = [SpotiwiseItem(sp=sp, **item) for item in self._tracks.get('items') if item is not None]
-        while self._tracks.get('next'):
-            self._tracks = sp.next(self._tracks)
-            self.items.extend([SpotiwiseItem(sp=sp, **item) for item in self._tracks.get('items') if item is not None])
+                self.items = []
+                self._extend_items(self._tracks, sp=sp)
+        if self._tracks.get('next'):
+            # the remaining pages are fetched concurrently once total is known
+            pages = sp.all_pages(self._tracks)[1:]
+            for page in pages:
+                self._extend_items(page, sp=sp)
+            self._tracks = pages[-1] if pages else self._tracks
 
         try:
             self.tracks = [item.track for item in self.items]
         except TypeError:
             self.tracks = self._tracks
 
+    def unique_tracks(self):
+        """The tracks of the loaded items without repeats, in order of first
+        appearance"""
+        seen = set()
+        tracks = []
+        for item in self.items or []:
+            key = item.track._key
+            if key not in seen:
+                seen.add(key)
+                tracks.append(item.track)
+        return tracks
+
+    def duplicates(self):
+        """``(position, item)`` pairs of the items whose track appears
+        earlier in the playlist, i.e. those to remove to deduplicate it"""
+        seen = set()
+        duplicates = []
+        for position, item in enumerate(self.items or []):
+            key = item.track._key
+            if key in seen:
+                duplicates.append((position, item))
+            else:
+                seen.add(key)
+        return duplicates
+
+    @staticmethod
+    def _track_keys(other):
+        tracks = [item.track for item in other.items or []] \
+            if isinstance(other, SpotiwisePlaylist) else other
+        return set(track._key for track in tracks)
+
+    def intersection(self, other):
+        """The unique tracks also in ``other``, a playlist or tracks"""
+        keys = self._track_keys(other)
+        return [track for track in self.unique_tracks() if track._key in keys]
+
+    def difference(self, other):
+        """The unique tracks not in ``other``, a playlist or tracks"""
+        keys = self._track_keys(other)
+        return [track for track in self.unique_tracks() if track._key not in keys]
+
+    def union(self, other):
+        """The unique tracks of this playlist followed by those only in
+        ``other``, a playlist or tracks"""
+        tracks = self.unique_tracks()
+        seen = set(track._key for track in tracks)
+        others = other.unique_tracks() if isinstance(other, SpotiwisePlaylist) else other
+        for track in others:
+            if track._key not in seen:
+                seen.add(track._key)
+                tracks.append(track)
+        return tracks
+
+    def diff(self, other):
+        """The changes from this playlist to ``other``, a playlist or tracks,
+        see ``spotiwise.diff.diff_playlists``"""
+        from .diff import diff_playlists  # Avoid circular import
+        return diff_playlists(self, other)
+
+    __and__ = intersection
+    __sub__ = difference
+    __or__ = union
+
+    def users(self):
+        """The owner and the users who added items, each object once"""
+        users = {id(self.owner): self.owner}
+        for item in self.items or []:
+            if item.added_by:
+                users.setdefault(id(item.added_by), item.added_by)
+        return list(users.values())
+
+    def resolve_users(self, sp=None):
+        """Fetches the profiles of the owner and contributors concurrently,
+        see ``Spotify.resolve_users`` (a coroutine with ``AsyncSpotify``)"""
+        sp = sp or self.sp
+        if not sp:
+            raise RuntimeError('Need a spotify client reference to resolve users')
+        return sp.resolve_users(self.users())
+
+    def export(self, file, format='csv', columns=None):
+        """Writes the loaded items to a file as CSV or NDJSON, one row at a
+        time, see ``spotiwise.export.export_objects``"""
+        from .export import export_objects  # Avoid circular import
+        return export_objects(self.items or [], file, format, columns, cls=SpotiwiseItem)
+
+    def to_arrow(self):
+        """Returns the loaded items as a pyarrow Table, see ``ColumnarPlaylist``"""
+        from .columnar import ColumnarPlaylist  # Avoid circular import
+        return ColumnarPlaylist.from_playlist(self).to_arrow()
+
+    def to_pandas(self):
+        """Returns the loaded items as a pandas DataFrame, see ``ColumnarPlaylist``"""
+        from .columnar import ColumnarPlaylist  # Avoid circular import
+        return ColumnarPlaylist.from_playlist(self).to_pandas()
+
+    def _extend_items(self, page, sp=None):
+        """Appends the items of a raw page of playlist tracks"""
+        sp = sp or self.sp
+        items = [sp._wrap(SpotiwiseItem, item, sp=sp)
+                 for item in page.get('items') if item is not None]
+        self.items.extend(self._group_users(items))
+
+    def _group_users(self, items):
+        """Groups the owner with the users who added ``items``, so that
+        reading one of their profiles fetches the others too"""
+        _group_users([self.owner] + [item.added_by for item in items])
+        return items
 
-class SpotiwiseUser(_SpotiwiseBase):
 
+class SpotiwiseUser(_SpotiwiseBase):
+    """
+    A Spotify user.
+
+    Users start as stubs holding the fields of the JSON they were built
+    from; building one never sends a request. Reading a profile field the
+    stub lacks (``display_name``, ``images``...) fetches, concurrently, the
+    profiles of the unresolved users built with it for the same playlist or
+    page, so looping over the contributors of a playlist costs one batch of
+    requests. ``Spotify.resolve_users()`` fetches every unresolved user of
+    the client. With ``AsyncSpotify``, which can't block there, call ``await
+    sp.resolve_users(...)`` (or ``SpotiwisePlaylist.resolve_users``) first.
+    ``repr`` never sends a request.
+    """
+
+    __slots__ = ('id', 'display_name', 'images', 'followers', 'external_urls', '_resolved',
+                 '_siblings')
+
+    _lazy_fields = {
+        'display_name': lambda self, raw: raw.get('display_name') or f'__{self.id}__',
+        '_resolved': lambda self, raw: True,
+        '_siblings': lambda self, raw: None,
+    }
+    _profile_fields = ('display_name', 'images', 'followers', 'external_urls')
     repr_attributes = ['display_name']
 
     def __init__(self, id, display_name=None, images=None, followers=None,
                  external_urls=None, *args, **kwargs):
         self.id = id
         super().__init__(*args, **kwargs)
-        if self.sp:
-            sp = self.sp
-            try:
-                user = SpotiwiseUser(**sp._user(self.id))
-                for k, v in vars(user).items():
-                    setattr(self, k, v)
-            except spotiwise.SpotifyException:
-                self.display_name = display_name or f'__{self.id}__'
+        self._resolved = False
+        self._siblings = None
+        fields = dict(display_name=display_name, images=images, followers=followers,
+                      external_urls=external_urls)
+        for name, value in fields.items():
+            if value is not None:
+                setattr(self, name, value)
+            elif self.sp is None:
+                setattr(self, name, self._default(name))
+
+    def _default(self, name):
+        return f'__{self.id}__' if name == 'display_name' else None
+
+    def __getattr__(self, name):
+        try:
+            object.__getattribute__(self, '_raw')
+        except AttributeError:
+            if name in self._profile_fields:
+                return self._resolve_field(name)
+        return super().__getattr__(name)
+
+    def _resolve_field(self, name):
+        """Fetches the profile of a stub to read one of its fields, along
+        with those of the other stubs of its client"""
+        if self.sp is not None and not self._resolved:
+            result = self.sp.resolve_users(self._pending_users())
+            if inspect.isawaitable(result):
+                # async clients can't block on a request here
+                result.close()
+                warnings.warn(
+                    "User {} is not resolved: use `await sp.resolve_users(...)` "
+                    "before reading {}".format(self.id, name), RuntimeWarning, stacklevel=3)
+            else:
+                return getattr(self, name)
+        return self._default(name)
+
+    def _pending_users(self):
+        """This stub and the stubs built with it for the same playlist or
+        page, so that reading a field of each user in a playlist is one
+        concurrent batch of requests rather than one request per user"""
+        return self._siblings or [self]
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state.pop('_siblings', None)
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self._siblings = None
+
+    def __repr__(self):
+        # never fetches the profile, showing the ID until the name is known
+        if self._resolved or self._has('display_name'):
+            return super().__repr__()
+        return '{}(id={})'.format(self.__class__.__name__, self.id)
+
+    def _apply_profile(self, profile):
+        """Fills the stub from a fetched profile, or with defaults if the
+        profile couldn't be fetched (None)"""
+        if profile is None:
+            for name in self._profile_fields:
+                if not self._has(name):
+                    setattr(self, name, self._default(name))
         else:
-            self.display_name = display_name or f'__{self.id}__'
-            self.external_urls = external_urls
-            self.images = images
-            self.followers = followers
+            profile = dict(profile)
+            profile.pop('id', None)
+            for name in self._profile_fields:
+                value = profile.pop(name, None)
+                setattr(self, name, value if value is not None or name != 'display_name'
+                        else self._default(name))
+            for name in ('href', 'type', 'uri'):
+                setattr(self, name, profile.pop(name, getattr(self, name, None)))
+            if self.keep_extra and profile:
+                known = dict(self._extra or ())
+                known.update(profile)
+                self._extra = tuple(known.items())
+        self._resolved = True
+
+    def _has(self, name):
+        try:
+            object.__getattribute__(self, name)
+            return True
+        except AttributeError:
+            return False
+
+    def _restored(self, sp):
+        cache = getattr(sp, 'user_cache', None)
+        if cache is None:
+            return self
+        existing = cache.get(self.id)
+        if existing is None:
+            cache.set(self.id, self)
+            return self
+        return existing
 
     @property
-    def __key(self):
-        return self.id, self.display_name, self.type, self.uri
+    def resolved(self):
+        """Whether the full profile was fetched (or failed to be)"""
+        return self._resolved
 
-    def __eq__(self, other):
-        return self.__key == other.__key
 
-    def __hash__(self):
-        return hash(self.__key)
+class SpotiwiseUserFactory:
+    """
+    Shares SpotiwiseUser objects by ID.
 
+    Users built for a client are kept in its ``user_cache``; the others in
+    ``registry``. Both are bounded, thread-safe TTLCaches, so entries expire
+    and the least recently used are evicted.
+    """
 
-class SpotiwiseUserFactory:
-    registry = {}
+    registry = TTLCache(maxsize=1024, ttl=3600)
 
     @classmethod
     def get_instance(cls, *args, **kwargs):
         id_ = kwargs.get('id')
         if id_ is None:
             raise RuntimeError('Must provide an id')
-        if id_ in cls.registry:
-            instance = cls.registry[id_]
-        else:
+        cache = getattr(kwargs.get('sp'), 'user_cache', None)
+        if cache is None:
+            cache = cls.registry
+        instance = cache.get(id_)
+        if instance is None:
+            # two threads may build the same user at once, the last one is kept
             instance = SpotiwiseUser(*args, **kwargs)
-            cls.registry[id_] = instance
+            cache.set(id_, instance)
         return instance
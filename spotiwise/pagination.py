@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+""" Helpers for walking offset- and cursor-paginated API results """
+
+import calendar
+import logging
+from datetime import datetime
+
+from six.moves.urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+
+def with_offset(url, offset, limit=None):
+    """ Returns ``url`` with its ``offset`` (and optionally ``limit``) query
+        parameter replaced
+
+        Parameters:
+            - url - a paged API URL
+            - offset - the new offset
+            - limit - the new limit, if it should change
+    """
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if k not in ("offset", "limit") or (k == "limit" and limit is None)]
+    query.append(("offset", str(offset)))
+    if limit is not None:
+        query.append(("limit", str(limit)))
+    return urlunsplit(parts._replace(query=urlencode(query, safe=",:")))
+
+
+def remaining_page_urls(page):
+    """ Returns the URLs of every page following ``page``, computed from its
+        ``offset``, ``limit`` and ``total``
+
+        Parameters:
+            - page - a paging object as returned by the API
+    """
+    template = page.get("next")
+    if not template or page.get("total") is None:
+        return []
+    limit = page.get("limit") or len(page.get("items") or []) or 1
+    start = (page.get("offset") or 0) + limit
+    return [with_offset(template, offset)
+            for offset in range(start, page["total"], limit)]
+
+
+def page_items(pages):
+    """ Returns the non-null items of a list of pages, in order """
+    return [item for page in pages if page
+            for item in page.get("items") or [] if item is not None]
+
+
+def iter_pages(sp, page, prefetch=True):
+    """ Yields ``page`` and every following page, one at a time.
+
+        With ``prefetch``, the next page is requested on the client's thread
+        pool as soon as a page is yielded, so it downloads while the caller
+        processes the current one.
+
+        Parameters:
+            - sp - the Spotify client
+            - page - the first page, as returned by the API
+            - prefetch - fetch the next page in the background
+    """
+    while page:
+        following = None
+        if prefetch and page.get("next"):
+            following = sp._get_executor().submit(sp.next, page)
+        yield page
+        if following is not None:
+            page = following.result()
+        elif page.get("next"):
+            page = sp.next(page)
+        else:
+            page = None
+
+
+def iter_cursor_pages(sp, page, key=None):
+    """ Yields ``page`` and every page following it through its ``next``
+        cursor URL. Each cursor is only known once the previous page has
+        arrived, so pages are fetched one after another.
+
+        Parameters:
+            - sp - the Spotify client
+            - page - the first page, as returned by the API
+            - key - the key the paging object is nested under, if any
+              (e.g. "artists" for followed artists)
+    """
+    while page:
+        if key is not None:
+            page = page.get(key)
+            if not page:
+                break
+        yield page
+        page = sp._get(page["next"]) if page.get("next") else None
+
+
+def played_at_ms(item):
+    """ Returns the ``played_at`` time of a play history item as a unix
+        timestamp in milliseconds, the unit of the recently played cursors
+    """
+    played_at = item["played_at"].rstrip("Z")
+    fmt = "%Y-%m-%dT%H:%M:%S.%f" if "." in played_at else "%Y-%m-%dT%H:%M:%S"
+    dt = datetime.strptime(played_at, fmt)
+    return calendar.timegm(dt.timetuple()) * 1000 + dt.microsecond // 1000
+
+
+def new_plays(items, after=None):
+    """ Returns the play history items played after the ``after`` cursor,
+        oldest first and without duplicates
+
+        Parameters:
+            - items - play history items, in any order
+            - after - unix timestamp in milliseconds, or None for all items
+    """
+    plays = {}
+    for item in items:
+        ms = played_at_ms(item)
+        if after is None or ms > int(after):
+            plays[(ms, (item.get("track") or {}).get("id"))] = item
+    return [plays[key] for key in sorted(plays, key=lambda key: key[0])]
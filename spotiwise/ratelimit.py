@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+""" Process-wide rate limiting shared by Spotify clients """
+
+__all__ = ["RateLimiter", "default_rate_limiter"]
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter(object):
+    """
+        A token bucket combined with a global pause.
+
+        Every API call reserves a token before it is sent. When any response
+        carries a ``Retry-After`` header, every caller sharing the limiter is
+        held back until the pause has elapsed, instead of each client backing
+        off on its own.
+
+        The limiter is thread-safe. Reservations are made up front, so
+        callers are released in the order they arrived.
+
+        Example usage::
+
+            limiter = spotiwise.RateLimiter(rate=10, burst=20)
+            sp1 = spotiwise.Spotify(auth_manager=..., rate_limiter=limiter)
+            sp2 = spotiwise.Spotify(auth_manager=..., rate_limiter=limiter)
+            print(limiter.stats())
+    """
+
+    default_retry_after = 1.0
+
+    def __init__(self, rate=None, burst=None):
+        """
+            Creates a RateLimiter
+
+            Parameters:
+                - rate - sustained number of requests per second. ``None``
+                         disables the token bucket, leaving only the
+                         ``Retry-After`` pause.
+                - burst - number of requests that may be sent back to back
+                          before ``rate`` applies (default: ``rate``)
+        """
+        self.rate = rate
+        self.burst = burst or max(1, rate or 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """ Resets the throttling counters """
+        with self._lock:
+            self.requests = 0
+            self.throttled_requests = 0
+            self.throttled_seconds = 0.0
+            self.retry_after_pauses = 0
+
+    def stats(self):
+        """ Returns the throttling counters as a dict """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "throttled_requests": self.throttled_requests,
+                "throttled_seconds": self.throttled_seconds,
+                "retry_after_pauses": self.retry_after_pauses,
+            }
+
+    def reserve(self):
+        """ Reserves a slot for one request and returns how many seconds
+            the caller has to wait before sending it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            delay = max(0.0, self._paused_until - now)
+            if self.rate:
+                elapsed = now - self._updated
+                self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+                self._updated = now
+                self._tokens -= 1
+                if self._tokens < 0:
+                    delay = max(delay, -self._tokens / self.rate)
+            self.requests += 1
+            if delay > 0:
+                self.throttled_requests += 1
+                self.throttled_seconds += delay
+            return delay
+
+    def acquire(self):
+        """ Blocks until a request may be sent """
+        delay = self.reserve()
+        if delay > 0:
+            logger.debug('Rate limited, sleeping for %.2f seconds', delay)
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        """ Holds back every caller for the given number of seconds
+
+            Parameters:
+                - seconds - the delay, usually from a ``Retry-After`` header
+        """
+        with self._lock:
+            self.retry_after_pauses += 1
+            self._paused_until = max(self._paused_until,
+                                     time.monotonic() + seconds)
+        logger.warning('Rate limited by the API, pausing for %s seconds',
+                       seconds)
+
+    def retry_after(self, headers):
+        """ Returns the delay requested by a ``Retry-After`` header
+
+            Parameters:
+                - headers - the headers of a 429 response
+        """
+        try:
+            return float(headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            return self.default_retry_after
+
+
+#: Limiter shared by every client that doesn't provide its own
+default_rate_limiter = RateLimiter()
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+""" Exhaustive search past the API's offset cap, by partitioning queries """
+
+import collections
+import datetime
+import logging
+from concurrent.futures import FIRST_COMPLETED, wait
+
+logger = logging.getLogger(__name__)
+
+# the API refuses pages reaching past this many results of a query
+MAX_SEARCH_RESULTS = 1000
+SEARCH_PAGE_SIZE = 50
+# the widest `year:` range crawled; queries above the cap are bisected
+FIRST_YEAR = 1000
+
+# types that accept the `year:` filter and can therefore be partitioned
+PARTITIONABLE_TYPES = ("album", "artist", "track")
+
+
+def partition_query(q, years):
+    """ Returns ``q`` restricted to the ``(first, last)`` year range """
+    first, last = years
+    if first == last:
+        return "%s year:%d" % (q, first)
+    return "%s year:%d-%d" % (q, first, last)
+
+
+def split_years(years):
+    """ Bisects a ``(first, last)`` year range, or returns None if it is a
+        single year
+    """
+    first, last = years
+    if first >= last:
+        return None
+    middle = (first + last) // 2
+    return [(first, middle), (middle + 1, last)]
+
+
+def follow_up(q, type, task, page):
+    """ Returns the search tasks a page of results calls for.
+
+        A task is a ``(query, years, offset)`` tuple and the offset 0 page
+        of a query is its probe: once its ``total`` is known, the query is
+        either bisected into ``year:`` partitions, which cover the probe's
+        own items, or its remaining pages up to the cap are requested.
+
+        Parameters:
+            - q - the original search query
+            - type - the searched item type
+            - task - the task the page answers
+            - page - the paging object of the results
+    """
+    query, years, offset = task
+    if offset != 0:
+        return []
+    total = page.get("total") or 0
+    if total > MAX_SEARCH_RESULTS and type in PARTITIONABLE_TYPES:
+        parts = split_years(
+            years or (FIRST_YEAR, datetime.date.today().year + 1))
+        if parts is not None:
+            return [(partition_query(q, part), part, 0) for part in parts]
+    if total > MAX_SEARCH_RESULTS:
+        logger.warning(
+            'Search for %r matches %d items, only the first %d '
+            'can be retrieved', query, total, MAX_SEARCH_RESULTS)
+    return [(query, years, page_offset) for page_offset in range(
+        SEARCH_PAGE_SIZE, min(total, MAX_SEARCH_RESULTS), SEARCH_PAGE_SIZE)]
+
+
+def crawl(sp, q, type="track", market=None, concurrency=None):
+    """ Yields every item a search query matches, past the offset cap.
+
+        A query matching more than ``MAX_SEARCH_RESULTS`` items is split into
+        bisected ``year:`` ranges until every partition fits under the cap
+        (see :func:`follow_up`). All requests, partition probes and pages
+        alike, are scheduled on the client's thread pool with at most
+        ``concurrency`` in flight, and items are yielded as their page
+        arrives, de-duplicated by ID.
+
+        Parameters:
+            - sp - the Spotify client
+            - q - the search query
+            - type - a single item type
+            - market - an ISO 3166-1 alpha-2 country code
+            - concurrency - the maximum number of requests in flight,
+                            ``sp.max_workers`` by default
+    """
+    plural = type + "s"
+    executor = sp._get_executor()
+    window = max(1, concurrency or sp.max_workers)
+    queue = collections.deque([(q, None, 0)])
+    in_flight = {}
+    seen = set()
+
+    def search(query, offset):
+        return sp.search(query, limit=SEARCH_PAGE_SIZE, offset=offset,
+                         type=type, market=market)
+
+    try:
+        while queue or in_flight:
+            while queue and len(in_flight) < window:
+                task = queue.popleft()
+                in_flight[executor.submit(search, task[0], task[2])] = task
+            done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+            for future in done:
+                task = in_flight.pop(future)
+                page = future.result()[plural]
+                tasks = follow_up(q, type, task, page)
+                queue.extend(tasks)
+                if tasks and tasks[0][2] == 0:
+                    continue  # partitioned, the partitions return these items
+                for item in page.get("items") or []:
+                    if item is None or item.get("id") in seen:
+                        continue
+                    seen.add(item.get("id"))
+                    yield item
+    finally:
+        for future in in_flight:
+            future.cancel()
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+""" Compact pickle and msgpack serialization of Spotiwise objects """
+
+__all__ = ["dumps", "loads", "packb", "unpackb"]
+
+import logging
+import pickle
+
+from .object_classes import (
+    SpotiwiseAlbum,
+    SpotiwiseArtist,
+    SpotiwiseItem,
+    SpotiwisePlayback,
+    SpotiwisePlaylist,
+    SpotiwiseTrack,
+    SpotiwiseUser,
+    _pickled_shared,
+    _restore,
+    _shared_key,
+    _SpotiwiseBase,
+    attach
+)
+
+try:
+    import msgpack
+except ImportError:  # msgpack is an optional dependency
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+_CLASSES = dict((cls.__name__, cls) for cls in (
+    SpotiwiseAlbum, SpotiwiseArtist, SpotiwiseItem, SpotiwisePlayback,
+    SpotiwisePlaylist, SpotiwiseTrack, SpotiwiseUser))
+
+# msgpack extension types: an object, and a reference to one already written
+_OBJECT = 1
+_REFERENCE = 2
+
+
+def dumps(obj, protocol=pickle.HIGHEST_PROTOCOL):
+    """ Pickles Spotiwise objects without their client, writing objects
+        shared by several others (e.g. the album of 500 tracks) once
+
+        Parameters:
+            - obj - an object, or a structure holding objects
+            - protocol - the pickle protocol
+    """
+    token = _pickled_shared.set({})
+    try:
+        return pickle.dumps(obj, protocol)
+    finally:
+        _pickled_shared.reset(token)
+
+
+def loads(data, sp=None):
+    """ Unpickles Spotiwise objects, attaching `sp` to them and interning
+        them into its identity map and user cache
+
+        Parameters:
+            - data - bytes from `dumps` or `pickle.dumps`
+            - sp - the client to attach
+    """
+    with attach(sp):
+        return pickle.loads(data)
+
+
+def _require_msgpack():
+    if msgpack is None:
+        raise ImportError("The msgpack codec requires msgpack: pip install msgpack")
+
+
+def packb(obj):
+    """ Encodes Spotiwise objects with msgpack, without their client and
+        writing shared objects once (see `dumps`). Lists, dicts and JSON
+        values are encoded as such, tuples as lists.
+
+        Parameters:
+            - obj - an object, or a structure holding objects
+    """
+    _require_msgpack()
+    shared = set()
+
+    def default(value):
+        if not isinstance(value, _SpotiwiseBase):
+            raise TypeError("Cannot serialize %r" % (value,))
+        name = type(value).__name__
+        if name not in _CLASSES:
+            raise TypeError("Cannot serialize %s objects" % name)
+        key = _shared_key(value)
+        if key is not None:
+            if key in shared:
+                return msgpack.ExtType(_REFERENCE, encode(list(key)))
+            shared.add(key)
+        return msgpack.ExtType(_OBJECT, encode([name, value.__getstate__()]))
+
+    def encode(value):
+        return msgpack.packb(value, default=default, use_bin_type=True)
+
+    return encode(obj)
+
+
+def unpackb(data, sp=None):
+    """ Decodes objects encoded by `packb`, attaching `sp` to them and
+        interning them into its identity map and user cache
+
+        Parameters:
+            - data - bytes from `packb`
+            - sp - the client to attach
+    """
+    _require_msgpack()
+    shared = {}
+
+    def ext_hook(code, payload):
+        if code == _REFERENCE:
+            name, id = decode(payload)
+            return shared[(name, id)]
+        if code != _OBJECT:
+            return msgpack.ExtType(code, payload)
+        # nested objects are decoded first, so references point backwards
+        name, state = decode(payload)
+        obj = _restore(_CLASSES[name], state)
+        key = _shared_key(obj)
+        if key is not None:
+            shared.setdefault(key, obj)
+        return obj
+
+    def decode(payload):
+        return msgpack.unpackb(payload, ext_hook=ext_hook, raw=False,
+                               strict_map_key=False)
+
+    with attach(sp):
+        return decode(data)
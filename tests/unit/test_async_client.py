@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import functools
+import json
+import unittest
+
+from spotiwise import SpotifyException
+from spotiwise.async_client import AsyncSpotify, aiohttp
+from spotiwise.object_classes import SpotiwiseArtist, SpotiwiseUser
+
+
+class _FakeResponse(object):
+
+    def __init__(self, status, body, headers=None):
+        self.status = status
+        self.headers = headers or {}
+        self._body = json.dumps(body).encode() if body is not None else b''
+
+    async def read(self):
+        return self._body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+class _FakeSession(object):
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        return self.responses.pop(0)
+
+
+class _AsyncTestCase(unittest.TestCase):
+    """ Runs each coroutine test method on a new event loop, as
+        unittest.IsolatedAsyncioTestCase does from Python 3.8 """
+
+    def __init__(self, methodName="runTest"):
+        super(_AsyncTestCase, self).__init__(methodName)
+        test = getattr(self, methodName, None)
+        if asyncio.iscoroutinefunction(test):
+
+            @functools.wraps(test)
+            def run():
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+                try:
+                    loop.run_until_complete(test())
+                    loop.run_until_complete(loop.shutdown_asyncgens())
+                finally:
+                    asyncio.set_event_loop(None)
+                    loop.close()
+
+            setattr(self, methodName, run)
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+class AsyncSpotifyTest(_AsyncTestCase):
+
+    def _make_client(self, *responses):
+        session = _FakeSession(responses)
+        return AsyncSpotify(auth="TOKEN", session=session, backoff_factor=0), session
+
+    async def test_artist_is_wrapped(self):
+        sp, session = self._make_client(
+            _FakeResponse(200, {"id": "abc", "name": "Weezer"}))
+
+        artist = await sp.artist("spotify:artist:abc")
+
+        self.assertIsInstance(artist, SpotiwiseArtist)
+        self.assertEqual(artist.name, "Weezer")
+        method, url, kwargs = session.calls[0]
+        self.assertEqual(url, "https://api.spotify.com/v1/artists/abc")
+        self.assertEqual(kwargs["headers"]["Authorization"], "Bearer TOKEN")
+
+    async def test_none_params_are_dropped(self):
+        sp, session = self._make_client(_FakeResponse(200, {"tracks": {}}))
+
+        await sp.search("weezer", market=None)
+
+        params = session.calls[0][2]["params"]
+        self.assertNotIn("market", params)
+        self.assertEqual(params["q"], "weezer")
+
+    async def test_retries_on_server_error(self):
+        sp, session = self._make_client(
+            _FakeResponse(503, None),
+            _FakeResponse(200, {"id": "abc", "name": "Weezer"}))
+
+        artist = await sp.artist("abc")
+
+        self.assertEqual(artist.id, "abc")
+        self.assertEqual(len(session.calls), 2)
+
+    async def test_429_raises_max_retries_when_retries_run_out(self):
+        sp, session = self._make_client(
+            *[_FakeResponse(429, None, {"Retry-After": "0"}) for _ in range(2)])
+        sp.status_retries = 1
+
+        with self.assertRaises(SpotifyException) as cm:
+            await sp._artist("abc")
+
+        self.assertEqual(cm.exception.http_status, 599)
+        self.assertIn("Max Retries", cm.exception.msg)
+        self.assertEqual(len(session.calls), 2)
+
+    async def test_client_error_raises(self):
+        sp, session = self._make_client(
+            _FakeResponse(404, {"error": {"message": "non existing id"}}))
+
+        with self.assertRaises(SpotifyException) as cm:
+            await sp._artist("abc")
+
+        self.assertEqual(cm.exception.http_status, 404)
+        self.assertIn("non existing id", cm.exception.msg)
+
+    async def test_iter_methods_are_async_generators(self):
+        page = {"items": [{"id": "t1", "name": "One", "artists": []}],
+                "offset": 0, "limit": 1, "total": 2,
+                "next": "https://api.spotify.com/v1/albums/al/tracks?offset=1"}
+        last = dict(page, items=[{"id": "t2", "name": "Two", "artists": []}],
+                    offset=1, next=None)
+        sp, session = self._make_client(_FakeResponse(200, page),
+                                        _FakeResponse(200, last))
+
+        ids = [track.id async for track in sp.iter_album_tracks("al")]
+
+        self.assertEqual(ids, ["t1", "t2"])
+
+    async def test_search_markets_stops_at_total(self):
+        sp, session = self._make_client(
+            *[_FakeResponse(200, {"tracks": {"items": [{"id": str(i)}] * 2}})
+              for i in range(3)])
+
+        results = await sp.search_markets("q", limit=2, markets=["US", "CA", "MX"],
+                                          total=3, concurrency=1)
+
+        self.assertEqual(list(results), ["US", "CA"])
+        self.assertEqual(len(results["CA"]["tracks"]["items"]), 1)
+        self.assertEqual(len(session.calls), 2)
+
+    async def test_search_markets_trims_a_copy(self):
+        shared = {"tracks": {"items": [{"id": "t1"}, {"id": "t2"}]}}
+        sp, session = self._make_client()
+
+        async def get(*args, **kwargs):
+            return shared
+
+        sp._get = get
+        results = await sp.search_markets("q", limit=2, markets=["US", "CA"],
+                                          total=3, concurrency=1)
+
+        self.assertEqual(len(results["CA"]["tracks"]["items"]), 1)
+        self.assertEqual(len(shared["tracks"]["items"]), 2)
+
+    async def test_search_all_is_an_async_generator(self):
+        page = {"tracks": {"items": [{"id": "t1", "name": "One", "artists": []}],
+                           "total": 1, "offset": 0, "limit": 50}}
+        sp, session = self._make_client(_FakeResponse(200, page))
+
+        ids = [track.id async for track in sp.search_all("one")]
+
+        self.assertEqual(ids, ["t1"])
+
+    async def test_unresolved_user_warns_instead_of_blocking(self):
+        sp, session = self._make_client()
+        user = SpotiwiseUser(sp=sp, id="stub")
+
+        with self.assertWarns(RuntimeWarning):
+            self.assertEqual(user.display_name, "__stub__")
+
+        self.assertFalse(user.resolved)
+        self.assertEqual(session.calls, [])
+
+    async def test_user_playlist_precache_loads_every_page(self):
+        url = "https://api.spotify.com/v1/playlists/pl/tracks"
+        item = {"track": {"id": "t1", "name": "One", "artists": []},
+                "added_by": {"id": "u"}}
+        playlist = {"id": "pl", "name": "Playlist", "owner": {"id": "u"},
+                    "tracks": {"href": url, "items": [item], "offset": 0, "limit": 1,
+                               "total": 2, "next": url + "?offset=1&limit=1"}}
+        last = {"items": [dict(item, track={"id": "t2", "name": "Two", "artists": []})],
+                "offset": 1, "limit": 1, "total": 2, "next": None}
+        sp, session = self._make_client(_FakeResponse(200, playlist),
+                                        _FakeResponse(200, last))
+
+        result = await sp.user_playlist("u", "pl", precache=True)
+
+        self.assertEqual([track.id for track in result.tracks], ["t1", "t2"])
+        self.assertIs(result.items[1].sp, sp)
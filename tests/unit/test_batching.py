@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import threading
+import unittest
+
+from spotiwise import Spotify, SpotifyException
+from spotiwise.object_classes import SpotiwiseArtist
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
+
+def _fake_artists(ids):
+    return {"artists": [None if id == "missing" else {"id": id, "name": id.upper()}
+                        for id in ids]}
+
+
+class BatchingTest(unittest.TestCase):
+
+    def test_lookups_in_block_are_sent_together(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+
+        with mock.patch.object(sp, "_artists", side_effect=_fake_artists) as artists:
+            with sp.batching():
+                futures = [sp.artist(id) for id in ["a", "b", "spotify:artist:a"]]
+                self.assertEqual(artists.call_count, 0)
+
+        artists.assert_called_once_with(["a", "b"])
+        results = [f.result() for f in futures]
+        self.assertTrue(all(isinstance(r, SpotiwiseArtist) for r in results))
+        self.assertEqual([r.name for r in results], ["A", "B", "A"])
+
+    def test_full_batch_is_sent_immediately(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        ids = ["id%02d" % i for i in range(60)]
+
+        with mock.patch.object(sp, "_artists", side_effect=_fake_artists) as artists:
+            with sp.batching():
+                for id in ids:
+                    sp.artist(id)
+                self.assertEqual(artists.call_count, 1)
+
+        self.assertEqual(artists.call_count, 2)
+
+    def test_early_result_flushes_and_missing_ids_raise(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+
+        with mock.patch.object(sp, "_artists", side_effect=_fake_artists):
+            with sp.batching():
+                found = sp.artist("a")
+                missing = sp.artist("missing")
+                self.assertEqual(found.result().name, "A")
+
+        with self.assertRaises(SpotifyException):
+            missing.result()
+
+    def test_window_batches_lookups_across_threads(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None, batch_window=0.1)
+        results = {}
+
+        def lookup(id):
+            results[id] = sp.artist(id)
+
+        with mock.patch.object(sp, "_artists", side_effect=_fake_artists) as artists:
+            threads = [threading.Thread(target=lookup, args=(id,))
+                       for id in ["a", "b", "c"]]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(artists.call_count, 1)
+        self.assertEqual(results["c"].name, "C")
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import requests
+
+from spotiwise import Spotify
+from spotiwise.cache import (
+    MemoryResponseCache,
+    SQLiteResponseCache,
+    SearchCache,
+    TTLCache
+)
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
+
+def _response(status_code, body=None, headers=None, content=b'{}'):
+    response = mock.Mock(spec=requests.Response)
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.content = content
+    response.json.return_value = body
+    return response
+
+
+class MemoryResponseCacheTest(unittest.TestCase):
+
+    def test_evicts_least_recently_used_over_budget(self):
+        cache = MemoryResponseCache(max_bytes=10)
+        cache.set("a", "etag-a", {"a": 1}, b"12345")
+        cache.set("b", "etag-b", {"b": 1}, b"12345")
+        cache.get("a")
+
+        cache.set("c", "etag-c", {"c": 1}, b"12345")
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), ("etag-a", {"a": 1}))
+        self.assertEqual(cache.current_bytes, 10)
+
+    def test_oversized_body_is_not_cached(self):
+        cache = MemoryResponseCache(max_bytes=4)
+        cache.set("a", "etag-a", {}, b"12345")
+        self.assertIsNone(cache.get("a"))
+
+
+class SQLiteResponseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_round_trip_survives_reopen(self):
+        path = os.path.join(self.tmpdir, "responses.db")
+        cache = SQLiteResponseCache(path)
+        cache.set("a", "etag-a", {"a": 1}, b'{"a": 1}')
+        cache.close()
+
+        self.assertEqual(SQLiteResponseCache(path).get("a"), ("etag-a", {"a": 1}))
+
+
+class ConditionalRequestTest(unittest.TestCase):
+
+    def _make_client(self, *responses):
+        session = mock.Mock(spec=requests.Session)
+        session.request.side_effect = list(responses)
+        cache = MemoryResponseCache()
+        sp = Spotify(auth="TOKEN", requests_session=session,
+                     rate_limiter=None, response_cache=cache)
+        return sp, session
+
+    def test_not_modified_returns_cached_body(self):
+        body = {"id": "abc", "name": "Pinkerton"}
+        sp, session = self._make_client(
+            _response(200, body, {"ETag": '"v1"'}),
+            _response(304))
+
+        first = sp._album("abc")
+        second = sp._album("abc")
+
+        self.assertIs(second, first)
+        headers = session.request.call_args[1]["headers"]
+        self.assertEqual(headers["If-None-Match"], '"v1"')
+
+    def test_user_scoped_requests_are_not_cached(self):
+        sp, session = self._make_client(
+            _response(200, {"items": []}, {"ETag": '"v1"'}),
+            _response(200, {"items": []}, {"ETag": '"v1"'}))
+
+        sp.current_user_saved_tracks()
+        sp.current_user_saved_tracks()
+
+        headers = session.request.call_args[1]["headers"]
+        self.assertNotIn("If-None-Match", headers)
+
+
+def _search_page(offset, limit, total=200):
+    items = [{"id": "t%d" % i} for i in range(offset, min(offset + limit, total))]
+    return {"tracks": {"items": items, "offset": offset, "limit": limit,
+                       "total": total}}
+
+
+class TTLCacheTest(unittest.TestCase):
+
+    def test_entries_expire_and_evict(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertNotIn("b", cache)
+        self.assertEqual(cache.get("a"), 1)
+
+        with mock.patch("spotiwise.cache.time.monotonic",
+                        return_value=time.monotonic() + 61):
+            self.assertIsNone(cache.get("a"))
+
+
+class SearchCacheTest(unittest.TestCase):
+
+    def test_wider_page_is_assembled_from_narrower_pages(self):
+        cache = SearchCache()
+        for offset in range(0, 50, 10):
+            cache.put("Weezer", "track", "us", 10, offset, _search_page(offset, 10))
+
+        page = cache.get("  weezer ", "track", "US", 50, 0)["tracks"]
+
+        self.assertEqual([t["id"] for t in page["items"]],
+                         ["t%d" % i for i in range(50)])
+        self.assertEqual(page["total"], 200)
+        self.assertIn("offset=50", page["next"])
+        self.assertIsNone(cache.get("weezer", "track", "US", 50, 10))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_persists_to_disk(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "search.db")
+        cache = SearchCache(path=path)
+        cache.put("weezer", "track", None, 10, 0, _search_page(0, 10))
+        cache.close()
+
+        page = SearchCache(path=path).get("weezer", "track", None, 5, 5)
+
+        self.assertEqual([t["id"] for t in page["tracks"]["items"]],
+                         ["t5", "t6", "t7", "t8", "t9"])
+
+    def test_search_consults_cache_before_requesting(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None, search_cache=SearchCache())
+
+        with mock.patch.object(
+                sp, "_get", side_effect=lambda url, **kw: _search_page(
+                    kw["offset"], kw["limit"])) as _get:
+            sp.search("weezer", limit=20)
+            result = sp.search("Weezer", limit=10, offset=5)
+
+        self.assertEqual(_get.call_count, 1)
+        self.assertEqual(result["tracks"]["items"][0]["id"], "t5")
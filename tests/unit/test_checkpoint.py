@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from spotiwise import (
+    FileCheckpointStore,
+    MemoryCheckpointStore,
+    SQLiteCheckpointStore,
+    Spotify
+)
+from spotiwise.object_classes import SpotiwiseArtist
+from spotiwise.pagination import played_at_ms
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
+FOLLOWING_URL = "https://api.spotify.com/v1/me/following?type=artist&limit=2"
+
+
+def _play(second, track_id):
+    return {"track": {"id": track_id},
+            "played_at": "2020-01-01T00:00:%02d.500Z" % second}
+
+
+class CheckpointStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def test_file_store_persists(self):
+        path = os.path.join(self.tmpdir, "checkpoints.json")
+        FileCheckpointStore(path).set("user", 1577836800500)
+
+        self.assertEqual(FileCheckpointStore(path).get("user"), 1577836800500)
+        self.assertIsNone(FileCheckpointStore(path).get("other"))
+
+    def test_sqlite_store_persists(self):
+        path = os.path.join(self.tmpdir, "checkpoints.db")
+        store = SQLiteCheckpointStore(path)
+        store.set("user", "artist-id")
+        store.close()
+
+        self.assertEqual(SQLiteCheckpointStore(path).get("user"), "artist-id")
+
+
+class CursorSyncTest(unittest.TestCase):
+
+    def test_played_at_ms(self):
+        self.assertEqual(played_at_ms(_play(1, "t")), 1577836801500)
+        self.assertEqual(
+            played_at_ms({"played_at": "2020-01-01T00:00:01Z"}), 1577836801000)
+
+    def test_recently_played_returns_new_plays_once(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        store = MemoryCheckpointStore()
+        page = {"items": [_play(3, "c"), _play(2, "b"), _play(1, "a")],
+                "next": None, "limit": 50}
+
+        with mock.patch.object(sp, "_get", return_value=page) as _get:
+            first = sp.sync_recently_played(store)
+            self.assertEqual([p["track"]["id"] for p in first], ["a", "b", "c"])
+            self.assertEqual(store.get("recently_played"), 1577836803500)
+
+            page["items"].insert(0, _play(4, "d"))
+            second = sp.sync_recently_played(store)
+
+        self.assertEqual([p["track"]["id"] for p in second], ["d"])
+        self.assertEqual(_get.call_args[1]["after"], 1577836803500)
+
+    def test_followed_artists_walks_cursor_pages(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        store = MemoryCheckpointStore()
+        pages = {
+            None: {"artists": {"items": [{"id": "a1", "name": "A1"}],
+                               "next": FOLLOWING_URL + "&after=a1"}},
+            FOLLOWING_URL + "&after=a1": {"artists": {
+                "items": [{"id": "a2", "name": "A2"}], "next": None}},
+        }
+
+        def get(url, **kwargs):
+            return pages[None] if url == "me/following" else pages[url]
+
+        with mock.patch.object(sp, "_get", side_effect=get) as _get:
+            artists = sp.sync_followed_artists(store)
+
+        self.assertTrue(all(isinstance(a, SpotiwiseArtist) for a in artists))
+        self.assertEqual([a.id for a in artists], ["a1", "a2"])
+        self.assertEqual(store.get("followed_artists"), "a2")
+        self.assertEqual(_get.call_count, 2)
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from spotiwise import ColumnarPlaylist, Spotify, columnar
+from spotiwise.object_classes import SpotiwiseItem
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
+
+def _item(i):
+    return {"added_at": "2020-01-0%dT00:00:00Z" % (i % 9 + 1),
+            "added_by": {"id": "u%d" % (i % 2)},
+            "track": {"id": "t%d" % i, "name": "Track %d" % i, "type": "track",
+                      "duration_ms": 1000 * i, "popularity": i,
+                      "explicit": i % 3 == 0, "artists": [{"name": "Artist"}]}}
+
+
+class ColumnarPlaylistTest(unittest.TestCase):
+
+    def setUp(self):
+        self.items = [_item(i) for i in range(10)]
+        self.items.append({"track": {"id": "e1", "type": "episode"}})
+        self.items.append({"track": None})
+
+    def test_rows_are_built_from_columns(self):
+        columns = ColumnarPlaylist.from_items(self.items)
+
+        self.assertEqual(len(columns), 10)
+        self.assertEqual(columns.track_ids(), ["t%d" % i for i in range(10)])
+        row = columns[-1]
+        self.assertIsInstance(row, SpotiwiseItem)
+        self.assertEqual(row.track.name, "Track 9")
+        self.assertEqual(row.track.artist, "Artist")
+        self.assertEqual(row.track.duration, 9)
+        self.assertEqual(row.added_at, "2020-01-01T00:00:00Z")
+        self.assertEqual(row.added_by.id, "u1")
+
+    def _check_aggregates_and_filters(self):
+        columns = ColumnarPlaylist.from_items(self.items)
+
+        self.assertEqual(columns.total_duration_ms(), 45000)
+        self.assertEqual(columns.explicit_only().track_ids(),
+                         ["t0", "t3", "t6", "t9"])
+        self.assertEqual(columns.added_by_user("u1").track_ids(),
+                         ["t1", "t3", "t5", "t7", "t9"])
+        self.assertEqual(columns.mask("popularity", lambda p: p >= 8), [8, 9])
+
+    @unittest.skipIf(columnar._optional("numpy") is None, "numpy is not installed")
+    def test_aggregates_and_filters_with_numpy(self):
+        self._check_aggregates_and_filters()
+
+    def test_aggregates_and_filters_without_numpy(self):
+        with mock.patch("spotiwise.columnar.numpy", None):
+            self._check_aggregates_and_filters()
+
+    def test_client_loads_columns_from_all_pages(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        url = "https://api.spotify.com/v1/playlists/pl/tracks"
+        first = {"items": self.items[:5], "offset": 0, "limit": 5, "total": 10,
+                 "next": url + "?offset=5&limit=5"}
+        second = {"items": self.items[5:10], "offset": 5, "limit": 5, "total": 10,
+                  "next": None}
+
+        with mock.patch.object(sp, "_get", side_effect=[first, second]) as _get:
+            columns = sp.playlist_columns("pl")
+
+        self.assertEqual(_get.call_args_list[0][1]["fields"], ColumnarPlaylist.fields)
+        self.assertEqual(len(columns), 10)
+
+    def test_columns_mark_unknown_values(self):
+        columns = ColumnarPlaylist.from_items(self.items[:2])
+        columns.extend_tracks([{"id": "s1", "name": "Found", "type": "track"}])
+
+        data = columns.columns()
+        self.assertEqual(list(data), list(ColumnarPlaylist.column_names))
+        self.assertEqual(data["id"], ["t0", "t1", "s1"])
+        self.assertEqual(data["artist"], ["Artist", "Artist", None])
+        self.assertEqual(data["popularity"], [0, 1, None])
+        self.assertEqual(data["added_at"][2], None)
+        self.assertEqual(data["added_by"], ["u0", "u1", None])
+
+    def test_export_requires_optional_dependencies(self):
+        columns = ColumnarPlaylist.from_items(self.items)
+        with mock.patch("spotiwise.columnar.pyarrow", None):
+            self.assertRaises(ImportError, columns.to_arrow)
+        with mock.patch("spotiwise.columnar.pandas", None):
+            self.assertRaises(ImportError, columns.to_pandas)
+
+    @unittest.skipIf(columnar._optional("pyarrow") is None, "pyarrow is not installed")
+    def test_to_arrow(self):
+        items = self.items + [{"track": {"id": "t10", "name": "Café", "type": "track"}}]
+        table = ColumnarPlaylist.from_items(items).to_arrow()
+
+        self.assertEqual(table.column_names, list(ColumnarPlaylist.column_names))
+        self.assertEqual(table.column("name").to_pylist()[-2:], ["Track 9", "Café"])
+        self.assertEqual(table.column("popularity").to_pylist()[-1], None)
+        self.assertEqual(table.column("added_by").to_pylist()[:3], ["u0", "u1", "u0"])
+        self.assertEqual(table.column("duration_ms").to_pylist()[9], 9000)
+
+    @unittest.skipIf(columnar._optional("pandas") is None, "pandas is not installed")
+    def test_to_pandas(self):
+        frame = ColumnarPlaylist.from_items(self.items).to_pandas()
+
+        self.assertEqual(list(frame.columns), list(ColumnarPlaylist.column_names))
+        self.assertEqual(int(frame["duration_ms"].sum()), 45000)
+
+    def test_client_loads_saved_track_columns(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        page = {"items": [{"added_at": item["added_at"], "track": item["track"]}
+                          for item in self.items[:10]],
+                "offset": 0, "limit": 50, "total": 10, "next": None}
+
+        with mock.patch.object(sp, "_get", return_value=page):
+            columns = sp.saved_tracks_columns()
+
+        self.assertEqual(columns.track_ids(), ["t%d" % i for i in range(10)])
+        self.assertEqual(columns.users, [])
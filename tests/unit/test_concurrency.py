@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import unittest
+
+from spotiwise import Spotify
+from spotiwise.concurrency import SingleFlight, chunk_unique, merge_chunk_results
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def _run_concurrently(self, n, target):
+        results = [None] * n
+
+        def run(i):
+            results[i] = target()
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_calls_share_one_result(self):
+        flight = SingleFlight()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.1)
+            return {"id": "abc"}
+
+        results = self._run_concurrently(
+            5, lambda: flight.do("artists/abc", fetch))
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertEqual(flight.stats(), {"hits": 4, "misses": 1})
+        self.assertEqual(len(flight), 0)
+
+    def test_exception_is_shared_and_key_released(self):
+        flight = SingleFlight()
+
+        def fail():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            flight.do("key", fail)
+        self.assertEqual(flight.do("key", lambda: 1), 1)
+
+    def test_spotify_get_coalesces_identical_requests(self):
+        sp = Spotify(auth="TOKEN", coalesce_requests=True, rate_limiter=None)
+
+        def internal_call(method, url, payload, params):
+            time.sleep(0.1)
+            return {"url": url, "params": params}
+
+        with mock.patch.object(sp, "_internal_call",
+                               side_effect=internal_call) as call:
+            self._run_concurrently(4, lambda: sp._get("artists/abc", market="US"))
+            sp._get("artists/abc", market="SE")
+
+        self.assertEqual(call.call_count, 2)
+        self.assertEqual(sp.single_flight.stats()["hits"], 3)
+
+
+class ChunkingTest(unittest.TestCase):
+
+    def test_chunk_unique_drops_duplicates_in_order(self):
+        self.assertEqual(chunk_unique(["a", "b", "a", "c", "d"], 2),
+                         [["a", "b"], ["c", "d"]])
+
+    def test_merge_restores_input_order_and_duplicates(self):
+        ids = ["b", "a", "b"]
+        chunks = [["b"], ["a"]]
+        responses = [{"tracks": ["B"]}, {"tracks": ["A"]}]
+
+        self.assertEqual(merge_chunk_results(ids, chunks, responses, "tracks"),
+                         ["B", "A", "B"])
+
+    def test_tracks_are_requested_in_api_sized_chunks(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None, max_workers=4)
+        ids = ["id%03d" % i for i in range(120)] + ["id000"]
+
+        def get(url, **kwargs):
+            chunk = url.split("ids=")[1].split(",")
+            return {"tracks": [{"id": id} for id in chunk]}
+
+        with mock.patch.object(sp, "_get", side_effect=get) as _get:
+            result = sp._tracks(ids)
+
+        self.assertEqual(_get.call_count, 3)
+        self.assertTrue(all(len(call[0][0].split(",")) <= 50
+                            for call in _get.call_args_list))
+        self.assertEqual([t["id"] for t in result["tracks"]], ids)
+
+    def test_contains_results_follow_input_order(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        ids = ["id%03d" % i for i in range(30)]
+
+        def get(url, **kwargs):
+            chunk = url.split("ids=")[1].split(",")
+            return [int(id[2:]) % 2 == 0 for id in chunk]
+
+        with mock.patch.object(sp, "_get", side_effect=get) as _get:
+            result = sp.current_user_saved_albums_contains(ids)
+
+        self.assertEqual(_get.call_count, 2)
+        self.assertEqual(result, [i % 2 == 0 for i in range(30)])
+
+
+class SearchMarketsTest(unittest.TestCase):
+
+    def _fake_search(self, in_flight, peak, lock):
+        def search(url, **kwargs):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+            items = [{"id": "%s%d" % (kwargs["market"], i)}
+                     for i in range(kwargs["limit"])]
+            return {"tracks": {"items": items}}
+        return search
+
+    def test_markets_are_searched_concurrently_up_to_cap(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        in_flight, peak, lock = [0], [0], threading.Lock()
+        markets = ["M%02d" % i for i in range(12)]
+
+        with mock.patch.object(sp, "_get",
+                               side_effect=self._fake_search(in_flight, peak, lock)):
+            results = sp.search_markets("q", limit=2, markets=markets, concurrency=3)
+
+        self.assertEqual(list(results), markets)
+        self.assertEqual(peak[0], 3)
+
+    def test_total_trims_results_and_stops_requesting(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        in_flight, peak, lock = [0], [0], threading.Lock()
+        markets = ["M%02d" % i for i in range(20)]
+
+        with mock.patch.object(sp, "_get",
+                               side_effect=self._fake_search(in_flight, peak, lock)) as _get:
+            results = sp.search_markets("q", limit=4, markets=markets, total=10,
+                                        concurrency=2)
+
+        self.assertEqual(list(results), markets[:3])
+        self.assertEqual(len(results["M02"]["tracks"]["items"]), 2)
+        self.assertLessEqual(_get.call_count, 5)
+
+    def test_total_trims_a_copy_of_shared_results(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        shared = {"tracks": {"items": [{"id": "t1"}, {"id": "t2"}]}}
+
+        with mock.patch.object(sp, "_get", return_value=shared):
+            results = sp.search_markets("q", limit=2, markets=["US", "CA"], total=3,
+                                        concurrency=1)
+
+        self.assertEqual(len(results["CA"]["tracks"]["items"]), 1)
+        self.assertEqual(len(shared["tracks"]["items"]), 2)
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+import random
+import unittest
+
+from spotiwise import PlaylistDiff, Spotify, diff_playlists
+from spotiwise.diff import increasing_subsequence, sync_plan
+from spotiwise.object_classes import SpotiwiseItem, SpotiwisePlaylist, SpotiwiseTrack
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
+
+def _apply(old, diff):
+    """ Rebuilds the new list from the old one and a diff """
+    removed = set(position for _, position in diff.removed)
+    moved = dict((old_position, new_position) for _, old_position, new_position in diff.moved)
+    size = len(old) - len(removed) + len(diff.added)
+    new = [None] * size
+    for uri, position in diff.added:
+        new[position] = uri
+    for old_position, new_position in moved.items():
+        new[new_position] = old[old_position]
+    kept = [uri for position, uri in enumerate(old)
+            if position not in removed and position not in moved]
+    free = iter(i for i, uri in enumerate(new) if uri is None)
+    for uri in kept:
+        new[next(free)] = uri
+    return new
+
+
+class DiffTest(unittest.TestCase):
+
+    def test_increasing_subsequence(self):
+        values = [3, 1, 4, 1, 5, 9, 2, 6]
+        indexes = increasing_subsequence(values)
+        self.assertEqual(len(indexes), 4)
+        self.assertEqual(sorted(values[i] for i in indexes),
+                         [values[i] for i in indexes])
+        self.assertEqual(increasing_subsequence([]), [])
+
+    def test_adds_removes_and_moves(self):
+        diff = diff_playlists(["a", "b", "c", "d"], ["b", "c", "a", "e"])
+
+        self.assertEqual(diff.removed, [("d", 3)])
+        self.assertEqual(diff.added, [("e", 3)])
+        self.assertEqual(diff.moved, [("a", 0, 2)])
+
+    def test_duplicates_are_matched_by_occurrence(self):
+        diff = diff_playlists(["a", "b", "a", "a"], ["a", "a", "b"])
+
+        self.assertEqual(diff.removed, [("a", 3)])
+        self.assertEqual(diff.added, [])
+        self.assertEqual(len(diff.moved), 1)
+
+    def test_identical_snapshots(self):
+        self.assertFalse(diff_playlists(["a", "a", "b"], ["a", "a", "b"]))
+        self.assertIsInstance(diff_playlists([], []), PlaylistDiff)
+
+    def test_diff_rebuilds_the_target(self):
+        rng = random.Random(7)
+        for _ in range(200):
+            old = [rng.choice("abcdef") for _ in range(rng.randint(0, 12))]
+            new = [rng.choice("abcdefg") for _ in range(rng.randint(0, 12))]
+            self.assertEqual(_apply(old, diff_playlists(old, new)), new)
+            with mock.patch("spotiwise.diff.MAX_PAIRS_PER_TRACK", 0):
+                self.assertEqual(_apply(old, diff_playlists(old, new)), new)
+
+    def test_common_subsequence_keeps_shifted_duplicates(self):
+        diff = diff_playlists(["a", "b", "a", "c"], ["b", "a", "c"])
+
+        self.assertEqual(diff.removed, [("a", 0)])
+        self.assertEqual(diff.moved, [])
+
+    def test_playlists_and_tracks(self):
+        tracks = [{"track": {"id": id, "name": id, "uri": "spotify:track:" + id}}
+                  for id in ("a", "b")]
+        playlist = SpotiwisePlaylist(id="pl", name="Playlist", owner={"id": "u"},
+                                     tracks={"items": tracks, "total": 2})
+
+        diff = playlist.diff([SpotiwiseTrack(id="b", name="b"), "spotify:track:a"])
+
+        self.assertEqual(diff.moved, [("spotify:track:a", 0, 1)])
+
+    def test_missing_and_local_tracks_are_rejected(self):
+        missing = SpotiwiseItem.lazy({"track": None})
+        local = SpotiwiseItem.lazy({"track": {"uri": "spotify:local:a:b:c:1"},
+                                    "is_local": True})
+
+        with self.assertRaisesRegex(ValueError, "Track 1 is missing"):
+            diff_playlists(["spotify:track:a", missing], [])
+        with self.assertRaisesRegex(ValueError, "Track 0 is a local track"):
+            diff_playlists([local], [])
+        with self.assertRaisesRegex(ValueError, "Track 0 is a local track"):
+            diff_playlists([], ["spotify:local:a:b:c:1"])
+
+
+def _run(current, operations):
+    """ Applies a sync plan the way the Web API does """
+    current = list(current)
+    for operation in operations:
+        if operation[0] == "remove":
+            for uri, position in operation[1]:
+                assert current[position] == uri
+                del current[position]
+        elif operation[0] == "reorder":
+            _, start, length, insert_before = operation
+            block = current[start:start + length]
+            del current[start:start + length]
+            if insert_before > start:
+                insert_before -= length
+            current[insert_before:insert_before] = block
+        else:
+            _, uris, position = operation
+            current[position:position] = uris
+    return current
+
+
+class SyncPlanTest(unittest.TestCase):
+
+    def test_plan_reaches_the_target(self):
+        rng = random.Random(11)
+        for _ in range(300):
+            current = [rng.choice("abcdefgh") for _ in range(rng.randint(0, 15))]
+            target = [rng.choice("abcdefghij") for _ in range(rng.randint(0, 15))]
+            self.assertEqual(_run(current, sync_plan(current, target)), target)
+            with mock.patch("spotiwise.diff.MAX_PAIRS_PER_TRACK", 0):
+                self.assertEqual(_run(current, sync_plan(current, target)), target)
+
+    def test_removes_and_adds_are_batched(self):
+        current = ["r%d" % i for i in range(150)] + ["k"]
+        target = ["k"] + ["a%d" % i for i in range(250)]
+
+        operations = sync_plan(current, target)
+
+        self.assertEqual([op[0] for op in operations],
+                         ["remove", "remove", "add", "add", "add"])
+        self.assertEqual(operations[0][1][0], ("r149", 149))
+        self.assertEqual(len(operations[0][1]), 100)
+        self.assertEqual([(len(op[1]), op[2]) for op in operations[2:]],
+                         [(100, 1), (100, 101), (50, 201)])
+
+    def test_adjacent_moves_share_a_range(self):
+        operations = sync_plan(["a", "b", "c", "d", "e"], ["d", "e", "a", "b", "c"])
+
+        self.assertEqual(operations, [("reorder", 3, 2, 0)])
+        self.assertEqual(sync_plan(["a", "b"], ["a", "b"]), [])
+
+
+class SyncPlaylistTest(unittest.TestCase):
+
+    def test_sync_playlist_chains_snapshots(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        items = [{"track": {"uri": "spotify:track:" + id}} for id in "abcx"]
+        page = {"items": items, "offset": 0, "limit": 100, "total": 4, "next": None}
+        snapshots = iter("s%d" % i for i in range(1, 10))
+
+        def respond(*args, **kwargs):
+            return {"snapshot_id": next(snapshots)}
+
+        with mock.patch.object(sp, "_get", side_effect=[{"snapshot_id": "s0"}, page]), \
+                mock.patch.object(sp, "_delete", side_effect=respond) as _delete, \
+                mock.patch.object(sp, "_put", side_effect=respond) as _put, \
+                mock.patch.object(sp, "_post", side_effect=respond) as _post:
+            summary = sp.sync_playlist("pl", ["c", "a", "b", "spotify:track:d"])
+
+        self.assertEqual(summary, {"snapshot_id": "s3", "requests": 3,
+                                   "removed": 1, "moved": 1, "added": 1})
+        self.assertEqual(_delete.call_args[1]["payload"], {
+            "tracks": [{"uri": "spotify:track:x", "positions": [3]}],
+            "snapshot_id": "s0"})
+        self.assertEqual(_put.call_args[1]["payload"], {
+            "range_start": 2, "range_length": 1, "insert_before": 0,
+            "snapshot_id": "s1"})
+        self.assertEqual(_post.call_args[1]["payload"], ["spotify:track:d"])
+        self.assertEqual(_post.call_args[1]["position"], 3)
+
+    def _sync_rejected(self, item):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        items = [{"track": {"uri": "spotify:track:a"}}, item]
+        page = {"items": items, "offset": 0, "limit": 100, "total": 2, "next": None}
+
+        with mock.patch.object(sp, "_get", side_effect=[{"snapshot_id": "s0"}, page]), \
+                mock.patch.object(sp, "_delete") as _delete, \
+                mock.patch.object(sp, "_put") as _put, \
+                mock.patch.object(sp, "_post") as _post:
+            with self.assertRaises(ValueError) as raised:
+                sp.sync_playlist("pl", ["a"])
+
+        self.assertFalse(_delete.called or _put.called or _post.called)
+        return str(raised.exception)
+
+    def test_sync_playlist_rejects_unavailable_tracks(self):
+        self.assertIn("Track 1 is missing", self._sync_rejected({"track": None}))
+
+    def test_sync_playlist_rejects_local_tracks(self):
+        message = self._sync_rejected({"track": {"uri": "spotify:local:a:b:c:1"},
+                                       "is_local": True})
+        self.assertIn("Track 1 is a local track", message)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import gzip
+import io
+import json
+import unittest
+
+from spotiwise import CSVWriter, NDJSONWriter, Spotify, export_objects
+from spotiwise.export import schema
+from spotiwise.object_classes import SpotiwiseItem, SpotiwiseTrack
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
+
+def _item(i):
+    return {"added_at": "2020-01-01T00:00:00Z", "added_by": {"id": "u%d" % i},
+            "track": {"id": "t%d" % i, "name": "Track, %d" % i,
+                      "artists": [{"id": "ar", "name": "Artist"}]}}
+
+
+class SchemaTest(unittest.TestCase):
+
+    def test_schema_follows_repr_attributes(self):
+        self.assertEqual(schema(SpotiwiseTrack),
+                         [("id", "id"), ("name", "name"), ("artist", "artist")])
+        self.assertEqual(schema(SpotiwiseItem),
+                         [("id", "track.id"), ("name", "track.name"),
+                          ("artist", "track.artist"), ("added_at", "added_at"),
+                          ("added_by", "added_by.id")])
+
+
+class WriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.items = [SpotiwiseItem(**_item(i)) for i in range(3)]
+
+    def test_csv(self):
+        out = io.StringIO()
+
+        self.assertEqual(export_objects(iter(self.items), out), 3)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], "id,name,artist,added_at,added_by")
+        self.assertEqual(lines[1], 't0,"Track, 0",Artist,2020-01-01T00:00:00Z,u0')
+
+    def test_empty_csv_has_a_header(self):
+        out = io.StringIO()
+        with CSVWriter(out, cls=SpotiwiseTrack):
+            pass
+        self.assertEqual(out.getvalue().strip(), "id,name,artist")
+
+    def test_ndjson_with_custom_columns(self):
+        out = io.StringIO()
+        columns = [("track", "track.id"), ("album", "track.album.name")]
+        with NDJSONWriter(out, columns=columns) as w:
+            w.write_all(self.items)
+
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(rows[2], {"track": "t2", "album": None})
+
+    def test_gzip_ndjson_leaves_file_open(self):
+        out = io.BytesIO()
+
+        export_objects(self.items, out, format="ndjson.gz")
+
+        self.assertFalse(out.closed)
+        lines = gzip.decompress(out.getvalue()).decode("utf-8").splitlines()
+        self.assertEqual(json.loads(lines[0])["name"], "Track, 0")
+
+    def test_unknown_format(self):
+        self.assertRaises(ValueError, export_objects, self.items, io.StringIO(), "xml")
+
+
+class ClientExportTest(unittest.TestCase):
+
+    def test_export_saved_tracks_streams_pages(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        url = "https://api.spotify.com/v1/me/tracks"
+        first = {"items": [_item(0), _item(1)], "offset": 0, "limit": 2, "total": 3,
+                 "next": url + "?offset=2&limit=2"}
+        second = {"items": [_item(2)], "offset": 2, "limit": 2, "total": 3, "next": None}
+        out = io.StringIO()
+
+        with mock.patch.object(sp, "_get", side_effect=[first, second]):
+            rows = sp.export_saved_tracks(out, format="ndjson")
+
+        self.assertEqual(rows, 3)
+        self.assertEqual([json.loads(line)["id"] for line in out.getvalue().splitlines()],
+                         ["t0", "t1", "t2"])
@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+import gc
+import pickle
+import unittest
+
+from spotiwise import Spotify, serialization
+from spotiwise.object_classes import (
+    IdentityMap,
+    SpotiwiseAlbum,
+    SpotiwiseArtist,
+    SpotiwiseItem,
+    SpotiwisePlayback,
+    SpotiwisePlaylist,
+    SpotiwiseTrack,
+    SpotiwiseUser,
+    SpotiwiseUserFactory
+)
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
+
+def _track(id="t1"):
+    artist = {"id": "ar", "name": "Artist", "uri": "spotify:artist:ar"}
+    return {"id": id, "name": "Track", "uri": "spotify:track:" + id,
+            "artists": [artist], "duration_ms": 61000, "is_playable": True,
+            "album": {"id": "al", "name": "Album", "artists": [artist],
+                      "release_date": "2001"}}
+
+
+class SlotsTest(unittest.TestCase):
+
+    def test_objects_have_no_instance_dict(self):
+        objects = [
+            SpotiwiseArtist(id="ar", name="Artist"),
+            SpotiwiseAlbum(id="al", name="Album", artists=[]),
+            SpotiwiseTrack(**_track()),
+            SpotiwiseItem(track=_track()),
+            SpotiwiseUser(id="u"),
+            SpotiwisePlaylist(id="pl", name="Playlist", owner={"id": "u"},
+                              tracks={"href": "x", "total": 0}),
+        ]
+        for obj in objects:
+            self.assertFalse(hasattr(obj, "__dict__"), type(obj).__name__)
+
+    def test_attributes_and_extra_fields_are_kept(self):
+        track = SpotiwiseTrack(**_track())
+
+        self.assertEqual(track.duration, 61)
+        self.assertEqual(track.album.artist, "Artist")
+        self.assertEqual(track._kwargs, {"is_playable": True})
+        self.assertEqual(track.album._kwargs, {"release_date": "2001"})
+        self.assertEqual(SpotiwiseArtist(id="ar", name="A")._kwargs, {})
+        self.assertEqual(repr(track), "SpotiwiseTrack(name=Track, artist=Artist)")
+
+    def test_extra_fields_can_be_dropped(self):
+        SpotiwiseTrack.keep_extra = False
+        self.addCleanup(delattr, SpotiwiseTrack, "keep_extra")
+
+        track = SpotiwiseTrack(**_track())
+
+        self.assertEqual(track._kwargs, {})
+        self.assertEqual(track.album._kwargs, {"release_date": "2001"})
+
+    def test_slotted_objects_pickle(self):
+        track = pickle.loads(pickle.dumps(SpotiwiseTrack(**_track())))
+
+        self.assertEqual(track.album.name, "Album")
+        # unmodeled fields are only pickled with pickle_extra
+        self.assertEqual(track._kwargs, {})
+
+
+class LazyTest(unittest.TestCase):
+
+    def test_nested_objects_are_built_on_first_access(self):
+        track = SpotiwiseTrack.lazy(_track())
+
+        self.assertEqual(track.id, "t1")
+        with self.assertRaises(AttributeError):
+            object.__getattribute__(track, "album")
+
+        album = track.album
+        self.assertIsInstance(album, SpotiwiseAlbum)
+        self.assertIs(track.album, album)
+
+    def test_lazy_objects_match_eager_ones(self):
+        data = _track()
+        eager, lazy = SpotiwiseTrack(**data), SpotiwiseTrack.lazy(data)
+
+        for name in ("id", "name", "artist", "duration", "playcount",
+                     "available_markets", "external_ids", "_kwargs"):
+            self.assertEqual(getattr(lazy, name), getattr(eager, name), name)
+        self.assertEqual(repr(lazy), repr(eager))
+        with self.assertRaises(AttributeError):
+            lazy.missing
+
+    def test_client_builds_lazy_objects(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None, lazy_objects=True)
+
+        with mock.patch.object(sp, "_get", return_value=_track()):
+            track = sp.track("t1")
+
+        self.assertEqual(object.__getattribute__(track, "_raw")["id"], "t1")
+        self.assertEqual(track.album.name, "Album")
+
+
+class IdentityMapTest(unittest.TestCase):
+
+    def test_client_shares_objects_by_id(self):
+        for lazy in (False, True):
+            sp = Spotify(auth="TOKEN", rate_limiter=None, intern_objects=True,
+                         lazy_objects=lazy)
+
+            with mock.patch.object(sp, "_get", side_effect=[
+                    {"tracks": [_track("t1"), _track("t2")]},
+                    {"id": "al", "name": "Album", "artists": [],
+                     "label": "Label", "images": [{"url": "cover"}]}]):
+                one, two = sp.tracks(["t1", "t2"])
+                album = sp.album("al")
+
+            self.assertIs(one.album, two.album)
+            self.assertIs(one.album, album)
+            self.assertIs(one._artists[0], two._artists[0])
+            # the full album enriched the simplified one
+            self.assertEqual(one.album.images, [{"url": "cover"}])
+            self.assertEqual(one.album._kwargs["label"], "Label")
+
+    def test_entries_are_weak(self):
+        identity_map = IdentityMap()
+        track = SpotiwiseTrack(**_track())
+        identity_map.intern(track)
+        self.assertIs(identity_map.get(SpotiwiseTrack, "t1"), track)
+
+        del track
+        gc.collect()
+
+        self.assertEqual(len(identity_map), 0)
+
+
+class UserCacheTest(unittest.TestCase):
+
+    def test_users_are_cached_per_client(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None, user_cache_size=2)
+        other = Spotify(auth="TOKEN", rate_limiter=None)
+
+        first = SpotiwiseUserFactory.get_instance(sp=sp, id="u1")
+        self.assertIs(SpotiwiseUserFactory.get_instance(sp=sp, id="u1"), first)
+        SpotiwiseUserFactory.get_instance(sp=sp, id="u2")
+        SpotiwiseUserFactory.get_instance(sp=sp, id="u3")
+
+        self.assertEqual(len(sp.user_cache), 2)
+        self.assertNotIn("u1", sp.user_cache)
+        self.assertEqual(len(other.user_cache), 0)
+        self.assertEqual(sp.user_cache.stats()["hit_rate"], 0.25)
+
+        sp.user_cache.clear()
+        self.assertEqual(len(sp.user_cache), 0)
+
+
+class UserResolutionTest(unittest.TestCase):
+
+    def _playlist(self, sp):
+        items = [{"track": _track("t%d" % i), "added_by": {"id": "u%d" % (i % 3)}}
+                 for i in range(9)]
+        return SpotiwisePlaylist(sp=sp, id="pl", name="Playlist",
+                                 owner={"id": "u0", "display_name": "Owner"},
+                                 tracks={"items": items, "total": 9})
+
+    def test_building_users_sends_no_request(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+
+        with mock.patch.object(sp, "_user") as _user:
+            playlist = self._playlist(sp)
+            self.assertEqual(playlist.owner.display_name, "Owner")
+
+        _user.assert_not_called()
+        self.assertFalse(playlist.owner.resolved)
+
+    def test_stub_is_resolved_on_first_access(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        user = SpotiwiseUser(sp=sp, id="stub")
+
+        with mock.patch.object(sp, "_user", return_value={
+                "id": "stub", "display_name": "Stub", "country": "US"}) as _user:
+            self.assertEqual(user.display_name, "Stub")
+            self.assertIsNone(user.images)
+
+        _user.assert_called_once_with("stub")
+        self.assertEqual(user._kwargs, {"country": "US"})
+
+    def test_first_access_resolves_every_pending_stub(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        playlist = self._playlist(sp)
+
+        with mock.patch.object(sp, "_user", side_effect=lambda id: {
+                "id": id, "display_name": id.upper()}) as _user:
+            names = [item.added_by.display_name for item in playlist.items[1:]]
+
+        self.assertEqual(names, ["U1", "U2", "U0"] * 2 + ["U1", "U2"])
+        self.assertEqual(sorted(c[0][0] for c in _user.call_args_list),
+                         ["u0", "u1", "u2"])
+
+    def test_first_access_leaves_other_playlists_alone(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        playlist = self._playlist(sp)
+        other = SpotiwisePlaylist.lazy({"id": "other", "name": "Other", "owner": {"id": "o"},
+                                        "tracks": {"items": [{"track": _track(),
+                                                              "added_by": {"id": "x"}}]}},
+                                       sp=sp)
+        other.items
+        lone = SpotiwiseUserFactory.get_instance(sp=sp, id="lone")
+
+        with mock.patch.object(sp, "_user", side_effect=lambda id: {
+                "id": id, "display_name": id.upper()}) as _user:
+            self.assertEqual(playlist.items[1].added_by.display_name, "U1")
+            self.assertEqual(sorted(c[0][0] for c in _user.call_args_list),
+                             ["u0", "u1", "u2"])
+            sp.resolve_users()
+
+        self.assertEqual(sorted(c[0][0] for c in _user.call_args_list),
+                         ["lone", "o", "u0", "u1", "u2", "x"])
+        self.assertEqual(lone.display_name, "LONE")
+
+    def test_repr_sends_no_request(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        playlist = self._playlist(sp)
+
+        with mock.patch.object(sp, "_user") as _user:
+            self.assertIn("Owner", repr(playlist))
+            self.assertEqual(repr(playlist.items[1].added_by), "SpotiwiseUser(id=u1)")
+
+        _user.assert_not_called()
+
+    def test_resolve_users_fetches_each_user_once(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        playlist = self._playlist(sp)
+
+        with mock.patch.object(sp, "_user", side_effect=lambda id: {
+                "id": id, "display_name": id.upper()}) as _user:
+            playlist.resolve_users()
+
+        self.assertEqual(sorted(c[0][0] for c in _user.call_args_list),
+                         ["u0", "u1", "u2"])
+        self.assertEqual([item.added_by.display_name for item in playlist.items[:3]],
+                         ["U0", "U1", "U2"])
+
+
+class SerializationTest(unittest.TestCase):
+
+    def _playlist(self, sp):
+        items = [{"track": _track("t%d" % i), "added_by": {"id": "u0"}} for i in range(5)]
+        return SpotiwisePlaylist(sp=sp, id="pl", name="Playlist", owner={"id": "u0"},
+                                 tracks={"items": items, "total": 5})
+
+    def test_client_is_stripped_and_reattached(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        other = Spotify(auth="TOKEN", rate_limiter=None)
+        playlist = self._playlist(sp)
+
+        data = serialization.dumps(playlist)
+        self.assertIsNone(pickle.loads(data).sp)
+        loaded = serialization.loads(data, sp=other)
+
+        self.assertIs(loaded.sp, other)
+        self.assertIs(loaded.items[0].sp, other)
+        self.assertEqual([t.id for t in loaded.tracks], ["t%d" % i for i in range(5)])
+        self.assertNotIn("items", loaded._tracks)
+        self.assertIs(other.user_cache.get("u0"), loaded.owner)
+        self.assertIs(loaded.items[3].added_by, loaded.owner)
+
+    def test_equal_nested_objects_are_written_once(self):
+        tracks = [SpotiwiseTrack(**_track("t%d" % i)) for i in range(20)]
+        self.assertIsNot(tracks[0].album, tracks[1].album)
+
+        data = serialization.dumps(tracks)
+        loaded = pickle.loads(data)
+
+        self.assertLess(len(data), len(pickle.dumps(tracks)))
+        self.assertIs(loaded[0].album, loaded[19].album)
+        self.assertIs(loaded[0]._artists[0], loaded[0].album._artists[0])
+
+    def test_unpickled_objects_are_interned(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None, intern_objects=True)
+        album = sp._wrap(SpotiwiseAlbum, {"id": "al", "name": "Album", "artists": []})
+
+        track = serialization.loads(serialization.dumps(SpotiwiseTrack(**_track())), sp=sp)
+
+        self.assertIs(track.album, album)
+
+    def test_lazy_objects_pickle(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None, intern_objects=True)
+        track = SpotiwiseTrack.lazy(_track(), sp=sp)
+
+        loaded = serialization.loads(serialization.dumps(track))
+
+        self.assertNotIn("is_playable", object.__getattribute__(loaded, "_raw"))
+        self.assertEqual(loaded.album.name, "Album")
+        self.assertEqual(loaded._kwargs, {})
+
+    def test_extra_fields_can_be_pickled(self):
+        SpotiwiseTrack.pickle_extra = True
+        self.addCleanup(delattr, SpotiwiseTrack, "pickle_extra")
+
+        track = pickle.loads(pickle.dumps(SpotiwiseTrack(**_track())))
+
+        self.assertEqual(track._kwargs, {"is_playable": True})
+
+    @unittest.skipIf(serialization.msgpack is None, "msgpack is not installed")
+    def test_msgpack_round_trip(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        playlist = self._playlist(sp)
+
+        loaded = serialization.unpackb(serialization.packb(playlist), sp=sp)
+
+        self.assertEqual(loaded, playlist)
+        self.assertEqual([t.id for t in loaded.tracks], [t.id for t in playlist.tracks])
+        self.assertIs(loaded.tracks[0].album, loaded.tracks[4].album)
+        self.assertIs(loaded.sp, sp)
+
+    def test_msgpack_is_optional(self):
+        with mock.patch("spotiwise.serialization.msgpack", None):
+            self.assertRaises(ImportError, serialization.packb, [])
+
+
+class KeyTest(unittest.TestCase):
+
+    def _playlist(self, ids):
+        items = [{"track": _track(id), "added_by": {"id": "u"}} for id in ids]
+        return SpotiwisePlaylist(id="pl", name="Playlist", owner={"id": "u"},
+                                 tracks={"items": items, "total": len(items)})
+
+    def test_objects_hash_by_id(self):
+        eager, lazy = SpotiwiseTrack(**_track()), SpotiwiseTrack.lazy(_track())
+
+        self.assertEqual(eager, lazy)
+        self.assertEqual(len({eager, lazy, SpotiwiseTrack(**_track("t2"))}), 2)
+        self.assertNotEqual(SpotiwiseArtist(id="x", name="X"),
+                            SpotiwiseAlbum(id="x", name="X", artists=[]))
+        self.assertEqual({SpotiwiseUser(id="u"), SpotiwiseUser(id="u", display_name="U")},
+                         {SpotiwiseUser(id="u")})
+
+    def test_items_hash_by_track_and_addition(self):
+        one = SpotiwiseItem(track=_track(), added_at="2020")
+        self.assertEqual(one, SpotiwiseItem(track=_track(), added_at="2020"))
+        self.assertNotEqual(one, SpotiwiseItem(track=_track(), added_at="2021"))
+        self.assertEqual(len({one, SpotiwiseItem(track=_track(), added_at="2020")}), 1)
+
+    def test_playbacks_hash_by_track_and_timestamp(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        one = SpotiwisePlayback(item=_track(), timestamp=1000, sp=sp, uri="spotify:track:t1")
+
+        self.assertIs(one.sp, sp)
+        self.assertEqual(one.uri, "spotify:track:t1")
+        self.assertEqual(one, SpotiwisePlayback(item=_track(), timestamp=1000, progress_ms=5))
+        self.assertNotEqual(one, SpotiwisePlayback(item=_track(), timestamp=2000))
+        self.assertEqual(len({one, SpotiwisePlayback(item=_track(), timestamp=1000)}), 1)
+
+    def test_duplicates_and_unique_tracks(self):
+        playlist = self._playlist(["a", "b", "a", "c", "b", "a"])
+
+        self.assertEqual([t.id for t in playlist.unique_tracks()], ["a", "b", "c"])
+        self.assertEqual([(p, i.track.id) for p, i in playlist.duplicates()],
+                         [(2, "a"), (4, "b"), (5, "a")])
+
+    def test_set_operations(self):
+        one, two = self._playlist(["a", "b", "c", "a"]), self._playlist(["c", "d", "a"])
+
+        self.assertEqual([t.id for t in one & two], ["a", "c"])
+        self.assertEqual([t.id for t in one - two], ["b"])
+        self.assertEqual([t.id for t in one | two], ["a", "b", "c", "d"])
+        self.assertEqual([t.id for t in one.difference(two.tracks[:1])], ["a", "b"])
+
+    def test_repr_lists_sort_keys_first(self):
+        self.assertEqual(repr(SpotiwiseAlbum(id="al", name="Album", artists=[
+            {"id": "ar", "name": "Artist"}])), "SpotiwiseAlbum(name=Album, artist=Artist)")
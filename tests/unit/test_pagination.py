@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from spotiwise import Spotify
+from spotiwise.object_classes import SpotiwiseItem, SpotiwisePlaylist, SpotiwiseTrack
+from spotiwise.pagination import iter_pages, remaining_page_urls, with_offset
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
+TRACKS_URL = "https://api.spotify.com/v1/playlists/pl/tracks"
+
+
+def _track(i):
+    artist = {"id": "ar", "name": "Artist"}
+    return {"id": "t%d" % i, "name": "Track %d" % i, "artists": [artist],
+            "album": {"id": "al", "name": "Album", "artists": [artist]}}
+
+
+def _page(offset, total, limit=100):
+    items = [{"track": _track(i), "added_at": "2020-01-01T00:00:00Z",
+              "added_by": {"id": "owner"}}
+             for i in range(offset, min(offset + limit, total))]
+    has_next = offset + limit < total
+    return {
+        "href": "%s?offset=%d&limit=%d" % (TRACKS_URL, offset, limit),
+        "items": items,
+        "limit": limit,
+        "offset": offset,
+        "total": total,
+        "next": "%s?offset=%d&limit=%d&market=US" % (
+            TRACKS_URL, offset + limit, limit) if has_next else None,
+    }
+
+
+def _fake_get(url, **kwargs):
+    if url.startswith("users/"):
+        return {"id": url.split("/")[1], "display_name": "Owner"}
+    query = dict(part.split("=") for part in url.split("?")[1].split("&"))
+    return _page(int(query["offset"]), 350, int(query["limit"]))
+
+
+class PaginationTest(unittest.TestCase):
+
+    def test_with_offset_replaces_offset_only(self):
+        url = with_offset(TRACKS_URL + "?offset=100&limit=100&market=US", 300)
+        self.assertEqual(
+            url, TRACKS_URL + "?limit=100&market=US&offset=300")
+
+    def test_remaining_page_urls_cover_total(self):
+        urls = remaining_page_urls(_page(0, 350))
+
+        self.assertEqual(len(urls), 3)
+        self.assertIn("offset=300", urls[-1])
+        self.assertIn("market=US", urls[-1])
+        self.assertEqual(remaining_page_urls(_page(300, 350)), [])
+
+    def test_all_items_are_returned_in_order(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+
+        with mock.patch.object(sp, "_get", side_effect=_fake_get) as _get:
+            items = sp.all_items(_page(0, 350))
+
+        self.assertEqual(_get.call_count, 3)
+        self.assertEqual([item["track"]["id"] for item in items],
+                         ["t%d" % i for i in range(350)])
+
+    def test_playlist_load_tracks_fans_out(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        playlist = SpotiwisePlaylist(
+            id="pl", name="Playlist", owner={"id": "owner"}, tracks=_page(0, 350))
+
+        with mock.patch.object(sp, "_get", side_effect=_fake_get):
+            playlist.load_tracks(sp)
+
+        self.assertEqual([t.id for t in playlist.tracks],
+                         ["t%d" % i for i in range(350)])
+        self.assertEqual(len(playlist), 350)
+
+
+class IteratorTest(unittest.TestCase):
+
+    def test_iter_pages_prefetches_next_page(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        pages = iter_pages(sp, _page(0, 250))
+
+        with mock.patch.object(sp, "_get", side_effect=_fake_get) as _get:
+            first = next(pages)
+            sp._get_executor().submit(lambda: None).result()
+            self.assertEqual(first["offset"], 0)
+            self.assertEqual(_get.call_count, 1)
+            offsets = [page["offset"] for page in pages]
+
+        self.assertEqual(offsets, [100, 200, 300])
+
+    def test_iter_playlist_items_yields_objects(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+
+        def get(url, **kwargs):
+            if url.startswith("playlists/"):
+                self.assertEqual(kwargs["limit"], 100)
+                return _page(0, 350)
+            return _fake_get(url, **kwargs)
+
+        with mock.patch.object(sp, "_get", side_effect=get):
+            items = list(sp.iter_playlist_items("pl"))
+
+        self.assertEqual(len(items), 350)
+        self.assertIsInstance(items[0], SpotiwiseItem)
+        self.assertEqual(items[-1].track.id, "t349")
+
+    def test_iter_album_tracks_accepts_simplified_tracks(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        page = {"items": [{"id": "t1", "name": "One", "artists": []}],
+                "next": None, "offset": 0, "limit": 50, "total": 1}
+
+        with mock.patch.object(sp, "_get", return_value=page):
+            tracks = list(sp.iter_album_tracks("al"))
+
+        self.assertIsInstance(tracks[0], SpotiwiseTrack)
+        self.assertIsNone(tracks[0].album)
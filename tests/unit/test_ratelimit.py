@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import requests
+
+from spotiwise import Spotify, SpotifyException
+from spotiwise.ratelimit import RateLimiter
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
+
+def _response(status_code, body=None, headers=None):
+    response = mock.Mock(spec=requests.Response)
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.url = "https://api.spotify.com/v1/artists/abc"
+    response.json.return_value = body
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError()
+    return response
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def test_token_bucket_delays_after_burst(self):
+        limiter = RateLimiter(rate=10, burst=2)
+
+        delays = [limiter.reserve() for _ in range(4)]
+
+        self.assertEqual(delays[:2], [0, 0])
+        self.assertGreater(delays[2], 0)
+        self.assertGreater(delays[3], delays[2])
+        self.assertEqual(limiter.stats()["throttled_requests"], 2)
+
+    def test_pause_holds_back_every_caller(self):
+        limiter = RateLimiter()
+
+        limiter.pause(5)
+
+        self.assertAlmostEqual(limiter.reserve(), 5, places=1)
+        self.assertAlmostEqual(limiter.reserve(), 5, places=1)
+        stats = limiter.stats()
+        self.assertEqual(stats["retry_after_pauses"], 1)
+        self.assertGreater(stats["throttled_seconds"], 9)
+
+    def test_retry_after_parsing(self):
+        limiter = RateLimiter()
+
+        self.assertEqual(limiter.retry_after({"Retry-After": "3"}), 3)
+        self.assertEqual(limiter.retry_after({}), limiter.default_retry_after)
+
+
+class SpotifyRateLimitTest(unittest.TestCase):
+
+    def test_429_pauses_shared_limiter_and_retries(self):
+        limiter = RateLimiter()
+        session = mock.Mock(spec=requests.Session)
+        session.request.side_effect = [
+            _response(429, headers={"Retry-After": "2"}),
+            _response(200, {"id": "abc", "name": "Weezer"}),
+        ]
+        sp = Spotify(auth="TOKEN", requests_session=session, rate_limiter=limiter)
+
+        with mock.patch("spotiwise.ratelimit.time.sleep") as sleep:
+            result = sp._artist("abc")
+
+        self.assertEqual(result["name"], "Weezer")
+        self.assertEqual(session.request.call_count, 2)
+        self.assertAlmostEqual(sleep.call_args[0][0], 2, places=1)
+        self.assertEqual(limiter.stats()["retry_after_pauses"], 1)
+
+    def test_429_raises_max_retries_when_retries_run_out(self):
+        session = mock.Mock(spec=requests.Session)
+        session.request.side_effect = [_response(429, headers={"Retry-After": "0"})
+                                       for _ in range(2)]
+        sp = Spotify(auth="TOKEN", requests_session=session, rate_limiter=RateLimiter(),
+                     status_retries=1)
+
+        with mock.patch("spotiwise.ratelimit.time.sleep"):
+            with self.assertRaises(SpotifyException) as cm:
+                sp._artist("abc")
+
+        self.assertEqual(cm.exception.http_status, 599)
+        self.assertIn("Max Retries", cm.exception.msg)
+        self.assertEqual(session.request.call_count, 2)
+
+    def test_429_is_left_to_the_limiter(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=RateLimiter())
+        self.assertNotIn(429, sp._session_status_forcelist())
+
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        self.assertIn(429, sp._session_status_forcelist())
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import re
+import unittest
+
+from spotiwise import Spotify, SpotifyException
+from spotiwise.object_classes import SpotiwiseArtist, SpotiwiseTrack
+from spotiwise.search import follow_up, split_years
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
+
+def _catalog(size):
+    artist = {"id": "ar", "name": "Artist"}
+    return [{"id": "t%d" % i, "name": "Track %d" % i, "year": 1950 + i % 70,
+             "artists": [artist],
+             "album": {"id": "al", "name": "Album", "artists": [artist]}}
+            for i in range(size)]
+
+
+def _fake_search(catalog):
+    def get(url, q, limit, offset, type, market):
+        if offset + limit > 1000:
+            raise SpotifyException(400, -1, "offset too large")
+        years = re.search(r"year:(\d+)(?:-(\d+))?", q)
+        matches = catalog
+        if years:
+            first = int(years.group(1))
+            last = int(years.group(2) or first)
+            matches = [t for t in catalog if first <= t["year"] <= last]
+        items = [dict((k, v) for k, v in t.items() if k != "year")
+                 for t in matches[offset:offset + limit]]
+        return {type + "s": {"items": items, "total": len(matches),
+                             "offset": offset, "limit": limit}}
+    return get
+
+
+class FollowUpTest(unittest.TestCase):
+
+    def test_split_years(self):
+        self.assertEqual(split_years((2000, 2003)), [(2000, 2001), (2002, 2003)])
+        self.assertIsNone(split_years((2000, 2000)))
+
+    def test_probe_under_cap_requests_remaining_pages(self):
+        tasks = follow_up("q", "track", ("q", None, 0), {"total": 160})
+        self.assertEqual([t[2] for t in tasks], [50, 100, 150])
+
+    def test_probe_over_cap_is_partitioned(self):
+        tasks = follow_up("q", "track", ("q year:2000-2003", (2000, 2003), 0),
+                          {"total": 5000})
+        self.assertEqual([t[0] for t in tasks],
+                         ["q year:2000-2001", "q year:2002-2003"])
+
+    def test_unpartitionable_type_stops_at_cap(self):
+        tasks = follow_up("q", "playlist", ("q", None, 0), {"total": 5000})
+        self.assertEqual(tasks[-1][2], 950)
+
+
+class SearchAllTest(unittest.TestCase):
+
+    def test_search_all_gets_past_the_cap(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        catalog = _catalog(2500)
+
+        with mock.patch.object(sp, "_get", side_effect=_fake_search(catalog)):
+            tracks = list(sp.search_all("weezer", concurrency=4))
+
+        self.assertTrue(all(isinstance(t, SpotiwiseTrack) for t in tracks))
+        self.assertEqual(sorted(t.id for t in tracks),
+                         sorted(t["id"] for t in catalog))
+
+    def test_search_all_wraps_by_type(self):
+        sp = Spotify(auth="TOKEN", rate_limiter=None)
+        page = {"artists": {"items": [{"id": "a", "name": "A"}] * 2,
+                            "total": 2, "offset": 0, "limit": 50}}
+
+        with mock.patch.object(sp, "_get", return_value=page):
+            artists = list(sp.search_all("a", type="artist"))
+
+        self.assertEqual(len(artists), 1)
+        self.assertIsInstance(artists[0], SpotiwiseArtist)
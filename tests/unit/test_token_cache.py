@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from spotiwise.oauth2 import SpotifyOAuth
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
+
+def _make_fake_token(expires_at, scope, access_token="ACCESS"):
+    return dict(
+        expires_at=expires_at,
+        expires_in=3600,
+        scope=scope,
+        token_type="Bearer",
+        refresh_token="REFRESH",
+        access_token=access_token)
+
+
+class TokenMemoizationTest(unittest.TestCase):
+
+    scope = "playlist-modify-private"
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, ".cache-username")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write_token(self, token, mtime):
+        with open(self.path, "w") as f:
+            f.write(json.dumps(token))
+        os.utime(self.path, (mtime, mtime))
+
+    def _make_oauth(self):
+        return SpotifyOAuth("CLID", "CLISEC", "REDIR", scope=self.scope,
+                            cache_path=self.path)
+
+    def test_cache_file_is_read_once(self):
+        self._write_token(_make_fake_token(time.time() + 3600, self.scope), 1000)
+        spot = self._make_oauth()
+
+        with mock.patch("spotiwise.oauth2.open", create=True,
+                        side_effect=open) as opener:
+            for _ in range(5):
+                token = spot.get_access_token(as_dict=False)
+
+        self.assertEqual(token, "ACCESS")
+        self.assertEqual(opener.call_count, 1)
+
+    def test_cache_file_is_reread_when_mtime_changes(self):
+        self._write_token(_make_fake_token(time.time() + 3600, self.scope), 1000)
+        spot = self._make_oauth()
+        self.assertEqual(spot.get_access_token(as_dict=False), "ACCESS")
+
+        self._write_token(
+            _make_fake_token(time.time() + 3600, self.scope, "NEW"), 2000)
+
+        self.assertEqual(spot.get_access_token(as_dict=False), "NEW")
+
+    @mock.patch.object(SpotifyOAuth, "refresh_access_token")
+    def test_memoized_token_is_refreshed_near_expiry(self, refresh_access_token):
+        self._write_token(_make_fake_token(time.time() + 3600, self.scope), 1000)
+        refresh_access_token.return_value = _make_fake_token(
+            time.time() + 3600, self.scope, "REFRESHED")
+        spot = self._make_oauth()
+        spot.get_access_token(as_dict=False)
+
+        spot._token_info["expires_at"] = time.time() + 10
+
+        self.assertEqual(spot.get_access_token(as_dict=False), "REFRESHED")
+        refresh_access_token.assert_called_once_with("REFRESH")